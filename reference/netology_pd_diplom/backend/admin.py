@@ -1,6 +1,5 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from django.db.models import F, Sum
 from backend.models import (
     User,
     Shop,
@@ -12,7 +11,9 @@ from backend.models import (
     Order,
     OrderItem,
     Contact,
-    ConfirmEmailToken
+    ConfirmEmailToken,
+    NotificationEvent,
+    QueuedEmail
 )
 
 
@@ -75,7 +76,8 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(ProductInfo)
 class ProductInfoAdmin(admin.ModelAdmin):
     """Админка для информации о продуктах"""
-    pass
+    # __str__ выводит название продукта
+    list_select_related = ('product',)
 
 
 @admin.register(Parameter)
@@ -87,7 +89,8 @@ class ParameterAdmin(admin.ModelAdmin):
 @admin.register(ProductParameter)
 class ProductParameterAdmin(admin.ModelAdmin):
     """Админка для параметров продуктов"""
-    pass
+    list_display = ('product_info', 'parameter', 'value')
+    list_select_related = ('product_info__product', 'parameter')
 
 
 # ====================== ORDER RELATED ADMINS ======================
@@ -103,9 +106,17 @@ class OrderItemsInline(admin.TabularInline):
     readonly_fields = list_display
     can_delete = False
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'product_info__product',
+            'product_info__shop'
+        )
+
     @admin.display(description='Цена')
     def get_item_price(self, obj):
-        """Возвращает цену товара"""
+        """Возвращает зафиксированную или текущую цену товара"""
+        if obj.price is not None:
+            return obj.price
         return obj.product_info.price
 
     @admin.display(description='Магазин')
@@ -118,32 +129,65 @@ class OrderItemsInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     """Админка для заказов с расчетом итоговой суммы"""
     inlines = [OrderItemsInline]
-    list_display = ('user', 'dt', 'state', 'contact', 'order_sum')
-    readonly_fields = ('user', 'dt', 'contact', 'order_sum')
+    list_display = (
+        'user',
+        'dt',
+        'state',
+        'contact',
+        'items_count',
+        'order_sum'
+    )
+    readonly_fields = ('user', 'dt', 'contact', 'items_count', 'order_sum')
+    list_select_related = ('user', 'contact__user')
 
     @admin.display(description='Сумма заказа (итого)')
     def order_sum(self, obj):
-        """Рассчитывает общую сумму заказа"""
-        total_sum = obj.ordered_items.aggregate(
-            total_sum=Sum(F('quantity') * F('product_info__price'))
-        )
-        return total_sum.get('total_sum')
+        """Возвращает сохраненную сумму заказа"""
+        return obj.total_sum
 
 
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     """Админка для позиций заказа"""
-    pass
+    list_display = ('order', 'product_info', 'quantity', 'price')
+    list_select_related = ('order', 'product_info__product')
+
+    def delete_model(self, request, obj):
+        """Удаляет позицию и пересчитывает сумму заказа"""
+        super().delete_model(request, obj)
+        Order.refresh_totals([obj.order_id])
+
+    def delete_queryset(self, request, queryset):
+        """Удаляет позиции и пересчитывает суммы их заказов"""
+        order_ids = list(queryset.values_list('order_id', flat=True))
+        super().delete_queryset(request, queryset)
+        Order.refresh_totals(order_ids)
 
 
 # ====================== ADDITIONAL ADMINS ======================
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
     """Админка для контактов"""
-    pass
+    # __str__ выводит email пользователя
+    list_select_related = ('user',)
 
 
 @admin.register(ConfirmEmailToken)
 class ConfirmEmailTokenAdmin(admin.ModelAdmin):
     """Админка для токенов подтверждения email"""
     list_display = ('user', 'key', 'created_at')
+    list_select_related = ('user',)
+
+
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(admin.ModelAdmin):
+    """Админка для очереди писем"""
+    list_display = ('subject', 'state', 'attempts', 'send_after', 'sent_at')
+    list_filter = ('state',)
+
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    """Админка для событий уведомлений"""
+    list_display = ('order', 'user', 'state', 'created_at', 'processed_at')
+    list_select_related = ('order', 'user')
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class BackendConfig(AppConfig):
@@ -7,6 +8,10 @@ class BackendConfig(AppConfig):
 
     def ready(self):
         """
-        импортируем сигналы
+        импортируем сигналы и подключаем создание поисковых индексов
         """
         import backend.schema
+        import backend.signals
+        from backend.search import install_search_indexes
+
+        post_migrate.connect(install_search_indexes, sender=self)
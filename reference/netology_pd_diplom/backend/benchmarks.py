@@ -0,0 +1,184 @@
+"""Вспомогательные функции для команд замера производительности."""
+import random
+import statistics
+import time
+
+from django.contrib.auth.hashers import make_password
+
+from backend.importer import import_price_list
+from backend.models import Contact, Order, OrderItem, ProductInfo, User
+from backend.synthetic import generate_price_list
+
+# Замеры выполняются без кеша ответов, иначе измерялось бы чтение кеша
+DUMMY_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache'
+    }
+}
+
+
+def percentile(values, percent):
+    """Возвращает перцентиль отсортированного списка значений."""
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def measure(func, repeat):
+    """Замеряет время выполнения функции.
+
+    Args:
+        func: Функция без аргументов
+        repeat: Количество запусков
+
+    Returns:
+        Словарь с p50, p99 и средним временем в миллисекундах
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        'p50': percentile(timings, 50),
+        'p99': percentile(timings, 99),
+        'mean': statistics.fmean(timings),
+    }
+
+
+def seed_shops(shops, goods, password=None):
+    """Импортирует синтетические прайс-листы в shops магазинов.
+
+    Args:
+        shops: Количество магазинов
+        goods: Количество товаров каждого магазина
+        password: Пароль пользователей-магазинов, по умолчанию без
+            возможности входа
+
+    Returns:
+        Список ID созданных магазинов
+    """
+    defaults = {'type': 'shop', 'is_active': True}
+    if password is not None:
+        defaults['password'] = make_password(password)
+    shop_ids = []
+    for number in range(shops):
+        user, _ = User.objects.update_or_create(
+            email=f'bench-shop-{number}@example.com',
+            defaults=defaults
+        )
+        data = generate_price_list(
+            goods=goods,
+            shop=f'Синтетический магазин {number}',
+            seed=number
+        )
+        shop_ids.append(import_price_list(data, user.id)['shop'])
+    return shop_ids
+
+
+def seed_orders(shop_ids, orders, items, state='new', buyer=None):
+    """Создает заказы покупателя с товарами каждого из магазинов.
+
+    Args:
+        shop_ids: ID магазинов
+        orders: Количество заказов
+        items: Количество позиций каждого магазина в заказе
+        state: Статус создаваемых заказов
+        buyer: Покупатель, по умолчанию bench-buyer@example.com
+
+    Returns:
+        Покупатель, которому принадлежат заказы
+    """
+    if buyer is None:
+        buyer, _ = User.objects.get_or_create(
+            email='bench-buyer@example.com',
+            defaults={'is_active': True}
+        )
+    product_infos = {
+        shop_id: list(ProductInfo.objects.filter(
+            shop_id=shop_id
+        ).values_list('id', 'price'))
+        for shop_id in shop_ids
+    }
+    created = Order.objects.bulk_create(
+        Order(user=buyer, state=state) for _ in range(orders)
+    )
+    if created[0].id is None:
+        created = Order.objects.filter(
+            user=buyer, state=state
+        ).order_by('id')
+    rnd = random.Random(0)
+    OrderItem.objects.bulk_create(
+        (
+            OrderItem(
+                order_id=order.id,
+                product_info_id=product_info_id,
+                quantity=rnd.randint(1, 5),
+                price=price
+            )
+            for order in created
+            for shop_id in shop_ids
+            for product_info_id, price in rnd.sample(
+                product_infos[shop_id], items
+            )
+        ),
+        batch_size=5000
+    )
+    Order.refresh_totals(Order.objects.filter(user=buyer).values('id'))
+    return buyer
+
+
+def seed_buyers(shop_ids, buyers, orders, items, password):
+    """Создает покупателей с паролем, контактом и историей заказов.
+
+    Args:
+        shop_ids: ID магазинов для товаров заказов
+        buyers: Количество покупателей
+        orders: Количество заказов каждого покупателя
+        items: Количество позиций каждого магазина в заказе
+        password: Пароль всех покупателей
+
+    Returns:
+        Список покупателей load-buyer-<номер>@example.com
+    """
+    # Хеш пароля считается один раз, это самая медленная часть
+    password = make_password(password)
+    created = []
+    for number in range(buyers):
+        buyer, _ = User.objects.update_or_create(
+            email=f'load-buyer-{number}@example.com',
+            defaults={'is_active': True, 'password': password}
+        )
+        Contact.objects.get_or_create(
+            user=buyer,
+            defaults={
+                'city': 'Москва',
+                'street': f'Нагрузочная {number}',
+                'phone': '+70000000000',
+            }
+        )
+        if orders:
+            seed_orders(shop_ids, orders, items, buyer=buyer)
+        created.append(buyer)
+    return created
+
+
+def compare_results(results, baseline, threshold):
+    """Находит замеры, пропускная способность которых упала.
+
+    Args:
+        results: Текущие результаты в формате команды bench_suite
+        baseline: Результаты, с которыми идет сравнение
+        threshold: Допустимое падение, доля от базового значения
+
+    Returns:
+        Список (название, было, стало) для замеров с регрессией
+    """
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        before = baseline['benchmarks'].get(name)
+        if before is None:
+            continue
+        if result['ops'] < before['ops'] * (1 - threshold):
+            regressions.append((name, before['ops'], result['ops']))
+    return regressions
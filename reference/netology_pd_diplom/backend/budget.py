@@ -0,0 +1,133 @@
+"""Бюджеты SQL-запросов представлений API.
+
+Каждое представление объявляет атрибут query_budget: наибольшее число
+SQL-запросов на один HTTP-запрос, общее или по методам
+({'GET': 3, 'POST': 8}). Тесты проверяют бюджеты на реалистичном
+объеме данных, а при QUERY_BUDGET_DEBUG QueryBudgetMiddleware пишет
+в лог превышения со стеком вызовов первого запроса сверх бюджета.
+"""
+import logging
+import traceback
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from backend.metrics import view_name
+
+logger = logging.getLogger(__name__)
+
+# Служебные запросы транзакций не относятся к работе представления
+IGNORED_STATEMENTS = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+
+
+def with_query_budget(view, budget):
+    """Задает бюджет представлению-функции, например из сторонних
+    пакетов, не изменяя ее саму."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.query_budget = budget
+    return wrapper
+
+
+def get_query_budget(view, method):
+    """Возвращает бюджет запросов представления для HTTP-метода.
+
+    Args:
+        view: Функция представления из resolver_match.func
+        method: HTTP-метод запроса
+
+    Returns:
+        Число запросов или None, если бюджет не объявлен
+    """
+    view_class = getattr(view, 'view_class', None)
+    budget = getattr(
+        view,
+        'query_budget',
+        getattr(view_class, 'query_budget', None)
+    )
+    if isinstance(budget, dict):
+        return budget.get(method)
+    return budget
+
+
+def project_stack():
+    """Стек вызовов, ограниченный кодом проекта."""
+    base_dir = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()[:-2]
+        if frame.filename.startswith(base_dir)
+        and 'site-packages' not in frame.filename
+        and frame.filename != __file__
+    ]
+    return ''.join(traceback.format_list(frames))
+
+
+class QueryCounter:
+    """Обертка выполнения SQL, считающая запросы представления.
+
+    После превышения budget запоминает текст и стек первого лишнего
+    запроса.
+    """
+
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.count = 0
+        self.overrun = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not sql.lstrip().upper().startswith(IGNORED_STATEMENTS):
+            self.count += 1
+            if (
+                self.budget is not None
+                and self.count > self.budget
+                and self.overrun is None
+            ):
+                self.overrun = (sql, project_stack())
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def count_queries(budget=None):
+    """Считает запросы ко всем базам внутри блока with."""
+    counter = QueryCounter(budget)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+class QueryBudgetMiddleware:
+    """Пишет в лог запросы, превысившие бюджет представления."""
+
+    def __init__(self, get_response):
+        if not settings.QUERY_BUDGET_DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            request.query_counter = counter
+            response = self.get_response(request)
+
+        if counter.budget is not None and counter.count > counter.budget:
+            sql, stack = counter.overrun
+            logger.warning(
+                'Превышен бюджет запросов %s %s: %d из %d\n'
+                'Первый запрос сверх бюджета: %s\n%s',
+                request.method,
+                view_name(request),
+                counter.count,
+                counter.budget,
+                sql,
+                stack
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_counter.budget = get_query_budget(
+            view_func, request.method
+        )
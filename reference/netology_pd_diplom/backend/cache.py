@@ -0,0 +1,169 @@
+"""Версионный кеш ответов каталога.
+
+Ключ ответа включает номера поколений магазинов и категорий, от которых
+он зависит. Импорт прайс-листа и смена статуса магазина увеличивают эти
+номера, поэтому устаревшие ответы перестают читаться сразу, а не по
+истечении TTL.
+"""
+import hashlib
+import json
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from backend.metrics import record_cache
+
+KEY_PREFIX = 'catalog'
+STATS_EVENTS = ('hit', 'miss')
+
+SHOPS = 'shops'
+CATEGORIES = 'categories'
+PRODUCTS = 'products'
+
+
+def shop_key(shop_id):
+    """Имя счетчика поколений магазина."""
+    return f'shop:{shop_id}'
+
+
+def category_key(category_id):
+    """Имя счетчика поколений категории."""
+    return f'category:{category_id}'
+
+
+def _version_cache_key(name):
+    return f'{KEY_PREFIX}:version:{name}'
+
+
+def get_versions(names):
+    """Возвращает текущие номера поколений одним запросом к кешу.
+
+    Отсутствующий счетчик создается со значением текущего времени в
+    наносекундах, чтобы после вытеснения из кеша не совпасть со старыми
+    ключами ответов.
+    """
+    keys = {_version_cache_key(name): name for name in names}
+    versions = cache.get_many(keys)
+    for key in keys.keys() - versions.keys():
+        cache.add(key, time.time_ns(), None)
+        versions[key] = cache.get(key)
+    return {keys[key]: version for key, version in versions.items()}
+
+
+def bump_versions(*names):
+    """Увеличивает номера поколений, делая зависимые ответы устаревшими."""
+    for name in names:
+        key = _version_cache_key(name)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_catalog(shop_ids=(), category_ids=(), shops=False,
+                 categories=False):
+    """Отмечает изменение каталога магазинов и категорий.
+
+    Счетчики увеличиваются после фиксации текущей транзакции. Иначе
+    параллельный запрос может прочитать новое поколение вместе со
+    старыми данными и закешировать их под новым ключом.
+
+    Args:
+        shop_ids: ID магазинов с измененными товарами
+        category_ids: ID категорий с измененными товарами
+        shops: Изменился список магазинов
+        categories: Изменился список категорий
+    """
+    names = [shop_key(shop_id) for shop_id in set(shop_ids)]
+    names += [category_key(category_id) for category_id in set(category_ids)]
+    if names:
+        names.append(PRODUCTS)
+    if shops:
+        names.append(SHOPS)
+    if categories:
+        names.append(CATEGORIES)
+    transaction.on_commit(lambda: bump_versions(*names))
+
+
+def _stats_key(endpoint, event):
+    return f'{KEY_PREFIX}:stats:{endpoint}:{event}'
+
+
+def record_event(endpoint, event):
+    """Увеличивает счетчик попаданий или промахов эндпоинта."""
+    record_cache(endpoint, event)
+    key = _stats_key(endpoint, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Счетчика еще нет; add() не затирает значение, созданное
+        # параллельным запросом, и не падает на DummyCache
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def cache_stats(endpoints):
+    """Возвращает счетчики попаданий и промахов по эндпоинтам."""
+    keys = {
+        _stats_key(endpoint, event): (endpoint, event)
+        for endpoint in endpoints
+        for event in STATS_EVENTS
+    }
+    values = cache.get_many(keys)
+    stats = {
+        endpoint: dict.fromkeys(STATS_EVENTS, 0) for endpoint in endpoints
+    }
+    for key, value in values.items():
+        endpoint, event = keys[key]
+        stats[endpoint][event] = value
+    return stats
+
+
+def versioned_cache(endpoint, dependencies, params=(), timeout=None):
+    """Кеширует данные ответа метода представления.
+
+    Args:
+        endpoint: Имя эндпоинта для ключей и статистики
+        dependencies: Функция от query_params, возвращающая имена
+            счетчиков поколений, от которых зависит ответ
+        params: Query-параметры, влияющие на ответ
+        timeout: Время жизни ответа, по умолчанию CATALOG_CACHE_TIMEOUT
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            query = request.query_params
+            versions = get_versions(dependencies(query))
+            payload = json.dumps(
+                [
+                    [(name, query.getlist(name)) for name in params],
+                    sorted(versions.items()),
+                ],
+                ensure_ascii=False
+            )
+            key = '{}:response:{}:{}'.format(
+                KEY_PREFIX,
+                endpoint,
+                hashlib.md5(payload.encode()).hexdigest()
+            )
+
+            data = cache.get(key)
+            if data is not None:
+                record_event(endpoint, 'hit')
+                return Response(data)
+
+            record_event(endpoint, 'miss')
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(
+                    key,
+                    response.data,
+                    timeout or settings.CATALOG_CACHE_TIMEOUT
+                )
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,286 @@
+"""Денормализованный каталог товаров для быстрого чтения."""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Case, Count, F, Max, Min, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from backend.models import (
+    CatalogItem,
+    ProductInfo,
+    ProductOffer,
+    ProductParameter
+)
+from backend.search import build_search_document, update_search_vectors
+from backend.util import chunked
+
+CATALOG_UPDATE_FIELDS = (
+    'shop',
+    'shop_name',
+    'shop_state',
+    'product',
+    'product_name',
+    'category',
+    'category_name',
+    'model',
+    'external_id',
+    'quantity',
+    'price',
+    'price_rrc',
+    'parameters',
+    'search_document',
+)
+
+OFFER_UPDATE_FIELDS = (
+    'product_name',
+    'category',
+    'category_name',
+    'min_price',
+    'max_price',
+    'offers',
+    'best_offer',
+    'best_shop',
+    'best_shop_name',
+    'best_price',
+    'best_quantity',
+)
+
+OFFER_VALUES = (
+    'product_id',
+    'product_name',
+    'category_name',
+    'min_price',
+    'max_price',
+    'offers',
+    'best_offer_id',
+    'best_shop_id',
+    'best_shop_name',
+    'best_price',
+    'best_quantity',
+)
+
+CATALOG_VALUES = (
+    'product_info_id',
+    'model',
+    'product_name',
+    'category_name',
+    'shop_id',
+    'quantity',
+    'price',
+    'price_rrc',
+    'parameters',
+)
+
+
+def refresh_catalog(product_info_ids, chunk_size=None):
+    """Пересобирает строки каталога для указанных ProductInfo.
+
+    Строки удаленных ProductInfo удаляются каскадно, поэтому здесь
+    обрабатываются только существующие записи.
+
+    Args:
+        product_info_ids: ID записей ProductInfo
+        chunk_size: Размер пакета, по умолчанию из настроек
+
+    Returns:
+        Количество обновленных строк каталога
+    """
+    chunk_size = chunk_size or settings.PRICE_LIST_IMPORT_CHUNK_SIZE
+    refreshed = 0
+    for chunk in chunked(product_info_ids, chunk_size):
+        parameters = defaultdict(list)
+        for product_info_id, name, value in ProductParameter.objects.filter(
+            product_info_id__in=chunk
+        ).order_by('id').values_list(
+            'product_info_id', 'parameter__name', 'value'
+        ):
+            parameters[product_info_id].append(
+                {'parameter': name, 'value': value}
+            )
+
+        items = [
+            CatalogItem(
+                product_info_id=row['id'],
+                shop_id=row['shop_id'],
+                shop_name=row['shop__name'],
+                shop_state=row['shop__state'],
+                product_id=row['product_id'],
+                product_name=row['product__name'],
+                category_id=row['product__category_id'],
+                category_name=row['product__category__name'],
+                model=row['model'],
+                external_id=row['external_id'],
+                quantity=row['quantity'],
+                price=row['price'],
+                price_rrc=row['price_rrc'],
+                parameters=parameters[row['id']],
+                search_document=build_search_document(
+                    row['product__name'],
+                    row['model'],
+                    parameters[row['id']]
+                ),
+            )
+            for row in ProductInfo.objects.filter(id__in=chunk).values(
+                'id',
+                'shop_id',
+                'shop__name',
+                'shop__state',
+                'product_id',
+                'product__name',
+                'product__category_id',
+                'product__category__name',
+                'model',
+                'external_id',
+                'quantity',
+                'price',
+                'price_rrc',
+            )
+        ]
+        # Товар мог перейти к другому продукту, сводку прежнего тоже
+        # нужно пересчитать
+        product_ids = set(CatalogItem.objects.filter(
+            product_info_id__in=chunk
+        ).values_list('product_id', flat=True))
+        CatalogItem.objects.bulk_create(
+            items,
+            update_conflicts=True,
+            unique_fields=['product_info'],
+            update_fields=CATALOG_UPDATE_FIELDS,
+        )
+        update_search_vectors(chunk)
+        product_ids.update(item.product_id for item in items)
+        refresh_offers(product_ids, chunk_size)
+        refreshed += len(items)
+    return refreshed
+
+
+def rebuild_catalog(chunk_size=None):
+    """Полностью пересобирает каталог и сводки предложений."""
+    refreshed = refresh_catalog(
+        ProductInfo.objects.order_by('id').values_list(
+            'id', flat=True
+        ).iterator(),
+        chunk_size=chunk_size
+    )
+    ProductOffer.objects.exclude(
+        product_id__in=CatalogItem.objects.filter(
+            shop_state=True
+        ).values('product_id')
+    ).delete()
+    return refreshed
+
+
+def refresh_offers(product_ids, chunk_size=None):
+    """Пересчитывает сводки предложений по продуктам.
+
+    Цены и число предложений считаются оконными функциями по строкам
+    каталога открытых магазинов, лучшее предложение - первая строка
+    продукта при сортировке: в наличии, дешевле, раньше добавлено.
+    Сводки продуктов без предложений удаляются.
+
+    Args:
+        product_ids: ID продуктов
+        chunk_size: Размер пакета, по умолчанию из настроек
+    """
+    chunk_size = chunk_size or settings.PRICE_LIST_IMPORT_CHUNK_SIZE
+    partition = [F('product_id')]
+    for chunk in chunked(product_ids, chunk_size):
+        rows = CatalogItem.objects.filter(
+            product_id__in=chunk,
+            shop_state=True
+        ).annotate(
+            min_price=Window(Min('price'), partition_by=partition),
+            max_price=Window(Max('price'), partition_by=partition),
+            offers=Window(Count('product_info_id'), partition_by=partition),
+            position=Window(
+                RowNumber(),
+                partition_by=partition,
+                order_by=[
+                    Case(
+                        When(quantity__gt=0, then=Value(0)),
+                        default=Value(1)
+                    ).asc(),
+                    F('price').asc(),
+                    F('product_info_id').asc(),
+                ]
+            ),
+        ).filter(position=1).values(
+            'product_id',
+            'product_name',
+            'category_id',
+            'category_name',
+            'min_price',
+            'max_price',
+            'offers',
+            'product_info_id',
+            'shop_id',
+            'shop_name',
+            'price',
+            'quantity',
+        )
+
+        offers = []
+        for row in rows:
+            in_stock = row['quantity'] > 0
+            offers.append(ProductOffer(
+                product_id=row['product_id'],
+                product_name=row['product_name'],
+                category_id=row['category_id'],
+                category_name=row['category_name'],
+                min_price=row['min_price'],
+                max_price=row['max_price'],
+                offers=row['offers'],
+                best_offer_id=row['product_info_id'] if in_stock else None,
+                best_shop_id=row['shop_id'] if in_stock else None,
+                best_shop_name=row['shop_name'] if in_stock else '',
+                best_price=row['price'] if in_stock else None,
+                best_quantity=row['quantity'] if in_stock else None,
+            ))
+        ProductOffer.objects.bulk_create(
+            offers,
+            update_conflicts=True,
+            unique_fields=['product'],
+            update_fields=OFFER_UPDATE_FIELDS,
+        )
+        ProductOffer.objects.filter(product_id__in=chunk).exclude(
+            product_id__in=[offer.product_id for offer in offers]
+        ).delete()
+
+
+def catalog_item_data(row):
+    """Преобразует строку каталога в формат ProductInfoSerializer."""
+    return {
+        'id': row['product_info_id'],
+        'model': row['model'],
+        'product': {
+            'name': row['product_name'],
+            'category': row['category_name'],
+        },
+        'shop': row['shop_id'],
+        'quantity': row['quantity'],
+        'price': row['price'],
+        'price_rrc': row['price_rrc'],
+        'product_parameters': row['parameters'],
+    }
+
+
+def offer_data(row):
+    """Преобразует строку OFFER_VALUES в формат выдачи сравнения цен."""
+    best_offer = None
+    if row['best_offer_id'] is not None:
+        best_offer = {
+            'id': row['best_offer_id'],
+            'shop': row['best_shop_id'],
+            'shop_name': row['best_shop_name'],
+            'price': row['best_price'],
+            'quantity': row['best_quantity'],
+        }
+    return {
+        'id': row['product_id'],
+        'name': row['product_name'],
+        'category': row['category_name'],
+        'min_price': row['min_price'],
+        'max_price': row['max_price'],
+        'offers': row['offers'],
+        'best_offer': best_offer,
+    }
@@ -1,15 +1,29 @@
-from celery import shared_task
+import uuid
+
+from celery import chord, group, shared_task
+from celery.exceptions import Ignore
+from django.core.files.storage import default_storage
 from django.core.mail import EmailMultiAlternatives
-from yaml import load as load_yaml, Loader
-from backend.models import (
-    Shop,
-    Category,
-    Product,
-    ProductInfo,
-    Parameter,
-    ProductParameter
+from django.db import transaction
+from backend.export import EXPORT_YAML, export_price_list
+from backend.importer import (
+    IMPORT_COUNTERS,
+    MODE_SYNC,
+    PriceListImporter,
+    start_import
+)
+from backend.mail import drain_email_queue
+from backend.models import Shop
+from backend.notifications import relay_notifications
+from backend.price_list import (
+    FORMAT_YAML,
+    delete_files,
+    is_url,
+    open_source,
+    read_goods_chunk,
+    read_price_list,
+    save_goods_chunks
 )
-from backend.serializers import PartnerExportSerializer
 
 
 @shared_task
@@ -24,54 +38,104 @@ def send_email(title, message, sender, recipients):
     email.send()
 
 
-@shared_task
-def partner_export(user_id):
-    """Экспорт данных партнера в фоновом режиме."""
-    shop = Shop.objects.filter(user_id=user_id).first()
-    return PartnerExportSerializer(shop).data
+@shared_task(ignore_result=True)
+def send_queued_emails():
+    """Периодическая пакетная отправка писем из очереди."""
+    return drain_email_queue()
+
+
+@shared_task(ignore_result=True)
+def relay_order_notifications():
+    """Периодический перенос событий заказов в очередь писем."""
+    return relay_notifications()
 
 
 @shared_task
-def partner_update(stream, user_id):
-    """Фоновое обновление прайс-листа партнера."""
-    data = load_yaml(stream, Loader=Loader)
-
-    # Обновление магазина и категорий
-    shop, _ = Shop.objects.get_or_create(name=data['shop'], user_id=user_id)
-
-    for category in data['categories']:
-        category_obj, _ = Category.objects.get_or_create(
-            id=category['id'],
-            name=category['name']
-        )
-        category_obj.shops.add(shop.id)
-        category_obj.save()
-
-    # Очистка старых товаров
-    ProductInfo.objects.filter(shop_id=shop.id).delete()
-
-    # Импорт новых товаров
-    for item in data['goods']:
-        product, _ = Product.objects.get_or_create(
-            name=item['name'],
-            category_id=item['category']
-        )
-
-        product_info = ProductInfo.objects.create(
-            product_id=product.id,
-            external_id=item['id'],
-            model=item['model'],
-            price=item['price'],
-            price_rrc=item['price_rrc'],
-            quantity=item['quantity'],
-            shop_id=shop.id
-        )
-
-        # Обработка параметров товара
-        for name, value in item['parameters'].items():
-            param, _ = Parameter.objects.get_or_create(name=name)
-            ProductParameter.objects.create(
-                product_info_id=product_info.id,
-                parameter_id=param.id,
-                value=value
+def partner_export(user_id, fmt=EXPORT_YAML, path=None):
+    """Экспорт прайс-листа партнера в файл в фоновом режиме.
+
+    Файл пишется по пути path, который представление уже вернуло
+    клиенту. Результат задачи содержит только путь и URL файла, сами
+    данные через хранилище результатов Celery не передаются.
+    """
+    shop = Shop.objects.get(user_id=user_id)
+    path = export_price_list(shop, fmt, path)
+    return {'shop': shop.id, 'path': path, 'url': default_storage.url(path)}
+
+
+@shared_task(bind=True)
+def partner_update(self, source, user_id, fmt=FORMAT_YAML, mode=MODE_SYNC):
+    """Фоновое обновление прайс-листа партнера.
+
+    Прайс-лист читается потоково по URL или из хранилища и разбивается
+    на пакеты, которые импортируются параллельно задачами
+    partner_update_chunk. Итоговую статистику собирает
+    partner_update_finalize, ее результат доступен по ID этой задачи.
+    """
+    import_id = uuid.uuid4().hex
+    chunks = []
+    try:
+        with open_source(source) as stream:
+            data = read_price_list(stream, fmt)
+            importer = start_import(data, user_id, mode=mode)
+            chunks, external_ids = save_goods_chunks(
+                data['goods'],
+                import_id,
+                importer.chunk_size
             )
+        importer.seen_external_ids.update(external_ids)
+
+        # Пакеты содержат только товары из прайс-листа, поэтому удаление
+        # отсутствующих не пересекается с их импортом
+        importer.delete_missing()
+    except BaseException:
+        # Пакеты, которые не попадут в хорд, некому удалить
+        delete_files(chunks)
+        raise
+    finally:
+        if not is_url(source):
+            default_storage.delete(source)
+
+    stats = {'shop': importer.shop.id, **importer.stats}
+    if not chunks:
+        return stats
+    try:
+        return self.replace(chord(
+            group(
+                partner_update_chunk.s(importer.shop.id, path)
+                for path in chunks
+            ),
+            partner_update_finalize.s(stats)
+        ))
+    except Ignore:
+        # Так replace завершает задачу после отправки хорда
+        raise
+    except BaseException:
+        delete_files(chunks)
+        raise
+
+
+@shared_task
+def partner_update_chunk(shop_id, path):
+    """Импорт одного пакета товаров прайс-листа.
+
+    Файл пакета удаляется и при ошибке импорта, иначе после сбоя хорда
+    он остался бы в хранилище.
+    """
+    try:
+        goods = read_goods_chunk(path)
+        importer = PriceListImporter(Shop.objects.get(id=shop_id))
+        with transaction.atomic():
+            importer.import_chunk(goods)
+    finally:
+        default_storage.delete(path)
+    return importer.stats
+
+
+@shared_task
+def partner_update_finalize(results, stats):
+    """Суммирует статистику пакетов импорта прайс-листа."""
+    for chunk_stats in results:
+        for key in IMPORT_COUNTERS:
+            stats[key] += chunk_stats[key]
+    return stats
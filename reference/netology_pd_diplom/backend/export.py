@@ -0,0 +1,176 @@
+"""Выгрузка прайс-листа магазина в файл.
+
+Файл пишется потоково из каталога CatalogItem и хранится под именем,
+включающим номера поколений каталога. Пока товары магазина и категории
+не меняются, повторная выгрузка отдает готовый файл.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import yaml
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from backend.cache import CATEGORIES, get_versions, shop_key
+from backend.models import CatalogItem
+
+try:
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeDumper
+
+EXPORT_DIR = 'exports'
+
+EXPORT_YAML = 'yaml'
+EXPORT_JSON = 'json'
+EXPORT_FORMATS = (EXPORT_YAML, EXPORT_JSON)
+
+
+def export_path(shop_id, fmt):
+    """Возвращает путь к файлу выгрузки для текущей версии каталога."""
+    versions = get_versions([shop_key(shop_id), CATEGORIES])
+    digest = hashlib.md5(
+        json.dumps(sorted(versions.items())).encode()
+    ).hexdigest()
+    return f'{EXPORT_DIR}/shop-{shop_id}-{digest}.{fmt}'
+
+
+def iter_goods(shop_id):
+    """Возвращает товары магазина в формате PartnerProductInfoSerializer."""
+    rows = CatalogItem.objects.filter(shop_id=shop_id).order_by(
+        'product_info'
+    ).values_list(
+        'product_info_id',
+        'category_name',
+        'model',
+        'product_name',
+        'price',
+        'price_rrc',
+        'quantity',
+        'parameters',
+    ).iterator(chunk_size=settings.CATALOG_STREAM_CHUNK_SIZE)
+    for (
+        product_info_id, category, model, name, price, price_rrc, quantity,
+        parameters
+    ) in rows:
+        yield {
+            'id': product_info_id,
+            'category': category,
+            'model': model,
+            'name': name,
+            'price': price,
+            'price_rrc': price_rrc,
+            'quantity': quantity,
+            'parameters': [
+                {parameter['parameter']: parameter['value']}
+                for parameter in parameters
+            ],
+        }
+
+
+def write_export(shop, stream, fmt=EXPORT_YAML):
+    """Пишет прайс-лист магазина в бинарный поток.
+
+    Args:
+        shop: Экземпляр Shop
+        stream: Файловый объект, открытый на запись в бинарном режиме
+        fmt: Формат выгрузки, yaml или json
+    """
+    categories = list(shop.categories.values('id', 'name'))
+    goods = iter_goods(shop.id)
+    if fmt == EXPORT_JSON:
+        _write_json(stream, shop.name, categories, goods)
+    else:
+        _write_yaml(stream, shop.name, categories, goods)
+
+
+def _write_json(stream, name, categories, goods):
+    dumps = json.JSONEncoder(ensure_ascii=False).encode
+    stream.write(
+        f'{{"shop": {dumps(name)}, "categories": {dumps(categories)}, '
+        f'"goods": ['.encode()
+    )
+    for number, item in enumerate(goods):
+        stream.write(((',' if number else '') + dumps(item)).encode())
+    stream.write(b']}')
+
+
+def _write_yaml(stream, name, categories, goods):
+    def dump(data):
+        stream.write(yaml.dump(
+            data,
+            Dumper=SafeDumper,
+            allow_unicode=True,
+            sort_keys=False
+        ).encode())
+
+    dump({'shop': name, 'categories': categories})
+    first = next(goods, None)
+    if first is None:
+        stream.write(b'goods: []\n')
+        return
+    stream.write(b'goods:\n')
+    dump([first])
+    for item in goods:
+        dump([item])
+
+
+def export_ready_key(path):
+    """Ключ кеша с отметкой о готовности файла выгрузки."""
+    return f'export:ready:{path}'
+
+
+def is_export_ready(path):
+    """Проверяет, что файл выгрузки уже сохранен в хранилище.
+
+    Готовность отмечается в общем кеше, поэтому веб-процессу не нужно
+    обращаться к хранилищу, в которое пишет воркер Celery.
+    """
+    return bool(cache.get(export_ready_key(path)))
+
+
+def export_price_list(shop, fmt=EXPORT_YAML, path=None):
+    """Сохраняет выгрузку прайс-листа в хранилище.
+
+    Если файл для текущей версии каталога уже есть, он используется
+    повторно. Выгрузки прежних версий удаляются.
+
+    Args:
+        shop: Экземпляр Shop
+        fmt: Формат выгрузки, yaml или json
+        path: Путь к файлу, по умолчанию для текущей версии каталога
+
+    Returns:
+        Путь к файлу в хранилище
+    """
+    path = path or export_path(shop.id, fmt)
+    if default_storage.exists(path):
+        cache.set(export_ready_key(path), True, settings.CATALOG_CACHE_TIMEOUT)
+        return path
+
+    with tempfile.TemporaryFile() as stream:
+        write_export(shop, stream, fmt)
+        stream.seek(0)
+        saved = default_storage.save(path, File(stream))
+    cache.set(export_ready_key(path), True, settings.CATALOG_CACHE_TIMEOUT)
+    if saved != path:
+        # Файл этой версии уже сохранила параллельная выгрузка
+        default_storage.delete(saved)
+        return path
+
+    prefix = f'shop-{shop.id}-'
+    _, files = default_storage.listdir(EXPORT_DIR)
+    for name in files:
+        stale = f'{EXPORT_DIR}/{name}'
+        if (
+            name.startswith(prefix)
+            and os.path.splitext(name)[1] == f'.{fmt}'
+            and stale != path
+        ):
+            default_storage.delete(stale)
+            cache.delete(export_ready_key(stale))
+    return path
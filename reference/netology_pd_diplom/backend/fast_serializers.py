@@ -0,0 +1,118 @@
+"""Быстрая сериализация для нагруженных эндпоинтов чтения.
+
+Данные собираются напрямую из строк .values_list() без полей DRF и
+совпадают с выводом ProductInfoSerializer, OrderSerializer и
+ContactSerializer. Вложенные объекты загружаются отдельными запросами
+на всю выборку, а не на каждый объект.
+"""
+from rest_framework import serializers
+
+from backend.catalog import CATALOG_VALUES, catalog_item_data
+from backend.models import CatalogItem, Contact, OrderItem, ProductInfo
+from backend.serializers import ProductInfoSerializer
+
+CONTACT_FIELDS = (
+    'id',
+    'city',
+    'street',
+    'house',
+    'structure',
+    'building',
+    'apartment',
+    'phone',
+)
+
+ORDER_FIELDS = ('id', 'state', 'dt', 'total_sum', 'items_count')
+
+_datetime = serializers.DateTimeField().to_representation
+
+
+def contact_data(row):
+    """Преобразует кортеж CONTACT_FIELDS в формат ContactSerializer."""
+    return dict(zip(CONTACT_FIELDS, row))
+
+
+def contacts_data(queryset):
+    """Сериализует выборку Contact как ContactSerializer(many=True)."""
+    return [
+        contact_data(row)
+        for row in queryset.values_list(*CONTACT_FIELDS)
+    ]
+
+
+def product_infos_data(product_info_ids):
+    """Возвращает товары в формате ProductInfoSerializer по ID.
+
+    Товары, которых еще нет в CatalogItem, сериализуются
+    ProductInfoSerializer.
+    """
+    data = {
+        row['product_info_id']: catalog_item_data(row)
+        for row in CatalogItem.objects.filter(
+            product_info_id__in=product_info_ids
+        ).values(*CATALOG_VALUES)
+    }
+    missing = set(product_info_ids) - data.keys()
+    if missing:
+        product_infos = ProductInfo.objects.filter(
+            id__in=missing
+        ).select_related('product__category').prefetch_related(
+            'product_parameters__parameter'
+        )
+        for product_info in product_infos:
+            data[product_info.id] = ProductInfoSerializer(product_info).data
+    return data
+
+
+def orders_data(queryset, items=None):
+    """Сериализует выборку Order как OrderSerializer(many=True).
+
+    Args:
+        queryset: QuerySet заказов в нужном порядке
+        items: QuerySet позиций, по умолчанию все позиции заказов
+
+    Returns:
+        Список словарей заказов
+    """
+    orders = list(queryset.values_list(*ORDER_FIELDS, 'contact_id'))
+    if not orders:
+        return []
+    if items is None:
+        items = OrderItem.objects.all()
+    item_rows = list(items.filter(
+        order_id__in=[row[0] for row in orders]
+    ).order_by('id').values_list(
+        'order_id', 'id', 'product_info_id', 'quantity', 'price'
+    ))
+
+    product_infos = product_infos_data(
+        {row[2] for row in item_rows}
+    )
+    contacts = {
+        row[0]: contact_data(row)
+        for row in Contact.objects.filter(
+            id__in={row[-1] for row in orders if row[-1]}
+        ).values_list(*CONTACT_FIELDS)
+    }
+
+    ordered_items = {row[0]: [] for row in orders}
+    for order_id, item_id, product_info_id, quantity, price in item_rows:
+        ordered_items[order_id].append({
+            'id': item_id,
+            'product_info': product_infos[product_info_id],
+            'quantity': quantity,
+            'price': price,
+        })
+
+    return [
+        {
+            'id': order_id,
+            'ordered_items': ordered_items[order_id],
+            'state': state,
+            'dt': _datetime(dt),
+            'total_sum': total_sum,
+            'items_count': items_count,
+            'contact': contacts.get(contact_id),
+        }
+        for order_id, state, dt, total_sum, items_count, contact_id in orders
+    ]
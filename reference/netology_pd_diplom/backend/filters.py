@@ -0,0 +1,167 @@
+"""Фасетный поиск по каталогу.
+
+Фильтр по параметру передается как param=Название:значение или
+param=Название:мин..макс для числовых значений, одна из границ может
+отсутствовать. Значения одного параметра объединяются через ИЛИ,
+разные параметры - через И. Каждый параметр проверяется подзапросом
+по индексу ProductParameter(parameter, value, product_info).
+"""
+from itertools import groupby
+
+from django.db.models import Count, Q
+
+from backend.models import Parameter, ProductParameter
+from backend.util import parse_number
+
+RANGE_SEPARATOR = '..'
+
+
+def _parse_range(value):
+    """Возвращает границы диапазона или None, если это не диапазон."""
+    if RANGE_SEPARATOR not in value:
+        return None
+    low, _, high = value.partition(RANGE_SEPARATOR)
+    bounds = []
+    for bound in (low, high):
+        number = parse_number(bound) if bound.strip() else None
+        if bound.strip() and number is None:
+            return None
+        bounds.append(number)
+    if bounds == [None, None]:
+        return None
+    return tuple(bounds)
+
+
+def _parse_price(query_params, name):
+    value = query_params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        price = int(value)
+    except ValueError:
+        raise ValueError(f'{name} должен быть целым числом') from None
+    if price < 0:
+        raise ValueError(f'{name} не может быть отрицательным')
+    return price
+
+
+def parse_catalog_filters(query_params):
+    """Разбирает фильтры каталога из query-параметров.
+
+    Args:
+        query_params: QueryDict запроса
+
+    Returns:
+        Словарь с ключами parameters ({название: [значение или
+        (мин, макс)]}), price_min и price_max
+
+    Raises:
+        ValueError: Если фильтр задан в неверном формате
+    """
+    parameters = {}
+    for item in query_params.getlist('param'):
+        name, separator, value = item.partition(':')
+        name, value = name.strip(), value.strip()
+        if not (separator and name and value):
+            raise ValueError(
+                f'Неверный фильтр "{item}", ожидается Название:значение'
+            )
+        parameters.setdefault(name, []).append(_parse_range(value) or value)
+
+    price_min = _parse_price(query_params, 'price_min')
+    price_max = _parse_price(query_params, 'price_max')
+    if None not in (price_min, price_max) and price_min > price_max:
+        raise ValueError('price_min больше price_max')
+    return {
+        'parameters': parameters,
+        'price_min': price_min,
+        'price_max': price_max,
+    }
+
+
+def _parameter_ids(filters):
+    return Parameter.objects.filter(
+        name__in=list(filters['parameters'])
+    ).order_by().values_list('name', 'id')
+
+
+def filter_catalog(queryset, filters):
+    """Применяет разобранные фильтры к выборке CatalogItem."""
+    parameter_ids = {}
+    if filters['parameters']:
+        parameter_ids = dict(_parameter_ids(filters))
+    return _apply_filters(queryset, filters, parameter_ids)
+
+
+async def afilter_catalog(queryset, filters):
+    """Асинхронный вариант filter_catalog для асинхронных представлений."""
+    parameter_ids = {}
+    if filters['parameters']:
+        parameter_ids = {
+            name: parameter_id
+            async for name, parameter_id in _parameter_ids(filters)
+        }
+    return _apply_filters(queryset, filters, parameter_ids)
+
+
+def _apply_filters(queryset, filters, parameter_ids):
+    if filters['price_min'] is not None:
+        queryset = queryset.filter(price__gte=filters['price_min'])
+    if filters['price_max'] is not None:
+        queryset = queryset.filter(price__lte=filters['price_max'])
+    for name, values in filters['parameters'].items():
+        if name not in parameter_ids:
+            return queryset.none()
+        condition = Q()
+        exact = [value for value in values if isinstance(value, str)]
+        if exact:
+            condition |= Q(value__in=exact)
+        for bounds in values:
+            if isinstance(bounds, tuple):
+                condition |= _range_condition(*bounds)
+        queryset = queryset.filter(
+            product_info_id__in=ProductParameter.objects.filter(
+                condition,
+                parameter_id=parameter_ids[name]
+            ).values('product_info_id')
+        )
+    return queryset
+
+
+def _range_condition(low, high):
+    condition = Q()
+    if low is not None:
+        condition &= Q(value_numeric__gte=low)
+    if high is not None:
+        condition &= Q(value_numeric__lte=high)
+    return condition
+
+
+def catalog_facets(queryset):
+    """Считает товары выборки по значениям параметров.
+
+    Все счетчики получаются одним запросом с группировкой по паре
+    (параметр, значение).
+
+    Returns:
+        Список параметров со значениями и количеством товаров,
+        значения упорядочены по убыванию количества
+    """
+    rows = ProductParameter.objects.filter(
+        product_info_id__in=queryset.values('product_info_id')
+    ).values('parameter__name', 'value').annotate(
+        count=Count('product_info_id')
+    ).order_by('parameter__name', '-count', 'value')
+    return [
+        {
+            'parameter': name,
+            'values': [
+                {'value': row['value'], 'count': row['count']}
+                for row in group
+            ],
+        }
+        for name, group in groupby(
+            rows,
+            key=lambda row: row['parameter__name']
+        )
+    ]
@@ -0,0 +1,425 @@
+"""Пакетный импорт прайс-листов партнеров."""
+from django.conf import settings
+from django.db import transaction
+
+from backend.cache import bump_catalog
+from backend.catalog import refresh_catalog, refresh_offers
+from backend.models import (
+    CatalogItem,
+    Order,
+    Shop,
+    Category,
+    Product,
+    ProductInfo,
+    ProductOffer,
+    Parameter,
+    ProductParameter
+)
+from backend.util import chunked, parse_number
+
+PRODUCT_INFO_FIELDS = (
+    'product_id',
+    'model',
+    'price',
+    'price_rrc',
+    'quantity',
+)
+
+IMPORT_COUNTERS = (
+    'created',
+    'updated',
+    'unchanged',
+    'deleted',
+    'parameters_created',
+    'parameters_updated',
+    'parameters_deleted',
+)
+
+MODE_SYNC = 'sync'
+MODE_REPLACE = 'replace'
+IMPORT_MODES = (MODE_SYNC, MODE_REPLACE)
+
+
+class PriceListImporter:
+    """Импорт товаров магазина пакетами фиксированного размера.
+
+    Существующие категории, продукты и параметры загружаются в словари
+    один раз, после чего каждый пакет товаров сравнивается с базой и
+    записывается несколькими пакетными запросами вместо запросов на
+    каждую строку.
+    """
+
+    def __init__(self, shop, chunk_size=None):
+        self.shop = shop
+        self.chunk_size = (
+            chunk_size or settings.PRICE_LIST_IMPORT_CHUNK_SIZE
+        )
+        self.products = {}
+        self.parameters = {}
+        self.seen_external_ids = set()
+        self.stats = dict.fromkeys(('categories', *IMPORT_COUNTERS), 0)
+
+    def preload(self, category_ids):
+        """Загружает существующие продукты и параметры в память."""
+        self.products.update(
+            ((name, category_id), product_id)
+            for product_id, name, category_id in Product.objects.filter(
+                category_id__in=category_ids
+            ).values_list('id', 'name', 'category_id')
+        )
+        self.parameters.update(
+            (name, parameter_id)
+            for parameter_id, name in Parameter.objects.values_list(
+                'id', 'name'
+            )
+        )
+
+    def import_categories(self, categories):
+        """Создает недостающие категории и привязывает их к магазину."""
+        names = {category['id']: category['name'] for category in categories}
+        existing = Category.objects.in_bulk(list(names))
+        changed = []
+        for category_id, category in existing.items():
+            if category.name != names[category_id]:
+                category.name = names[category_id]
+                changed.append(category)
+        Category.objects.bulk_update(changed, ['name'])
+        for category in changed:
+            CatalogItem.objects.filter(category_id=category.id).update(
+                category_name=category.name
+            )
+            ProductOffer.objects.filter(category_id=category.id).update(
+                category_name=category.name
+            )
+        created = Category.objects.bulk_create(
+            [
+                Category(id=category_id, name=name)
+                for category_id, name in names.items()
+                if category_id not in existing
+            ],
+            ignore_conflicts=True
+        )
+        Category.shops.through.objects.bulk_create(
+            [
+                Category.shops.through(
+                    category_id=category_id,
+                    shop_id=self.shop.id
+                )
+                for category_id in names
+            ],
+            ignore_conflicts=True
+        )
+        self.preload(list(names))
+        self.stats['categories'] = len(names)
+        if created or changed:
+            bump_catalog(
+                category_ids=[category.id for category in changed],
+                categories=True
+            )
+
+    def import_goods(self, goods):
+        """Импортирует товары пакетами по chunk_size штук."""
+        for chunk in chunked(goods, self.chunk_size):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+        return self.stats
+
+    def import_chunk(self, items):
+        """Сравнивает пакет товаров с базой и записывает только отличия.
+
+        Товары сопоставляются по паре (магазин, external_id): новые
+        создаются, у найденных обновляются только изменившиеся поля.
+        """
+        items = list({item['id']: item for item in items}.values())
+        self._ensure_products(items)
+        self._ensure_parameters(items)
+
+        existing = {}
+        for row in ProductInfo.objects.filter(
+            shop_id=self.shop.id,
+            external_id__in=[item['id'] for item in items]
+        ).order_by('-id').values_list(
+            'id', 'external_id', *PRODUCT_INFO_FIELDS
+        ):
+            existing[row[1]] = row
+
+        created, changed, changed_fields = [], [], set()
+        for item in items:
+            values = dict(zip(PRODUCT_INFO_FIELDS, (
+                self.products[(item['name'], item['category'])],
+                item['model'],
+                item['price'],
+                item['price_rrc'],
+                item['quantity'],
+            )))
+            row = existing.get(item['id'])
+            if row is None:
+                created.append(ProductInfo(
+                    shop_id=self.shop.id,
+                    external_id=item['id'],
+                    **values
+                ))
+                continue
+            fields = [
+                field for field, old in zip(PRODUCT_INFO_FIELDS, row[2:])
+                if values[field] != old
+            ]
+            if fields:
+                changed_fields.update(fields)
+                changed.append(ProductInfo(
+                    id=row[0],
+                    **{field: values[field] for field in fields}
+                ))
+
+        ProductInfo.objects.bulk_create(created, batch_size=self.chunk_size)
+        if changed:
+            ProductInfo.objects.bulk_update(
+                changed,
+                sorted(changed_fields),
+                batch_size=self.chunk_size
+            )
+        if 'price' in changed_fields:
+            Order.refresh_totals(Order.baskets_with(
+                [info.id for info in changed if info.price is not None]
+            ))
+        self.stats['created'] += len(created)
+        self.stats['updated'] += len(changed)
+        self.stats['unchanged'] += len(existing) - len(changed)
+
+        product_info_ids = {
+            external_id: row[0] for external_id, row in existing.items()
+        }
+        if created:
+            product_info_ids.update(
+                (external_id, product_info_id)
+                for product_info_id, external_id
+                in ProductInfo.objects.filter(
+                    shop_id=self.shop.id,
+                    external_id__in=[info.external_id for info in created]
+                ).values_list('id', 'external_id')
+            )
+        self.seen_external_ids.update(product_info_ids)
+        touched = self._sync_parameters(items, product_info_ids, existing)
+        touched.update(info.id for info in changed)
+        touched.update(
+            product_info_ids[info.external_id] for info in created
+        )
+        if touched:
+            # Товар, перенесенный в другую категорию, пропадает из
+            # выдачи прежней, поэтому ее категория берется из каталога
+            # до пересборки
+            category_ids = {item['category'] for item in items}
+            category_ids.update(CatalogItem.objects.filter(
+                product_info_id__in=[
+                    info.id for info in changed
+                    if info.product_id is not None
+                ]
+            ).values_list('category_id', flat=True))
+            refresh_catalog(sorted(touched), self.chunk_size)
+            bump_catalog(shop_ids=[self.shop.id], category_ids=category_ids)
+
+    def _sync_parameters(self, items, product_info_ids, existing):
+        """Синхронизирует параметры товаров пакета.
+
+        Returns:
+            Множество ID ProductInfo с измененными параметрами
+        """
+        incoming = {
+            (
+                product_info_ids[item['id']],
+                self.parameters[name]
+            ): str(value)
+            for item in items
+            for name, value in item['parameters'].items()
+        }
+        current = {
+            (product_info_id, parameter_id): (parameter_value_id, value)
+            for parameter_value_id, product_info_id, parameter_id, value
+            in ProductParameter.objects.filter(
+                product_info_id__in=[row[0] for row in existing.values()]
+            ).values_list('id', 'product_info_id', 'parameter_id', 'value')
+        }
+
+        created, changed = [], []
+        for key, value in incoming.items():
+            if key not in current:
+                created.append(ProductParameter(
+                    product_info_id=key[0],
+                    parameter_id=key[1],
+                    value=value,
+                    value_numeric=parse_number(value)
+                ))
+            elif current[key][1] != value:
+                changed.append(ProductParameter(
+                    id=current[key][0],
+                    value=value,
+                    value_numeric=parse_number(value)
+                ))
+        deleted = [
+            parameter_value_id
+            for key, (parameter_value_id, _) in current.items()
+            if key not in incoming
+        ]
+
+        ProductParameter.objects.bulk_create(
+            created,
+            batch_size=self.chunk_size
+        )
+        ProductParameter.objects.bulk_update(
+            changed,
+            ['value', 'value_numeric'],
+            batch_size=self.chunk_size
+        )
+        ProductParameter.objects.filter(id__in=deleted).delete()
+        self.stats['parameters_created'] += len(created)
+        self.stats['parameters_updated'] += len(changed)
+        self.stats['parameters_deleted'] += len(deleted)
+        return {
+            key[0] for key in incoming
+            if key not in current or current[key][1] != incoming[key]
+        } | {
+            key[0] for key in current if key not in incoming
+        }
+
+    def delete_missing(self):
+        """Удаляет товары магазина, отсутствующие в прайс-листе."""
+        stale = [
+            product_info_id
+            for product_info_id, external_id in ProductInfo.objects.filter(
+                shop_id=self.shop.id
+            ).values_list('id', 'external_id').iterator()
+            if external_id not in self.seen_external_ids
+        ]
+        for chunk in chunked(stale, self.chunk_size):
+            baskets = Order.baskets_with(chunk)
+            product_infos = ProductInfo.objects.filter(id__in=chunk)
+            product_ids = set(product_infos.values_list(
+                'product_id', flat=True
+            ))
+            product_infos.delete()
+            Order.refresh_totals(baskets)
+            refresh_offers(product_ids, self.chunk_size)
+        self.stats['deleted'] += len(stale)
+        if stale:
+            bump_catalog(
+                shop_ids=[self.shop.id],
+                category_ids=self.shop.categories.values_list(
+                    'id', flat=True
+                )
+            )
+        return stale
+
+    def _ensure_products(self, items):
+        """Находит или создает отсутствующие в словаре продукты.
+
+        Продукты создаются с ignore_conflicts, поэтому пакеты одного
+        прайс-листа можно импортировать параллельно.
+        """
+        missing = {
+            (item['name'], item['category'])
+            for item in items
+            if (item['name'], item['category']) not in self.products
+        }
+        if not missing:
+            return
+        self._load_products(missing)
+        missing.difference_update(self.products)
+        if not missing:
+            return
+        Product.objects.bulk_create(
+            [
+                Product(name=name, category_id=category_id)
+                for name, category_id in missing
+            ],
+            batch_size=self.chunk_size,
+            ignore_conflicts=True
+        )
+        self._load_products(missing)
+
+    def _load_products(self, keys):
+        """Загружает ID продуктов по парам (название, категория)."""
+        for product_id, name, category_id in Product.objects.filter(
+            name__in={name for name, _ in keys},
+            category_id__in={category_id for _, category_id in keys}
+        ).values_list('id', 'name', 'category_id'):
+            if (name, category_id) in keys:
+                self.products[(name, category_id)] = product_id
+
+    def _ensure_parameters(self, items):
+        """Находит или создает отсутствующие в словаре параметры."""
+        missing = {
+            name
+            for item in items
+            for name in item['parameters']
+            if name not in self.parameters
+        }
+        if not missing:
+            return
+        Parameter.objects.bulk_create(
+            [Parameter(name=name) for name in missing],
+            ignore_conflicts=True
+        )
+        self.parameters.update(
+            (name, parameter_id)
+            for parameter_id, name in Parameter.objects.filter(
+                name__in=missing
+            ).values_list('id', 'name')
+        )
+
+
+def start_import(data, user_id, chunk_size=None, mode=MODE_SYNC):
+    """Готовит импорт: магазин, категории и очистка в режиме replace.
+
+    Args:
+        data: Прайс-лист с ключами shop и categories
+        user_id: ID пользователя-владельца магазина
+        chunk_size: Размер пакета записи, по умолчанию из настроек
+        mode: Режим импорта, sync или replace
+
+    Returns:
+        Экземпляр PriceListImporter, готовый к импорту товаров
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f'Неизвестный режим импорта: {mode}')
+
+    shop, _ = Shop.objects.get_or_create(name=data['shop'], user_id=user_id)
+    importer = PriceListImporter(shop, chunk_size=chunk_size)
+    importer.import_categories(data['categories'])
+
+    if mode == MODE_REPLACE:
+        # Очистка старых товаров
+        product_infos = ProductInfo.objects.filter(shop_id=shop.id)
+        baskets = Order.baskets_with(product_infos.values('id'))
+        product_ids = set(product_infos.values_list('product_id', flat=True))
+        importer.stats['deleted'] = product_infos.delete()[1].get(
+            ProductInfo._meta.label, 0
+        )
+        Order.refresh_totals(baskets)
+        refresh_offers(product_ids, chunk_size)
+        bump_catalog(
+            shop_ids=[shop.id],
+            category_ids=shop.categories.values_list('id', flat=True)
+        )
+    return importer
+
+
+def import_price_list(data, user_id, chunk_size=None, mode=MODE_SYNC):
+    """Обновляет товары магазина данными прайс-листа.
+
+    В режиме sync записываются только отличия от текущего каталога, а
+    отсутствующие в прайс-листе товары удаляются. В режиме replace все
+    товары магазина удаляются и создаются заново.
+
+    Args:
+        data: Прайс-лист с ключами shop, categories и goods
+        user_id: ID пользователя-владельца магазина
+        chunk_size: Размер пакета записи, по умолчанию из настроек
+        mode: Режим импорта, sync или replace
+
+    Returns:
+        Словарь с количеством созданных, обновленных и удаленных объектов
+    """
+    importer = start_import(data, user_id, chunk_size, mode)
+    importer.import_goods(data['goods'])
+    importer.delete_missing()
+    return {'shop': importer.shop.id, **importer.stats}
@@ -0,0 +1,176 @@
+"""Очередь исходящих писем с пакетной отправкой.
+
+Письма записываются в таблицу QueuedEmail в той же транзакции, что и
+изменения, о которых они сообщают. Периодическая задача Celery
+отправляет их пакетами через одно SMTP-соединение.
+"""
+import smtplib
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.utils import timezone
+
+from backend.models import QueuedEmail
+
+MAIL_UPDATE_FIELDS = (
+    'state',
+    'attempts',
+    'send_after',
+    'last_error',
+    'sent_at',
+)
+
+MAIL_COUNTERS = ('sent', 'retried', 'failed')
+
+
+def queue_email(title, message, sender, recipients):
+    """Ставит письмо в очередь отправки.
+
+    Args:
+        title: Тема письма
+        message: Текст письма
+        sender: Адрес отправителя
+        recipients: Список адресов получателей
+
+    Returns:
+        Созданный экземпляр QueuedEmail
+    """
+    return QueuedEmail.objects.create(
+        subject=title,
+        body=message,
+        sender=sender,
+        recipients=list(recipients)
+    )
+
+
+def retry_delay(attempts):
+    """Задержка перед повторной отправкой, удваивается с каждой попыткой."""
+    return timedelta(
+        seconds=settings.EMAIL_RETRY_BACKOFF * 2 ** (attempts - 1)
+    )
+
+
+class RateLimiter:
+    """Равномерно распределяет отправку не чаще rate писем в секунду."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_at = time.monotonic()
+
+    def wait(self):
+        """Ждет, пока не наступит время отправки следующего письма."""
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at = max(now, self.next_at) + self.interval
+
+
+def drain_email_queue(batch_size=None, time_limit=None):
+    """Отправляет письма из очереди пакетами через одно соединение.
+
+    Очередь разбирает только один процесс на SMTP-сервер, поэтому
+    ограничение EMAIL_RATE_LIMIT действует для всего сервиса, а не для
+    отдельного воркера.
+
+    Args:
+        batch_size: Размер пакета, по умолчанию EMAIL_BATCH_SIZE
+        time_limit: Время работы в секундах, по умолчанию
+            EMAIL_DRAIN_TIME_LIMIT
+
+    Returns:
+        Словарь с количеством отправленных, отложенных и отклоненных писем
+    """
+    batch_size = batch_size or settings.EMAIL_BATCH_SIZE
+    time_limit = time_limit or settings.EMAIL_DRAIN_TIME_LIMIT
+    stats = dict.fromkeys(MAIL_COUNTERS, 0)
+
+    lock = f'mail:drain:{settings.EMAIL_HOST}'
+    if not cache.add(lock, 1, time_limit + 60):
+        return stats
+    try:
+        deadline = time.monotonic() + time_limit
+        # Пустая очередь не открывает SMTP-соединение
+        batch = _next_batch(batch_size)
+        if not batch:
+            return stats
+        limiter = RateLimiter(settings.EMAIL_RATE_LIMIT)
+        with get_connection() as connection:
+            while batch:
+                try:
+                    for email in batch:
+                        limiter.wait()
+                        stats[_deliver(connection, email)] += 1
+                finally:
+                    # Статус уже отправленных писем сохраняется и при
+                    # неожиданной ошибке, иначе они уйдут повторно
+                    QueuedEmail.objects.bulk_update(
+                        batch,
+                        MAIL_UPDATE_FIELDS
+                    )
+                if time.monotonic() >= deadline:
+                    break
+                batch = _next_batch(batch_size)
+    finally:
+        cache.delete(lock)
+    return stats
+
+
+def _next_batch(batch_size):
+    """Очередной пакет писем, готовых к отправке."""
+    return list(QueuedEmail.objects.filter(
+        state='pending',
+        send_after__lte=timezone.now()
+    ).order_by('send_after', 'id')[:batch_size])
+
+
+def _deliver(connection, email):
+    """Отправляет одно письмо и обновляет его статус.
+
+    Returns:
+        Имя счетчика из MAIL_COUNTERS
+    """
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.sender,
+        to=email.recipients,
+        connection=connection
+    )
+    try:
+        connection.send_messages([message])
+    except smtplib.SMTPRecipientsRefused as error:
+        # Адреса отклонены сервером, повтор не поможет
+        email.attempts += 1
+        email.state = 'failed'
+        email.last_error = str(error)
+        return 'failed'
+    except OSError as error:
+        if (
+            isinstance(error, smtplib.SMTPServerDisconnected)
+            or not isinstance(error, smtplib.SMTPException)
+        ):
+            # Соединение потеряно. Новое открывается сразу: закрытое
+            # соединение send_messages открывал бы и закрывал для
+            # каждого следующего письма
+            connection.close()
+            try:
+                connection.open()
+            except OSError:
+                pass
+        email.attempts += 1
+        email.last_error = str(error)
+        if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+            email.state = 'failed'
+            return 'failed'
+        email.send_after = timezone.now() + retry_delay(email.attempts)
+        return 'retried'
+
+    email.state = 'sent'
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    return 'sent'
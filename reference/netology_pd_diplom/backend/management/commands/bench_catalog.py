@@ -0,0 +1,67 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from backend.benchmarks import DUMMY_CACHE, measure, seed_shops
+from backend.models import CatalogItem, Category, ProductInfo, Shop
+from backend.serializers import ProductInfoSerializer
+from backend.views import ProductInfoView
+
+
+def legacy_products(shop_id, category_id):
+    """Прежняя выдача каталога через JOIN и вложенные сериализаторы."""
+    queryset = ProductInfo.objects.filter(
+        shop__state=True,
+        shop_id=shop_id,
+        product__category_id=category_id
+    ).select_related(
+        'shop', 'product__category'
+    ).prefetch_related(
+        'product_parameters__parameter'
+    ).distinct()
+    return JSONRenderer().render(
+        ProductInfoSerializer(queryset, many=True).data
+    )
+
+
+class Command(BaseCommand):
+    help = 'Сравнение задержек выдачи каталога: JOIN против CatalogItem'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--shops', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=50)
+
+    def handle(self, *args, **options):
+        missing = options['rows'] - CatalogItem.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Генерация {missing} строк каталога...')
+            seed_shops(options['shops'], missing // options['shops'])
+
+        shop_ids = list(Shop.objects.values_list('id', flat=True))
+        category_ids = list(Category.objects.values_list('id', flat=True))
+        factory = APIRequestFactory()
+        view = ProductInfoView.as_view()
+        rnd = random.Random(0)
+
+        def catalog():
+            request = factory.get('/api/v1/products', {
+                'shop_id': rnd.choice(shop_ids),
+                'category_id': rnd.choice(category_ids),
+                'stream': '1',
+            })
+            b''.join(view(request).streaming_content)
+
+        def legacy():
+            legacy_products(rnd.choice(shop_ids), rnd.choice(category_ids))
+
+        with override_settings(CACHES=DUMMY_CACHE):
+            for name, func in (('join', legacy), ('catalog', catalog)):
+                result = measure(func, options['requests'])
+                self.stdout.write(
+                    f'{name}: p50 {result["p50"]:.1f} мс, '
+                    f'p99 {result["p99"]:.1f} мс'
+                )
@@ -0,0 +1,94 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+
+from backend.celery_tasks import send_email
+from backend.mail import drain_email_queue
+from backend.models import QueuedEmail
+
+
+class CountingHandler:
+    """Обработчик aiosmtpd, считающий принятые письма."""
+
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return '250 OK'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер отправки писем по одному и пакетами через локальный '
+        'SMTP-сервер aiosmtpd'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--port', type=int, default=8025)
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            raise CommandError('Для замера нужен пакет aiosmtpd') from None
+
+        handler = CountingHandler()
+        controller = Controller(
+            handler,
+            hostname='127.0.0.1',
+            port=options['port']
+        )
+        controller.start()
+        try:
+            with override_settings(
+                EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                EMAIL_HOST='127.0.0.1',
+                EMAIL_PORT=options['port'],
+                EMAIL_HOST_USER='',
+                EMAIL_HOST_PASSWORD='',
+                EMAIL_USE_SSL=False,
+                EMAIL_USE_TLS=False,
+                EMAIL_RATE_LIMIT=0,
+            ):
+                self.bench(handler, options['messages'], options['batch_size'])
+        finally:
+            controller.stop()
+
+    def bench(self, handler, messages, batch_size):
+        recipients = [
+            [f'bench-{number}@example.com'] for number in range(messages)
+        ]
+
+        started = time.perf_counter()
+        for to in recipients:
+            send_email('Замер', 'Текст письма', 'bench@example.com', to)
+        self.report('По одному соединению на письмо', started, handler)
+
+        handler.received = 0
+        with transaction.atomic():
+            QueuedEmail.objects.bulk_create(
+                QueuedEmail(
+                    subject='Замер',
+                    body='Текст письма',
+                    sender='bench@example.com',
+                    recipients=to
+                )
+                for to in recipients
+            )
+            started = time.perf_counter()
+            stats = drain_email_queue(batch_size, time_limit=3600)
+            self.report('Очередь, одно соединение', started, handler)
+            self.stdout.write(f'Статистика: {stats}')
+            transaction.set_rollback(True)
+
+    def report(self, title, started, handler):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{title}: {handler.received} писем за {elapsed:.2f} с, '
+            f'{handler.received / elapsed:.0f} писем/с'
+        )
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from backend.benchmarks import percentile
+
+DEFAULT_PATHS = (
+    '/api/v1/products',
+    '/api/v1/products?page_size=100',
+    '/api/v1/shops',
+    '/api/v1/categories',
+    '/api/v1/products/offers',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замер запросов в секунду к запущенному серверу: dev-сервер '
+        'против gunicorn/uvicorn'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--label', default='server')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--path', action='append', dest='paths')
+        parser.add_argument(
+            '--output',
+            help='JSON-файл, в который дописывается результат'
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        urls = [
+            options['url'].rstrip('/') + paths[number % len(paths)]
+            for number in range(options['requests'])
+        ]
+        # Одна keep-alive сессия на поток, как у клиентов за балансировщиком
+        local = threading.local()
+
+        def fetch(url):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                ok = local.session.get(url, timeout=30).status_code < 500
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - started) * 1000, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(executor.map(fetch, urls))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(timing for timing, _ in results)
+        result = {
+            'label': options['label'],
+            'url': options['url'],
+            'concurrency': options['concurrency'],
+            'requests': len(results),
+            'errors': sum(1 for _, ok in results if not ok),
+            'rps': len(results) / elapsed,
+            'p50': percentile(timings, 50),
+            'p99': percentile(timings, 99),
+        }
+        self.stdout.write(
+            f'{result["label"]}: {result["rps"]:.0f} запросов/с, '
+            f'p50 {result["p50"]:.1f} мс, p99 {result["p99"]:.1f} мс, '
+            f'ошибок {result["errors"]}'
+        )
+
+        if options['output']:
+            try:
+                with open(options['output']) as stream:
+                    runs = json.load(stream)
+            except FileNotFoundError:
+                runs = []
+            runs.append(result)
+            with open(options['output'], 'w') as stream:
+                json.dump(runs, stream, indent=2)
+            for run in runs[:-1]:
+                self.stdout.write(
+                    f'{result["label"]} / {run["label"]}: '
+                    f'{result["rps"] / run["rps"]:.2f}x'
+                )
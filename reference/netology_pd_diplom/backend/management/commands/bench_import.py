@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from backend.importer import IMPORT_MODES, MODE_SYNC, import_price_list
+from backend.models import User
+from backend.synthetic import generate_price_list
+
+
+class Command(BaseCommand):
+    help = 'Замер скорости импорта синтетического прайс-листа'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--goods', type=int, default=100000)
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument(
+            '--mode',
+            choices=IMPORT_MODES,
+            default=MODE_SYNC
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не откатывать импортированные данные'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user, _ = User.objects.get_or_create(
+                email='bench-import@example.com',
+                defaults={'type': 'shop'}
+            )
+            data = generate_price_list(goods=options['goods'])
+
+            started = time.perf_counter()
+            stats = import_price_list(
+                data,
+                user.id,
+                chunk_size=options['chunk_size'],
+                mode=options['mode']
+            )
+            elapsed = time.perf_counter() - started
+
+            goods = options['goods']
+            parameters = sum(
+                stats[key] for key in (
+                    'parameters_created',
+                    'parameters_updated',
+                    'parameters_deleted',
+                )
+            )
+            rows = goods + parameters
+            self.stdout.write(
+                f'Товаров: {goods}, параметров: {parameters}, '
+                f'время: {elapsed:.2f} с, {rows / elapsed:.0f} строк/с'
+            )
+            self.stdout.write(f'Статистика: {stats}')
+            if not options['keep']:
+                transaction.set_rollback(True)
@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.benchmarks import measure, seed_orders, seed_shops
+from backend.models import Order, Shop
+from backend.serializers import OrderSerializer
+from backend.views import PartnerOrders
+
+
+def legacy_partner_orders(user_id):
+    """Прежняя выдача заказов магазина через JOIN, SUM и DISTINCT."""
+    queryset = Order.objects.filter(
+        ordered_items__product_info__shop__user_id=user_id
+    ).exclude(state='basket').prefetch_related(
+        'ordered_items__product_info__product__category',
+        'ordered_items__product_info__product_parameters__parameter'
+    ).select_related('contact').annotate(
+        shop_total=Sum(F('ordered_items__quantity') *
+                       F('ordered_items__product_info__price'))
+    ).distinct()[:40]
+    return JSONRenderer().render(OrderSerializer(queryset, many=True).data)
+
+
+class Command(BaseCommand):
+    help = 'Замер выдачи заказов магазина: JOIN против двухфазного запроса'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=10000)
+        parser.add_argument('--items', type=int, default=3)
+        parser.add_argument('--requests', type=int, default=20)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            shop_ids = seed_shops(2, 500)
+            shop = Shop.objects.select_related('user').get(id=shop_ids[0])
+            self.stdout.write(f'Генерация {options["orders"]} заказов...')
+            seed_orders(shop_ids, options['orders'], options['items'])
+
+            factory = APIRequestFactory()
+            view = PartnerOrders.as_view()
+
+            def two_phase():
+                request = factory.get('/api/v1/partner/orders')
+                force_authenticate(request, shop.user)
+                view(request).render()
+
+            for name, func in (
+                ('join', lambda: legacy_partner_orders(shop.user.id)),
+                ('two-phase', two_phase),
+            ):
+                result = measure(func, options['requests'])
+                self.stdout.write(
+                    f'{name}: p50 {result["p50"]:.1f} мс, '
+                    f'p99 {result["p99"]:.1f} мс'
+                )
+            transaction.set_rollback(True)
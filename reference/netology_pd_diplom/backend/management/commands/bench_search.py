@@ -0,0 +1,84 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from backend.benchmarks import DUMMY_CACHE, measure, seed_shops
+from backend.models import CatalogItem
+from backend.synthetic import SYNTHETIC_CATEGORIES, SYNTHETIC_PARAMETERS
+from backend.views import ProductSearchView
+
+
+def search_queries(rnd, count):
+    """Генерирует поисковые запросы по синтетическому каталогу."""
+    values = [
+        str(value)
+        for parameter_values in SYNTHETIC_PARAMETERS.values()
+        for value in parameter_values
+    ]
+    for _ in range(count):
+        words = [rnd.choice(SYNTHETIC_CATEGORIES).split()[0].lower()]
+        words += rnd.sample(values, rnd.randint(0, 2))
+        if rnd.random() < 0.3:
+            words.append(str(rnd.randrange(1000)))
+        yield ' '.join(words)
+
+
+def misspell(rnd, query):
+    """Удаляет случайную букву из первого слова запроса."""
+    word, _, rest = query.partition(' ')
+    position = rnd.randrange(1, len(word))
+    return f'{word[:position]}{word[position + 1:]} {rest}'.strip()
+
+
+class Command(BaseCommand):
+    help = 'Замер задержек поиска /products/search'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000)
+        parser.add_argument('--shops', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--target', type=float, default=50)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING(
+                'Полнотекстовый поиск работает только в PostgreSQL, '
+                'замеряется поиск по вхождению подстроки'
+            ))
+        missing = options['rows'] - CatalogItem.objects.count()
+        if missing > 0:
+            self.stdout.write(f'Генерация {missing} строк каталога...')
+            seed_shops(options['shops'], missing // options['shops'])
+
+        factory = APIRequestFactory()
+        view = ProductSearchView.as_view()
+        rnd = random.Random(0)
+        queries = list(search_queries(rnd, options['requests']))
+        typos = [misspell(rnd, query) for query in queries]
+
+        def search(texts):
+            texts = iter(texts)
+
+            def request():
+                view(factory.get(
+                    '/api/v1/products/search',
+                    {'q': next(texts)}
+                )).render()
+            return request
+
+        with override_settings(CACHES=DUMMY_CACHE):
+            for name, texts in (('точный', queries), ('с опечаткой', typos)):
+                result = measure(search(texts), len(texts))
+                style = (
+                    self.style.SUCCESS
+                    if result['p99'] <= options['target']
+                    else self.style.ERROR
+                )
+                self.stdout.write(style(
+                    f'{name}: p50 {result["p50"]:.1f} мс, '
+                    f'p99 {result["p99"]:.1f} мс '
+                    f'(цель {options["target"]:.0f} мс)'
+                ))
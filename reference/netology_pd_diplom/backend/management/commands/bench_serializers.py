@@ -0,0 +1,104 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from backend.benchmarks import measure, seed_orders, seed_shops
+from backend.catalog import CATALOG_VALUES, catalog_item_data
+from backend.fast_serializers import contacts_data, orders_data
+from backend.models import CatalogItem, Contact, Order, ProductInfo
+from backend.renderers import FastJSONRenderer
+from backend.serializers import (
+    ContactSerializer,
+    OrderSerializer,
+    ProductInfoSerializer
+)
+
+
+class Command(BaseCommand):
+    help = 'Сравнение сериализаторов DRF и быстрой сериализации'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--goods', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--items', type=int, default=5)
+        parser.add_argument('--contacts', type=int, default=500)
+        parser.add_argument('--requests', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.stdout.write('Генерация данных...')
+            shop_ids = seed_shops(1, options['goods'])
+            buyer = seed_orders(shop_ids, options['orders'], options['items'])
+            Contact.objects.bulk_create(
+                Contact(
+                    user=buyer,
+                    city='Москва',
+                    street=f'Улица {number}',
+                    phone='+70000000000'
+                )
+                for number in range(options['contacts'])
+            )
+
+            product_infos = ProductInfo.objects.filter(
+                shop_id__in=shop_ids
+            ).order_by('id')
+            catalog = CatalogItem.objects.filter(
+                shop_id__in=shop_ids
+            ).order_by('product_info')
+            orders = Order.objects.filter(user=buyer).order_by('id')
+            contacts = Contact.objects.filter(user=buyer).order_by('id')
+
+            cases = (
+                (
+                    'products',
+                    options['goods'],
+                    lambda: JSONRenderer().render(ProductInfoSerializer(
+                        product_infos.select_related(
+                            'product__category'
+                        ).prefetch_related('product_parameters__parameter'),
+                        many=True
+                    ).data),
+                    lambda: FastJSONRenderer().render([
+                        catalog_item_data(row)
+                        for row in catalog.values(*CATALOG_VALUES)
+                    ]),
+                ),
+                (
+                    'orders',
+                    options['orders'],
+                    lambda: JSONRenderer().render(OrderSerializer(
+                        orders.prefetch_related(
+                            'ordered_items__product_info__product__category',
+                            'ordered_items__product_info__'
+                            'product_parameters__parameter'
+                        ).select_related('contact'),
+                        many=True
+                    ).data),
+                    lambda: FastJSONRenderer().render(orders_data(orders)),
+                ),
+                (
+                    'contacts',
+                    options['contacts'],
+                    lambda: JSONRenderer().render(
+                        ContactSerializer(contacts, many=True).data
+                    ),
+                    lambda: FastJSONRenderer().render(
+                        contacts_data(contacts)
+                    ),
+                ),
+            )
+            for name, count, drf, fast in cases:
+                identical = drf() == fast()
+                drf_result = measure(drf, options['requests'])
+                fast_result = measure(fast, options['requests'])
+                self.stdout.write(
+                    f'{name}: DRF {self.rate(count, drf_result)} объектов/с, '
+                    f'быстрая {self.rate(count, fast_result)} объектов/с, '
+                    f'вывод {"совпадает" if identical else "РАЗЛИЧАЕТСЯ"}'
+                )
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def rate(count, result):
+        """Возвращает число объектов в секунду по медианному времени."""
+        return f'{count / result["p50"] * 1000:.0f}'
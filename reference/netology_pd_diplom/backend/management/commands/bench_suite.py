@@ -0,0 +1,213 @@
+import itertools
+import json
+import platform
+import subprocess
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from backend.benchmarks import (
+    DUMMY_CACHE,
+    compare_results,
+    measure,
+    seed_orders,
+    seed_shops
+)
+from backend.catalog import CATALOG_VALUES, catalog_item_data
+from backend.fast_serializers import orders_data
+from backend.importer import import_price_list
+from backend.models import CatalogItem, Order, Shop, User
+from backend.renderers import FastJSONRenderer
+from backend.synthetic import generate_price_list
+from backend.views import (
+    PartnerOrders,
+    ProductFacetView,
+    ProductInfoView,
+    ProductSearchView
+)
+
+
+def git_revision():
+    """Возвращает хеш текущего коммита или None вне репозитория."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Набор замеров импорта, сериализации, агрегации заказов и '
+        'выдачи каталога с сохранением результатов в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=2)
+        parser.add_argument('--goods', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--items', type=int, default=3)
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON с результатами предыдущего запуска'
+        )
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.1,
+            help='Допустимое падение пропускной способности, доля'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), override_settings(CACHES=DUMMY_CACHE):
+            benchmarks = self.run_benchmarks(options)
+            transaction.set_rollback(True)
+
+        results = {
+            'revision': git_revision(),
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'parameters': {
+                name: options[name]
+                for name in ('shops', 'goods', 'orders', 'items', 'requests')
+            },
+            'benchmarks': benchmarks,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare']) as stream:
+                baseline = json.load(stream)
+            regressions = compare_results(
+                results,
+                baseline,
+                options['threshold']
+            )
+            if regressions:
+                raise CommandError('Регрессия пропускной способности: ' + (
+                    ', '.join(
+                        f'{name} {before:.0f} -> {after:.0f} оп/с'
+                        for name, before, after in regressions
+                    )
+                ))
+            self.stdout.write(self.style.SUCCESS(
+                f'Регрессий относительно {baseline["revision"]} нет'
+            ))
+
+    def run_benchmarks(self, options):
+        """Заполняет базу и возвращает результаты замеров по названиям."""
+        self.stdout.write('Генерация данных...')
+        shop_ids = seed_shops(options['shops'], options['goods'])
+        buyer = seed_orders(shop_ids, options['orders'], options['items'])
+        shop_user = Shop.objects.get(id=shop_ids[0]).user
+        orders = Order.objects.filter(user=buyer).order_by('id')
+        catalog = CatalogItem.objects.filter(
+            shop_id__in=shop_ids
+        ).order_by('product_info')
+        factory = APIRequestFactory()
+
+        def view_request(view_class, params=None, user=None):
+            view = view_class.as_view()
+
+            def request():
+                request = factory.get('/', params)
+                if user is not None:
+                    force_authenticate(request, user)
+                view(request).render()
+            return request
+
+        imports = itertools.count()
+
+        def import_shop():
+            number = next(imports)
+            user = User.objects.create(
+                email=f'bench-suite-{number}@example.com',
+                type='shop',
+                is_active=True
+            )
+            import_price_list(
+                generate_price_list(
+                    goods=options['goods'],
+                    shop=f'Замер импорта {number}',
+                    seed=number
+                ),
+                user.id
+            )
+
+        # (название, объектов за вызов, функция, число вызовов)
+        cases = (
+            ('import', options['goods'], import_shop, 3),
+            (
+                'serialize_products',
+                catalog.count(),
+                lambda: FastJSONRenderer().render([
+                    catalog_item_data(row)
+                    for row in catalog.values(*CATALOG_VALUES)
+                ]),
+                options['requests'],
+            ),
+            (
+                'serialize_orders',
+                options['orders'],
+                lambda: FastJSONRenderer().render(orders_data(orders)),
+                options['requests'],
+            ),
+            (
+                'order_totals',
+                options['orders'],
+                lambda: Order.refresh_totals(orders.values('id')),
+                options['requests'],
+            ),
+            (
+                'partner_orders',
+                1,
+                view_request(PartnerOrders, user=shop_user),
+                options['requests'],
+            ),
+            (
+                'catalog_page',
+                1,
+                view_request(ProductInfoView, {'page_size': 100}),
+                options['requests'],
+            ),
+            (
+                'catalog_facets',
+                1,
+                view_request(ProductFacetView),
+                options['requests'],
+            ),
+            (
+                'catalog_search',
+                1,
+                view_request(ProductSearchView, {'q': 'смартфоны модель'}),
+                options['requests'],
+            ),
+        )
+        benchmarks = {}
+        for name, count, func, repeat in cases:
+            result = measure(func, repeat)
+            result['ops'] = count / result['p50'] * 1000
+            benchmarks[name] = result
+            self.stdout.write(
+                f'{name}: p50 {result["p50"]:.1f} мс, '
+                f'p99 {result["p99"]:.1f} мс, {result["ops"]:.0f} оп/с'
+            )
+        return benchmarks
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from backend.catalog import rebuild_catalog
+
+
+class Command(BaseCommand):
+    help = 'Полная пересборка денормализованного каталога товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        count = rebuild_catalog(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Обновлено строк каталога: {count}')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from backend.benchmarks import seed_buyers, seed_shops
+from backend.models import CatalogItem, Order
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими данными для нагрузочного теста: '
+        'N магазинов по M товаров, покупатели и их заказы'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--shops', type=int, default=10)
+        parser.add_argument('--goods', type=int, default=1000)
+        parser.add_argument('--buyers', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=20)
+        parser.add_argument('--items', type=int, default=2)
+        parser.add_argument('--password', default='password')
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'Импорт {options["shops"]} x {options["goods"]} товаров...'
+        )
+        shop_ids = seed_shops(
+            options['shops'],
+            options['goods'],
+            password=options['password']
+        )
+        self.stdout.write(
+            f'Создание {options["buyers"]} покупателей '
+            f'по {options["orders"]} заказов...'
+        )
+        seed_buyers(
+            shop_ids,
+            options['buyers'],
+            options['orders'],
+            options['items'],
+            options['password']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Строк каталога: {CatalogItem.objects.count()}, '
+            f'заказов: {Order.objects.count()}. Вход: '
+            f'load-buyer-<0..{options["buyers"] - 1}>@example.com и '
+            f'bench-shop-<0..{options["shops"] - 1}>@example.com'
+        ))
@@ -0,0 +1,161 @@
+"""Метрики запросов в формате Prometheus.
+
+MetricsMiddleware замеряет время каждого запроса и рендеринга ответа,
+а для выборки запросов (METRICS_SAMPLE_RATE) дополнительно считает
+число и суммарное время SQL-запросов. Гистограммы хранятся в памяти
+процесса и отдаются представлением metrics_view. При нескольких
+процессах gunicorn значения собираются из PROMETHEUS_MULTIPROC_DIR.
+Под ASGI запросы SQL выполняются в потоках sync_to_async со своими
+соединениями, поэтому для асинхронных запросов пишется только время.
+"""
+import os
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess
+)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Время обработки запроса',
+    ['view', 'method', 'status']
+)
+RENDER_DURATION = Histogram(
+    'http_response_render_seconds',
+    'Время сериализации ответа DRF в байты',
+    ['view'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1)
+)
+DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Количество SQL-запросов на запрос (выборка)',
+    ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+)
+DB_DURATION = Histogram(
+    'http_request_db_seconds',
+    'Суммарное время SQL-запросов на запрос (выборка)',
+    ['view']
+)
+CACHE_REQUESTS = Counter(
+    'response_cache_requests',
+    'Обращения к кешу ответов по эндпоинтам',
+    ['endpoint', 'result']
+)
+
+
+def view_name(request):
+    """Имя маршрута запроса для метки метрик."""
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'unmatched'
+
+
+def record_cache(endpoint, result):
+    """Учитывает попадание или промах кеша ответов."""
+    CACHE_REQUESTS.labels(endpoint, result).inc()
+
+
+class QueryStats:
+    """Обертка выполнения SQL, считающая запросы и их время."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """Записывает метрики запросов в гистограммы процесса."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        stats = None
+        if random.random() < settings.METRICS_SAMPLE_RATE:
+            stats = QueryStats()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        else:
+            response = self.get_response(request)
+
+        view = view_name(request)
+        REQUEST_DURATION.labels(
+            view, request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        if stats is not None:
+            DB_QUERIES.labels(view).observe(stats.count)
+            DB_DURATION.labels(view).observe(stats.duration)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        REQUEST_DURATION.labels(
+            view_name(request), request.method, response.status_code
+        ).observe(time.perf_counter() - started)
+        return response
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+        view = view_name(request)
+
+        def rendered(response):
+            RENDER_DURATION.labels(view).observe(
+                time.perf_counter() - started
+            )
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+def metrics_view(request):
+    """Отдает метрики в текстовом формате Prometheus.
+
+    Если задан METRICS_TOKEN, требуется заголовок
+    Authorization: Bearer <METRICS_TOKEN>.
+    """
+    token = settings.METRICS_TOKEN
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponse(status=403)
+
+    registry = REGISTRY
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return HttpResponse(
+        generate_latest(registry),
+        content_type=CONTENT_TYPE_LATEST
+    )
@@ -1,9 +1,15 @@
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth.validators import UnicodeUsernameValidator
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django_rest_passwordreset.tokens import get_token_generator
 
+from backend.util import parse_number
+
 
 STATE_CHOICES = (
     ('basket', 'Корзина'),
@@ -20,6 +26,12 @@ USER_TYPE_CHOICES = (
     ('buyer', 'Покупатель'),
 )
 
+EMAIL_STATE_CHOICES = (
+    ('pending', 'Ожидает отправки'),
+    ('sent', 'Отправлено'),
+    ('failed', 'Ошибка'),
+)
+
 
 class UserManager(BaseUserManager):
     """Менеджер для работы с пользователями"""
@@ -140,13 +152,27 @@ class Product(models.Model):
         verbose_name='Категория',
         related_name='products',
         blank=True,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Покрывается составным индексом с этим полем в начале
+        db_index=False
     )
 
     class Meta:
         verbose_name = 'Продукт'
         verbose_name_plural = 'Продукты'
         ordering = ('-name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'category'],
+                name='unique_product'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['category', 'name'],
+                name='product_category_name_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -168,7 +194,9 @@ class ProductInfo(models.Model):
         verbose_name='Магазин',
         related_name='product_infos',
         blank=True,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Покрывается составным индексом с этим полем в начале
+        db_index=False
     )
     quantity = models.PositiveIntegerField('Количество')
     price = models.PositiveIntegerField('Цена')
@@ -183,6 +211,16 @@ class ProductInfo(models.Model):
                 name='unique_product_info'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['shop', 'product'],
+                name='product_info_shop_product_idx'
+            ),
+            models.Index(
+                fields=['shop', 'external_id'],
+                name='product_info_shop_ext_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.product.name
@@ -196,6 +234,12 @@ class Parameter(models.Model):
         verbose_name = 'Параметр'
         verbose_name_plural = 'Параметры'
         ordering = ('-name',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name'],
+                name='unique_parameter'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -215,9 +259,17 @@ class ProductParameter(models.Model):
         verbose_name='Параметр',
         related_name='product_parameters',
         blank=True,
+        # Покрывается составными индексами с этим полем в начале
+        db_index=False,
         on_delete=models.CASCADE
     )
     value = models.CharField('Значение', max_length=100)
+    value_numeric = models.FloatField(
+        'Числовое значение',
+        null=True,
+        blank=True,
+        editable=False
+    )
 
     class Meta:
         verbose_name = 'Параметр продукта'
@@ -228,6 +280,170 @@ class ProductParameter(models.Model):
                 name='unique_product_parameter'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=['parameter', 'value', 'product_info'],
+                name='product_parameter_value_idx'
+            ),
+            models.Index(
+                fields=['parameter', 'value_numeric', 'product_info'],
+                name='product_parameter_numeric_idx'
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.value_numeric = parse_number(self.value)
+        return super().save(*args, **kwargs)
+
+
+class CatalogItem(models.Model):
+    """Денормализованная строка каталога для быстрого чтения.
+
+    Одна строка на ProductInfo с данными магазина, продукта, категории и
+    параметрами в JSON. Обновляется импортом прайс-листов и сигналами.
+    """
+    product_info = models.OneToOneField(
+        ProductInfo,
+        verbose_name='Информация о продукте',
+        related_name='catalog_item',
+        primary_key=True,
+        on_delete=models.CASCADE
+    )
+    shop = models.ForeignKey(
+        Shop,
+        verbose_name='Магазин',
+        related_name='catalog_items',
+        on_delete=models.CASCADE
+    )
+    shop_name = models.CharField('Название магазина', max_length=50)
+    shop_state = models.BooleanField('Статус получения заказов')
+    product = models.ForeignKey(
+        Product,
+        verbose_name='Продукт',
+        related_name='catalog_items',
+        on_delete=models.CASCADE
+    )
+    product_name = models.CharField('Название продукта', max_length=80)
+    category = models.ForeignKey(
+        Category,
+        verbose_name='Категория',
+        related_name='catalog_items',
+        on_delete=models.CASCADE
+    )
+    category_name = models.CharField('Название категории', max_length=40)
+    model = models.CharField('Модель', max_length=80, blank=True)
+    external_id = models.PositiveIntegerField('Внешний ID')
+    quantity = models.PositiveIntegerField('Количество')
+    price = models.PositiveIntegerField('Цена')
+    price_rrc = models.PositiveIntegerField('Рекомендуемая цена')
+    parameters = models.JSONField('Параметры', default=list)
+    search_document = models.TextField(
+        'Поисковый текст',
+        blank=True,
+        default=''
+    )
+    # Заполняется только в PostgreSQL, см. backend.search
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    class Meta:
+        verbose_name = 'Позиция каталога'
+        verbose_name_plural = 'Каталог'
+        ordering = ('product_info',)
+        indexes = [
+            models.Index(
+                fields=['shop_state', 'category', 'product_info'],
+                name='catalog_category_idx'
+            ),
+            models.Index(
+                fields=['shop_state', 'shop', 'product_info'],
+                name='catalog_shop_idx'
+            ),
+            models.Index(
+                fields=['shop_state', 'price', 'product_info'],
+                name='catalog_price_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.product_name
+
+
+class ProductOffer(models.Model):
+    """Сводка предложений магазинов по продукту.
+
+    Одна строка на продукт с минимальной и максимальной ценой, числом
+    предложений и лучшим предложением в наличии. Пересчитывается
+    оконными функциями по CatalogItem вместе со строками каталога.
+    """
+    product = models.OneToOneField(
+        Product,
+        verbose_name='Продукт',
+        related_name='offer',
+        primary_key=True,
+        on_delete=models.CASCADE
+    )
+    product_name = models.CharField('Название продукта', max_length=80)
+    category = models.ForeignKey(
+        Category,
+        verbose_name='Категория',
+        related_name='product_offers',
+        # Покрывается составным индексом с этим полем в начале
+        db_index=False,
+        on_delete=models.CASCADE
+    )
+    category_name = models.CharField('Название категории', max_length=40)
+    min_price = models.PositiveIntegerField('Минимальная цена')
+    max_price = models.PositiveIntegerField('Максимальная цена')
+    offers = models.PositiveIntegerField('Количество предложений')
+    best_offer = models.ForeignKey(
+        ProductInfo,
+        verbose_name='Лучшее предложение',
+        related_name='+',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    best_shop = models.ForeignKey(
+        Shop,
+        verbose_name='Магазин лучшего предложения',
+        related_name='+',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL
+    )
+    best_shop_name = models.CharField(
+        'Название магазина лучшего предложения',
+        max_length=50,
+        blank=True
+    )
+    best_price = models.PositiveIntegerField(
+        'Цена лучшего предложения',
+        null=True,
+        blank=True
+    )
+    best_quantity = models.PositiveIntegerField(
+        'Остаток лучшего предложения',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Сравнение цен'
+        verbose_name_plural = 'Сравнение цен'
+        ordering = ('product',)
+        indexes = [
+            models.Index(
+                fields=['category', 'product'],
+                name='product_offer_category_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return self.product_name
 
 
 class Contact(models.Model):
@@ -263,7 +479,9 @@ class Order(models.Model):
         verbose_name='Пользователь',
         related_name='orders',
         blank=True,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Покрывается составным индексом с этим полем в начале
+        db_index=False
     )
     dt = models.DateTimeField(auto_now_add=True)
     state = models.CharField('Статус', choices=STATE_CHOICES, max_length=15)
@@ -274,15 +492,77 @@ class Order(models.Model):
         null=True,
         on_delete=models.CASCADE
     )
+    total_sum = models.PositiveIntegerField('Сумма', default=0)
+    items_count = models.PositiveIntegerField('Количество позиций', default=0)
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ('-dt',)
+        indexes = [
+            models.Index(
+                fields=['user', 'state', '-dt'],
+                name='order_user_state_dt_idx'
+            ),
+        ]
+        constraints = [
+            # Корзина у пользователя одна, ее уникальный индекс служит и
+            # для поиска корзины
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(state='basket'),
+                name='unique_basket'
+            ),
+        ]
 
     def __str__(self):
         return str(self.dt)
 
+    @classmethod
+    def refresh_totals(cls, orders):
+        """Пересчитывает сохраненные суммы и количество позиций заказов.
+
+        Позиции без зафиксированной цены считаются по текущей цене товара.
+
+        Args:
+            orders: QuerySet или список ID заказов
+
+        Returns:
+            Количество обновленных заказов
+        """
+        items = OrderItem.objects.filter(
+            order_id=OuterRef('pk')
+        ).order_by().values('order_id')
+        return cls.objects.filter(pk__in=orders).update(
+            total_sum=Coalesce(
+                Subquery(items.annotate(total=Sum(
+                    F('quantity') * Coalesce('price', 'product_info__price')
+                )).values('total')),
+                0
+            ),
+            items_count=Coalesce(
+                Subquery(items.annotate(count=Count('id')).values('count')),
+                0
+            )
+        )
+
+    @classmethod
+    def baskets_with(cls, product_infos):
+        """Возвращает ID корзин, содержащих указанные товары.
+
+        Args:
+            product_infos: QuerySet или список ID записей ProductInfo
+        """
+        return list(cls.objects.filter(
+            state='basket',
+            ordered_items__product_info_id__in=product_infos
+        ).values_list('id', flat=True).distinct())
+
+    def update_totals(self):
+        """Пересчитывает сумму и количество позиций заказа."""
+        self.refresh_totals([self.pk])
+        self.refresh_from_db(fields=['total_sum', 'items_count'])
+
 
 class OrderItem(models.Model):
     """Модель позиции заказа"""
@@ -298,9 +578,13 @@ class OrderItem(models.Model):
         verbose_name='Информация о продукте',
         related_name='ordered_items',
         blank=True,
-        on_delete=models.CASCADE
+        on_delete=models.CASCADE,
+        # Покрывается составным индексом с этим полем в начале
+        db_index=False
     )
     quantity = models.PositiveIntegerField('Количество')
+    # Цена фиксируется при оформлении заказа, в корзине берется из товара
+    price = models.PositiveIntegerField('Цена', null=True, blank=True)
 
     class Meta:
         verbose_name = 'Позиция заказа'
@@ -311,6 +595,13 @@ class OrderItem(models.Model):
                 name='unique_order_item'
             ),
         ]
+        indexes = [
+            # Заказы магазина выбираются по товарам без чтения таблицы
+            models.Index(
+                fields=['product_info', 'order'],
+                name='order_item_product_order_idx'
+            ),
+        ]
 
 
 class ConfirmEmailToken(models.Model):
@@ -343,3 +634,82 @@ class ConfirmEmailToken(models.Model):
 
     def __str__(self):
         return f'Токен подтверждения для {self.user}'
+
+
+class QueuedEmail(models.Model):
+    """Модель письма в очереди отправки"""
+    subject = models.CharField('Тема', max_length=255)
+    body = models.TextField('Текст')
+    sender = models.CharField('Отправитель', max_length=255)
+    recipients = models.JSONField('Получатели', default=list)
+    state = models.CharField(
+        'Статус',
+        choices=EMAIL_STATE_CHOICES,
+        max_length=15,
+        default='pending'
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток отправки', default=0)
+    send_after = models.DateTimeField(
+        'Отправить после',
+        default=timezone.now
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    sent_at = models.DateTimeField('Дата отправки', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Письмо в очереди'
+        verbose_name_plural = 'Очередь писем'
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['send_after', 'id'],
+                condition=models.Q(state='pending'),
+                name='queued_email_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} ({", ".join(self.recipients)})'
+
+
+class NotificationEvent(models.Model):
+    """Модель события уведомления о заказе (outbox)
+
+    Событие записывается в одной транзакции с изменением заказа и
+    позже превращается в письмо периодической задачей.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='notification_events',
+        on_delete=models.CASCADE
+    )
+    order = models.ForeignKey(
+        Order,
+        verbose_name='Заказ',
+        related_name='notification_events',
+        on_delete=models.CASCADE
+    )
+    state = models.CharField('Статус', choices=STATE_CHOICES, max_length=15)
+    created_at = models.DateTimeField('Дата создания', auto_now_add=True)
+    processed_at = models.DateTimeField(
+        'Дата обработки',
+        null=True,
+        blank=True
+    )
+
+    class Meta:
+        verbose_name = 'Событие уведомления'
+        verbose_name_plural = 'События уведомлений'
+        ordering = ('id',)
+        indexes = [
+            models.Index(
+                fields=['id'],
+                condition=models.Q(processed_at__isnull=True),
+                name='notification_pending_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'Заказ {self.order_id}: {self.state}'
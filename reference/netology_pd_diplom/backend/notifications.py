@@ -0,0 +1,79 @@
+"""Уведомления о заказах через outbox.
+
+Изменение заказа записывает строку NotificationEvent в той же
+транзакции. Периодическая задача пакетами превращает события в письма
+очереди, получая адреса получателей одним запросом на пакет.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from backend.models import (
+    STATE_CHOICES,
+    NotificationEvent,
+    QueuedEmail,
+    User
+)
+
+STATE_NAMES = dict(STATE_CHOICES)
+
+
+def notify_order_state(order_id, user_id, state):
+    """Записывает событие изменения статуса заказа.
+
+    Вызывается в транзакции, меняющей заказ, и выполняет один INSERT.
+    """
+    return NotificationEvent.objects.create(
+        order_id=order_id,
+        user_id=user_id,
+        state=state
+    )
+
+
+def order_email(event):
+    """Возвращает тему и текст письма для события."""
+    if event.state == 'new':
+        return 'Обновление статуса заказа', 'Ваш заказ успешно сформирован'
+    return (
+        'Обновление статуса заказа',
+        f'Статус заказа №{event.order_id}: {STATE_NAMES[event.state]}'
+    )
+
+
+def relay_notifications(batch_size=None):
+    """Переносит необработанные события в очередь писем.
+
+    Пакет обрабатывается в одной транзакции постоянным числом запросов:
+    выборка событий с блокировкой, выборка адресов, вставка писем и
+    отметка событий обработанными.
+
+    Returns:
+        Количество обработанных событий
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    relayed = 0
+    while True:
+        with transaction.atomic():
+            events = list(NotificationEvent.objects.select_for_update(
+                skip_locked=True
+            ).filter(processed_at__isnull=True).order_by('id')[:batch_size])
+            if not events:
+                return relayed
+
+            emails = dict(User.objects.filter(
+                id__in={event.user_id for event in events}
+            ).values_list('id', 'email'))
+            messages = []
+            for event in events:
+                title, message = order_email(event)
+                messages.append(QueuedEmail(
+                    subject=title,
+                    body=message,
+                    sender=settings.EMAIL_HOST_USER,
+                    recipients=[emails[event.user_id]]
+                ))
+            QueuedEmail.objects.bulk_create(messages)
+            NotificationEvent.objects.filter(
+                id__in=[event.id for event in events]
+            ).update(processed_at=timezone.now())
+        relayed += len(events)
@@ -0,0 +1,170 @@
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (
+    CursorPagination,
+    LimitOffsetPagination
+)
+from rest_framework.response import Response
+
+
+class ProductCursorPagination(CursorPagination):
+    """Постраничная выдача каталога по курсору.
+
+    Позиция курсора содержит значения всех полей сортировки, последнее
+    из которых - уникальный ID. Следующая страница выбирается условием
+    (price, id) > (цена, ID последней строки), а не OFFSET, поэтому
+    дальние страницы обходятся так же дешево, как первая, даже при
+    большом числе одинаковых цен. Поддерживается сортировка по id и по
+    (price, id).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = ('product_info_id',)
+    orderings = {
+        'id': ('product_info_id',),
+        '-id': ('-product_info_id',),
+        'price': ('price', 'product_info_id'),
+        '-price': ('-price', '-product_info_id'),
+    }
+
+    def get_ordering(self, request, queryset, view):
+        return self.orderings.get(
+            request.query_params.get('ordering'),
+            self.ordering
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # Повторяет CursorPagination.paginate_queryset, но фильтрует по
+        # всем полям сортировки, а не только по первому
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            offset, reverse, current_position = 0, False, None
+        else:
+            offset, reverse, current_position = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            queryset = queryset.filter(
+                self.keyset_condition(current_position, reverse)
+            )
+
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1],
+                self.ordering
+            )
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template:
+            self.display_page_controls = True
+        return self.page
+
+    def keyset_condition(self, position, reverse):
+        """Условие выборки строк после позиции курсора.
+
+        Для сортировки (price, id) это price > p OR (price = p AND id > i),
+        в обратном направлении - с заменой > на <.
+        """
+        try:
+            values = [int(value) for value in position.split(',')]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message) from None
+        if len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = None
+        for field, value in reversed(list(zip(self.ordering, values))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') != reverse else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            if condition is not None:
+                after |= Q(**{name: value}) & condition
+            condition = after
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        return ','.join(
+            str(instance[field.lstrip('-')]) for field in ordering
+        )
+
+
+class OfferCursorPagination(CursorPagination):
+    """Постраничная выдача сравнения цен по курсору, 40 продуктов на
+    страницу категории."""
+    page_size = 40
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('product_id',)
+
+
+class OrderCursorPagination(CursorPagination):
+    """Постраничная выдача заказов по курсору, новые заказы первыми."""
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-id',)
+
+
+class SearchPagination(LimitOffsetPagination):
+    """Постраничная выдача результатов поиска по смещению.
+
+    Результаты упорядочены по релевантности, поэтому курсор по ключу
+    неприменим. Вместо COUNT(*) выбирается на одну строку больше
+    страницы, чтобы определить наличие следующей. Поиск возвращает не
+    больше SEARCH_MAX_CANDIDATES строк, этот предел передается клиенту
+    в max_results.
+    """
+    default_limit = 20
+    max_limit = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.count = self.offset + len(rows)
+        return rows[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'max_results': settings.SEARCH_MAX_CANDIDATES,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        del response_schema['properties']['count']
+        response_schema['properties']['max_results'] = {
+            'type': 'integer',
+            'example': 1000,
+        }
+        return response_schema
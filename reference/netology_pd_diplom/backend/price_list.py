@@ -0,0 +1,321 @@
+"""Потоковое чтение прайс-листов партнеров.
+
+Документ разбирается по событиям, поэтому в памяти одновременно
+находится только заголовок прайс-листа и один товар.
+"""
+import json
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from requests import get
+from yaml import (
+    AliasEvent,
+    MappingEndEvent,
+    MappingStartEvent,
+    ScalarEvent,
+    ScalarNode,
+    SequenceEndEvent,
+    SequenceStartEvent,
+    parse as parse_yaml,
+)
+from yaml.constructor import SafeConstructor
+from yaml.resolver import Resolver
+
+from backend.util import chunked
+
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:  # PyYAML собран без libyaml
+    from yaml import SafeLoader
+
+PRICE_LIST_UPLOAD_DIR = 'price_lists'
+
+FORMAT_YAML = 'yaml'
+FORMAT_JSON_LINES = 'jsonl'
+PRICE_LIST_FORMATS = (FORMAT_YAML, FORMAT_JSON_LINES)
+
+HEADER_KEYS = ('shop', 'categories')
+
+_resolver = Resolver()
+_constructor = SafeConstructor()
+
+
+class PriceListFormatError(ValueError):
+    """Ошибка структуры прайс-листа."""
+
+
+def detect_format(name, fmt=None):
+    """Определяет формат прайс-листа по явному значению или имени файла.
+
+    Args:
+        name: URL или имя файла прайс-листа
+        fmt: Явно указанный формат
+
+    Returns:
+        Одно из значений PRICE_LIST_FORMATS
+    """
+    if fmt:
+        if fmt not in PRICE_LIST_FORMATS:
+            raise PriceListFormatError(f'Неизвестный формат: {fmt}')
+        return fmt
+    path = name.split('?', 1)[0].lower()
+    if path.endswith(('.jsonl', '.ndjson')):
+        return FORMAT_JSON_LINES
+    return FORMAT_YAML
+
+
+@contextmanager
+def open_url(url):
+    """Открывает прайс-лист по URL для чтения частями."""
+    response = get(
+        url,
+        stream=True,
+        timeout=settings.PRICE_LIST_DOWNLOAD_TIMEOUT
+    )
+    try:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        yield response.raw
+    finally:
+        response.close()
+
+
+def is_url(source):
+    """Проверяет, является ли источник прайс-листа URL."""
+    return source.startswith(('http://', 'https://'))
+
+
+@contextmanager
+def open_source(source):
+    """Открывает прайс-лист по URL или из файлового хранилища."""
+    if is_url(source):
+        with open_url(source) as stream:
+            yield stream
+    else:
+        with default_storage.open(source, 'rb') as stream:
+            yield stream
+
+
+def save_upload(uploaded_file):
+    """Сохраняет загруженный прайс-лист в хранилище.
+
+    Хранилище должно быть общим для веб-сервера и воркеров Celery.
+
+    Returns:
+        Путь к файлу в хранилище
+    """
+    return default_storage.save(
+        f'{PRICE_LIST_UPLOAD_DIR}/{uuid.uuid4().hex}-{uploaded_file.name}',
+        uploaded_file
+    )
+
+
+async def download_price_list(url, fmt):
+    """Скачивает прайс-лист по URL в хранилище без блокировки потока.
+
+    Файл пишется частями во временный файл, в памяти остается не больше
+    одного фрагмента ответа.
+
+    Returns:
+        Путь к файлу в хранилище
+
+    Raises:
+        httpx.HTTPError: Если прайс-лист не удалось скачать
+        PriceListFormatError: Если файл больше PRICE_LIST_MAX_DOWNLOAD_SIZE
+    """
+    async with httpx.AsyncClient(
+        timeout=settings.PRICE_LIST_DOWNLOAD_TIMEOUT,
+        follow_redirects=True
+    ) as client:
+        async with client.stream('GET', url) as response:
+            response.raise_for_status()
+            with tempfile.TemporaryFile() as stream:
+                async for chunk in response.aiter_bytes():
+                    stream.write(chunk)
+                    if stream.tell() > settings.PRICE_LIST_MAX_DOWNLOAD_SIZE:
+                        raise PriceListFormatError(
+                            'Прайс-лист больше '
+                            f'{settings.PRICE_LIST_MAX_DOWNLOAD_SIZE} байт'
+                        )
+                stream.seek(0)
+                return await sync_to_async(default_storage.save)(
+                    f'{PRICE_LIST_UPLOAD_DIR}/{uuid.uuid4().hex}'
+                    f'-download.{fmt}',
+                    File(stream)
+                )
+
+
+def save_goods_chunk(goods, import_id, number):
+    """Сохраняет пакет товаров в хранилище в формате JSON Lines.
+
+    Returns:
+        Путь к файлу пакета в хранилище
+    """
+    content = '\n'.join(
+        json.dumps(item, ensure_ascii=False) for item in goods
+    )
+    return default_storage.save(
+        f'{PRICE_LIST_UPLOAD_DIR}/{import_id}/chunk-{number:05d}.jsonl',
+        ContentFile(content.encode())
+    )
+
+
+def save_goods_chunks(goods, import_id, chunk_size):
+    """Разбивает товары прайс-листа на пакеты в хранилище.
+
+    Пакеты импортируются параллельно, поэтому товар с повторяющимся
+    external_id остается только в пакете с последним его вхождением,
+    как и при последовательном импорте.
+
+    Returns:
+        Пути к файлам пакетов и множество external_id прайс-листа
+    """
+    paths, last_chunk, stale = [], {}, set()
+    try:
+        for number, chunk in enumerate(chunked(goods, chunk_size)):
+            paths.append(save_goods_chunk(chunk, import_id, number))
+            for item in chunk:
+                previous = last_chunk.get(item['id'], number)
+                if previous != number:
+                    stale.add(previous)
+                last_chunk[item['id']] = number
+        for number in sorted(stale):
+            chunk = [
+                item for item in read_goods_chunk(paths[number])
+                if last_chunk[item['id']] == number
+            ]
+            default_storage.delete(paths[number])
+            paths[number] = (
+                save_goods_chunk(chunk, import_id, number) if chunk else None
+            )
+    except BaseException:
+        delete_files(path for path in paths if path)
+        raise
+    return [path for path in paths if path], set(last_chunk)
+
+
+def delete_files(paths):
+    """Удаляет файлы из хранилища."""
+    for path in paths:
+        default_storage.delete(path)
+
+
+def read_goods_chunk(path):
+    """Читает пакет товаров, сохраненный save_goods_chunk."""
+    with default_storage.open(path, 'rb') as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def read_price_list(stream, fmt=FORMAT_YAML):
+    """Читает прайс-лист из потока.
+
+    Ключи shop и categories должны предшествовать списку goods.
+
+    Args:
+        stream: Файловый объект с прайс-листом
+        fmt: Формат прайс-листа, yaml или jsonl
+
+    Returns:
+        Словарь с ключами shop, categories и goods (генератор товаров)
+    """
+    if fmt == FORMAT_JSON_LINES:
+        return _read_json_lines(stream)
+    return _read_yaml(stream)
+
+
+def _read_yaml(stream):
+    """Разбирает YAML по событиям libyaml."""
+    events = parse_yaml(stream, Loader=SafeLoader)
+    header = {}
+    for event in events:
+        if isinstance(event, MappingStartEvent):
+            break
+    else:
+        raise PriceListFormatError('Прайс-лист должен быть словарем')
+
+    for event in events:
+        if isinstance(event, MappingEndEvent):
+            break
+        key = _build(event, events)
+        if key == 'goods':
+            _check_header(header)
+            return {**header, 'goods': _iter_goods(events)}
+        header[key] = _build(next(events), events)
+
+    _check_header(header)
+    return {**header, 'goods': iter(())}
+
+
+def _iter_goods(events):
+    """Возвращает товары из последовательности goods по одному."""
+    event = next(events)
+    if not isinstance(event, SequenceStartEvent):
+        raise PriceListFormatError('goods должен быть списком')
+    for event in events:
+        if isinstance(event, SequenceEndEvent):
+            break
+        yield _build(event, events)
+    for _ in events:
+        pass
+
+
+def _build(event, events):
+    """Собирает значение узла YAML из потока событий."""
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag in (None, '!'):
+            tag = _resolver.resolve(ScalarNode, event.value, event.implicit)
+        constructor = SafeConstructor.yaml_constructors.get(tag)
+        if constructor is None:
+            return event.value
+        return constructor(
+            _constructor,
+            ScalarNode(tag, event.value, style=event.style)
+        )
+    if isinstance(event, MappingStartEvent):
+        value = {}
+        for key_event in events:
+            if isinstance(key_event, MappingEndEvent):
+                return value
+            key = _build(key_event, events)
+            value[key] = _build(next(events), events)
+    if isinstance(event, SequenceStartEvent):
+        value = []
+        for item_event in events:
+            if isinstance(item_event, SequenceEndEvent):
+                return value
+            value.append(_build(item_event, events))
+    if isinstance(event, AliasEvent):
+        raise PriceListFormatError('Ссылки YAML не поддерживаются')
+    raise PriceListFormatError(f'Неожиданное событие YAML: {event}')
+
+
+def _read_json_lines(stream):
+    """Разбирает JSON Lines: заголовок в первой строке, далее товары."""
+    lines = (line for line in stream if line.strip())
+    try:
+        header = json.loads(next(lines))
+    except StopIteration:
+        raise PriceListFormatError('Пустой прайс-лист') from None
+    _check_header(header)
+    return {
+        'shop': header['shop'],
+        'categories': header['categories'],
+        'goods': (json.loads(line) for line in lines),
+    }
+
+
+def _check_header(header):
+    """Проверяет наличие обязательных ключей заголовка."""
+    missing = [key for key in HEADER_KEYS if key not in header]
+    if missing:
+        raise PriceListFormatError(
+            f'Не указаны ключи прайс-листа: {", ".join(missing)}'
+        )
@@ -0,0 +1,72 @@
+"""Быстрый JSON-рендерер на orjson.
+
+Вывод совпадает побайтно с компактным JSONRenderer DRF. Если orjson не
+установлен или данные содержат неподдерживаемые типы, используется
+стандартный рендерер.
+"""
+import json
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:  # orjson - необязательная зависимость
+    orjson = None
+
+# JSONRenderer DRF экранирует разделители строк JavaScript
+_LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+def _orjson_dumps(data):
+    """Сериализует данные через orjson или возвращает None."""
+    if orjson is None:
+        return None
+    try:
+        content = orjson.dumps(data)
+    except TypeError:
+        return None
+    for separator, escaped in _LINE_SEPARATORS:
+        content = content.replace(separator, escaped)
+    return content
+
+
+def dumps(data):
+    """Сериализует данные в компактный JSON в кодировке UTF-8."""
+    content = _orjson_dumps(data)
+    if content is None:
+        content = json.dumps(
+            data,
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+    return content
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer, сериализующий данные через orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        content = None
+        if data is not None and not self.get_indent(
+            accepted_media_type,
+            renderer_context or {}
+        ):
+            content = _orjson_dumps(data)
+        if content is None:
+            return super().render(
+                data,
+                accepted_media_type,
+                renderer_context
+            )
+        return content
+
+
+# Рендереры по умолчанию с FastJSONRenderer вместо JSONRenderer
+FAST_RENDERER_CLASSES = [FastJSONRenderer] + [
+    renderer for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    if renderer is not JSONRenderer
+]
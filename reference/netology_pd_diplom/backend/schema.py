@@ -1,9 +1,18 @@
 from drf_spectacular.utils import (
+    OpenApiParameter,
     inline_serializer,
     extend_schema
 )
 from rest_framework import serializers
-from backend.serializers import OrderSerializer
+from backend.serializers import (
+    ItemsDeleteSerializer,
+    ItemsSerializer,
+    ItemsUpdateSerializer,
+    OrderSerializer,
+    OrderViewSerializer,
+    PartnerOrderSerializer,
+    ProductInfoSerializer
+)
 from drf_spectacular.extensions import OpenApiViewExtension
 
 
@@ -22,34 +31,11 @@ class NewTaskSerializer(serializers.Serializer):
     task_id = serializers.CharField()
 
 
-class ItemSerializer(serializers.Serializer):
-    product_info = serializers.IntegerField()
-    quantity = serializers.IntegerField()
-
-
-class ItemsSerializer(serializers.Serializer):
-    items = ItemSerializer(many=True)
-
-
-class ItemUpdateSerializer(serializers.Serializer):
-    id = serializers.IntegerField()
-    quantity = serializers.IntegerField()
-
-
-class ItemsUpdateSerializer(serializers.Serializer):
-    items = ItemUpdateSerializer(many=True)
-
-
 class ConfirmEmailSerializer(serializers.Serializer):
     email = serializers.CharField()
     token = serializers.CharField()
 
 
-class OrderViewSerializer(serializers.Serializer):
-    id = serializers.IntegerField()
-    contact = serializers.IntegerField()
-
-
 class FixRegisterAccount(OpenApiViewExtension):
     target_class = 'backend.views.RegisterAccount'
 
@@ -104,6 +90,158 @@ class FixLoginAccount(OpenApiViewExtension):
         return FixedLoginAccount
 
 
+CATALOG_FILTER_PARAMETERS = [
+    OpenApiParameter('shop_id', int, description='ID магазина'),
+    OpenApiParameter('category_id', int, description='ID категории'),
+    OpenApiParameter(
+        'param',
+        str,
+        many=True,
+        description=(
+            'Фильтр по параметру: Название:значение или '
+            'Название:мин..макс для числовых значений'
+        ),
+    ),
+    OpenApiParameter('price_min', int, description='Минимальная цена'),
+    OpenApiParameter('price_max', int, description='Максимальная цена'),
+]
+
+
+class FixProductInfoView(OpenApiViewExtension):
+    target_class = 'backend.views.ProductInfoView'
+
+    def view_replacement(self):
+        @extend_schema(
+            tags=['Catalog'],
+            summary='Search products',
+            parameters=CATALOG_FILTER_PARAMETERS + [
+                OpenApiParameter(
+                    'ordering',
+                    str,
+                    enum=['id', '-id', 'price', '-price'],
+                ),
+                OpenApiParameter('stream', bool),
+            ],
+            responses={
+                200: ProductInfoSerializer(many=True),
+                400: StatusSerializer,
+            },
+        )
+        class FixedProductInfoView(self.target_class):
+            def get(self, request, *args, **kwargs):
+                pass
+
+        return FixedProductInfoView
+
+
+class FixProductFacetView(OpenApiViewExtension):
+    target_class = 'backend.views.ProductFacetView'
+
+    def view_replacement(self):
+        @extend_schema(
+            tags=['Catalog'],
+            summary='Count products by parameter values',
+            parameters=CATALOG_FILTER_PARAMETERS,
+            responses={
+                200: inline_serializer(
+                    name='ProductFacet',
+                    many=True,
+                    fields={
+                        'parameter': serializers.CharField(),
+                        'values': inline_serializer(
+                            name='ProductFacetValue',
+                            many=True,
+                            fields={
+                                'value': serializers.CharField(),
+                                'count': serializers.IntegerField(),
+                            },
+                        ),
+                    },
+                ),
+                400: StatusSerializer,
+            },
+        )
+        class FixedProductFacetView(self.target_class):
+            def get(self, request, *args, **kwargs):
+                pass
+
+        return FixedProductFacetView
+
+
+class FixProductSearchView(OpenApiViewExtension):
+    target_class = 'backend.views.ProductSearchView'
+
+    def view_replacement(self):
+        @extend_schema(
+            tags=['Catalog'],
+            summary='Full-text product search',
+            parameters=[
+                OpenApiParameter(
+                    'q',
+                    str,
+                    required=True,
+                    description='Поисковый запрос',
+                ),
+            ] + CATALOG_FILTER_PARAMETERS,
+            responses={
+                200: ProductInfoSerializer(many=True),
+                400: StatusSerializer,
+            },
+        )
+        class FixedProductSearchView(self.target_class):
+            def get(self, request, *args, **kwargs):
+                pass
+
+        return FixedProductSearchView
+
+
+class FixProductOfferView(OpenApiViewExtension):
+    target_class = 'backend.views.ProductOfferView'
+
+    def view_replacement(self):
+        @extend_schema(
+            tags=['Catalog'],
+            summary='Compare shop prices per product',
+            parameters=[
+                OpenApiParameter(
+                    'category_id',
+                    int,
+                    description='ID категории'
+                ),
+            ],
+            responses={
+                200: inline_serializer(
+                    name='ProductOffer',
+                    many=True,
+                    fields={
+                        'id': serializers.IntegerField(),
+                        'name': serializers.CharField(),
+                        'category': serializers.CharField(),
+                        'min_price': serializers.IntegerField(),
+                        'max_price': serializers.IntegerField(),
+                        'offers': serializers.IntegerField(),
+                        'best_offer': inline_serializer(
+                            name='BestOffer',
+                            allow_null=True,
+                            fields={
+                                'id': serializers.IntegerField(),
+                                'shop': serializers.IntegerField(),
+                                'shop_name': serializers.CharField(),
+                                'price': serializers.IntegerField(),
+                                'quantity': serializers.IntegerField(),
+                            },
+                        ),
+                    },
+                ),
+            },
+        )
+        class FixedProductOfferView(self.target_class):
+            def get(self, request, *args, **kwargs):
+                pass
+
+        return FixedProductOfferView
+
+
 class FixBasketView(OpenApiViewExtension):
     target_class = 'backend.views.BasketView'
 
@@ -135,9 +273,10 @@ class FixBasketView(OpenApiViewExtension):
                         name='BasketAddResponse',
                         fields={
                             'status': serializers.BooleanField(),
-                            'created': serializers.CharField(),
+                            'created': serializers.IntegerField(),
                         },
                     ),
+                    400: StatusSerializer,
                     403: StatusAuthErrSerializer,
                 },
             )
@@ -152,9 +291,10 @@ class FixBasketView(OpenApiViewExtension):
                         name='BasketUpdateResponse',
                         fields={
                             'status': serializers.BooleanField(),
-                            'updated': serializers.CharField(),
+                            'updated': serializers.IntegerField(),
                         },
                     ),
+                    400: StatusSerializer,
                     403: StatusAuthErrSerializer,
                 },
             )
@@ -163,15 +303,16 @@ class FixBasketView(OpenApiViewExtension):
 
             @extend_schema(
                 summary='Remove item from basket',
-                request=ItemsSerializer,
+                request=ItemsDeleteSerializer,
                 responses={
                     200: inline_serializer(
                         name='BasketDeleteResponse',
                         fields={
                             'status': serializers.BooleanField(),
-                            'deleted': serializers.CharField(),
+                            'deleted': serializers.IntegerField(),
                         },
                     ),
+                    403: StatusAuthErrSerializer,
                 },
             )
             def delete(self, request, *args, **kwargs):
@@ -180,6 +321,62 @@ class FixBasketView(OpenApiViewExtension):
         return FixedBasketView
 
 
+class FixOrderView(OpenApiViewExtension):
+    target_class = 'backend.views.OrderView'
+
+    def view_replacement(self):
+        @extend_schema(tags=['Shop'])
+        class FixedOrderView(self.target_class):
+            @extend_schema(
+                summary='Get user orders',
+                responses={
+                    200: OrderSerializer(many=True),
+                    403: StatusAuthErrSerializer,
+                },
+            )
+            def get(self, request, *args, **kwargs):
+                pass
+
+            @extend_schema(
+                summary='Place order from basket',
+                request=OrderViewSerializer,
+                responses={
+                    200: StatusSerializer,
+                    400: StatusSerializer,
+                    403: StatusAuthErrSerializer,
+                },
+            )
+            def post(self, request, *args, **kwargs):
+                pass
+
+        return FixedOrderView
+
+
+class FixPartnerUpdate(OpenApiViewExtension):
+    target_class = 'backend.views.PartnerUpdate'
+
+    def view_replacement(self):
+        @extend_schema(
+            tags=['Partner'],
+            summary='Update partner price list',
+            request=inline_serializer(
+                name='PartnerUpdateRequest',
+                fields={
+                    'url': serializers.URLField(required=False),
+                    'file': serializers.FileField(required=False),
+                    'format': serializers.ChoiceField(
+                        choices=['yaml', 'jsonl'],
+                        required=False
+                    ),
+                },
+            ),
+            responses={200: NewTaskSerializer},
+        )
+        class FixedPartnerUpdate(self.target_class):
+            pass
+        return FixedPartnerUpdate
+
+
 class FixPartnerExport(OpenApiViewExtension):
     target_class = 'backend.views.PartnerExport'
 
@@ -187,13 +384,21 @@ class FixPartnerExport(OpenApiViewExtension):
         @extend_schema(
             tags=['Partner'],
             summary='Export partner price list',
+            parameters=[
+                OpenApiParameter(
+                    'file_format',
+                    str,
+                    enum=['yaml', 'json'],
+                    description='Формат файла выгрузки',
+                ),
+            ],
             responses={
                 200: inline_serializer(
                     name='PartnerExportResponse',
                     fields={
-                        'status': serializers.BooleanField(),
-                        'task_id': serializers.CharField(),
-                        'url': serializers.CharField(),
+                        'Status': serializers.BooleanField(),
+                        'Task_id': serializers.CharField(allow_null=True),
+                        'Url': serializers.CharField(),
                     },
                 ),
             },
@@ -211,7 +416,10 @@ class FixPartnerOrders(OpenApiViewExtension):
         class FixedPartnerOrders(self.target_class):
             @extend_schema(
                 summary='Get partner orders',
-                responses={200: OrderSerializer},
+                responses={
+                    200: PartnerOrderSerializer(many=True),
+                    403: StatusAuthErrSerializer,
+                },
             )
             def get(self, request, *args, **kwargs):
                 pass
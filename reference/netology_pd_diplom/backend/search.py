@@ -0,0 +1,153 @@
+"""Полнотекстовый поиск по каталогу.
+
+Для каждой строки CatalogItem хранится search_document: название
+продукта, модель и значения параметров в нижнем регистре. В PostgreSQL
+по нему строится tsvector в конфигурациях russian, english и simple
+с GIN-индексом, а при отсутствии точных совпадений используется
+сходство триграмм pg_trgm. В остальных СУБД поиск сводится к проверке
+вхождения каждого слова запроса.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    TrigramWordSimilarity
+)
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import F
+
+from backend.models import CatalogItem
+
+SEARCH_CONFIGS = ('russian', 'english', 'simple')
+
+# Название важнее модели и параметров при ранжировании
+SEARCH_VECTOR = (
+    SearchVector('product_name', config='russian', weight='A')
+    + SearchVector('product_name', config='english', weight='A')
+    + SearchVector('search_document', config='simple', weight='B')
+)
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def _index_sql(db_connection):
+    table = db_connection.ops.quote_name(CatalogItem._meta.db_table)
+    return (
+        'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+        'CREATE INDEX IF NOT EXISTS catalog_search_vector_idx '
+        f'ON {table} USING GIN (search_vector)',
+        'CREATE INDEX IF NOT EXISTS catalog_search_trgm_idx '
+        f'ON {table} USING GIN (search_document gin_trgm_ops)',
+    )
+
+
+def install_search_indexes(using=DEFAULT_DB_ALIAS, **kwargs):
+    """Создает поисковые индексы PostgreSQL после миграций.
+
+    GIN-индексы и расширение pg_trgm не поддерживаются другими СУБД,
+    поэтому они создаются обработчиком post_migrate, а не миграцией.
+    """
+    db_connection = connections[using]
+    if db_connection.vendor != 'postgresql':
+        return
+    with db_connection.cursor() as cursor:
+        for statement in _index_sql(db_connection):
+            cursor.execute(statement)
+
+
+def build_search_document(product_name, model, parameters):
+    """Собирает поисковый текст строки каталога.
+
+    Args:
+        product_name: Название продукта
+        model: Модель
+        parameters: Параметры в формате CatalogItem.parameters
+
+    Returns:
+        Строка в нижнем регистре
+    """
+    words = [product_name, model]
+    words += [parameter['value'] for parameter in parameters]
+    return ' '.join(word for word in words if word).lower()
+
+
+def update_search_vectors(product_info_ids):
+    """Пересчитывает tsvector строк каталога в PostgreSQL."""
+    if connection.vendor != 'postgresql':
+        return
+    CatalogItem.objects.filter(product_info_id__in=product_info_ids).update(
+        search_vector=SEARCH_VECTOR
+    )
+
+
+def search_tokens(text):
+    """Разбивает поисковый запрос на слова в нижнем регистре."""
+    return _TOKEN_RE.findall(text.lower())[:settings.SEARCH_MAX_TOKENS]
+
+
+def _tsquery(tokens):
+    """Запрос, в котором каждое слово ищется как префикс в любой
+    из конфигураций"""
+    query = None
+    for token in tokens:
+        term = None
+        for config in SEARCH_CONFIGS:
+            part = SearchQuery(
+                f'{token}:*',
+                search_type='raw',
+                config=config
+            )
+            term = part if term is None else term | part
+        query = term if query is None else query & term
+    return query
+
+
+def search_catalog(queryset, text):
+    """Ищет товары выборки CatalogItem и упорядочивает их по релевантности.
+
+    Выдача ограничена SEARCH_MAX_CANDIDATES лучшими совпадениями, чтобы
+    время ответа не зависело от числа совпадений у частых слов.
+
+    Args:
+        queryset: Отфильтрованная выборка CatalogItem
+        text: Поисковый запрос
+
+    Returns:
+        QuerySet CatalogItem, упорядоченный по убыванию релевантности
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return queryset.none()
+
+    if connection.vendor != 'postgresql':
+        for token in tokens:
+            queryset = queryset.filter(search_document__contains=token)
+        candidates = queryset.order_by('product_info_id').values(
+            'product_info_id'
+        )[:settings.SEARCH_MAX_CANDIDATES]
+        return CatalogItem.objects.filter(
+            product_info_id__in=candidates
+        ).order_by('product_info_id')
+
+    query = _tsquery(tokens)
+    matches = queryset.filter(search_vector=query)
+    if matches.exists():
+        rank = SearchRank(F('search_vector'), query)
+    else:
+        # Опечатки: сходство триграмм со словами поискового текста
+        phrase = ' '.join(tokens)
+        matches = queryset.filter(
+            search_document__trigram_word_similar=phrase
+        )
+        rank = TrigramWordSimilarity(phrase, 'search_document')
+    # Лимит отбирает лучшие по рангу строки, а не первые найденные
+    candidates = matches.annotate(rank=rank).order_by(
+        '-rank',
+        'product_info_id'
+    ).values('product_info_id')[:settings.SEARCH_MAX_CANDIDATES]
+    return CatalogItem.objects.filter(
+        product_info_id__in=candidates
+    ).annotate(rank=rank).order_by('-rank', 'product_info_id')
@@ -103,8 +103,8 @@ class ProductInfoSerializer(serializers.ModelSerializer):
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = ('id', 'product_info', 'quantity', 'order',)
-        read_only_fields = ('id',)
+        fields = ('id', 'product_info', 'quantity', 'price', 'order',)
+        read_only_fields = ('id', 'price')
         extra_kwargs = {
             'order': {'write_only': True}
         }
@@ -117,7 +117,6 @@ class OrderItemCreateSerializer(OrderItemSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     ordered_items = OrderItemCreateSerializer(read_only=True, many=True)
 
-    total_sum = serializers.IntegerField()
     contact = ContactSerializer(read_only=True)
 
     class Meta:
@@ -128,9 +127,53 @@ class OrderSerializer(serializers.ModelSerializer):
             'state',
             'dt',
             'total_sum',
+            'items_count',
             'contact',
         )
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'total_sum', 'items_count')
+
+
+class ItemSerializer(serializers.Serializer):
+    product_info = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ItemsSerializer(serializers.Serializer):
+    items = ItemSerializer(many=True, allow_empty=False)
+
+
+class ItemUpdateSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class ItemsUpdateSerializer(serializers.Serializer):
+    items = ItemUpdateSerializer(many=True, allow_empty=False)
+
+
+class ItemsDeleteSerializer(serializers.Serializer):
+    """ID позиций корзины для удаления"""
+    items = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False
+    )
+
+
+class PartnerOrderSerializer(OrderSerializer):
+    """Заказ с позициями и суммой только одного магазина"""
+    shop_total_sum = serializers.IntegerField(read_only=True)
+    shop_items_count = serializers.IntegerField(read_only=True)
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + (
+            'shop_total_sum',
+            'shop_items_count',
+        )
+
+
+class OrderViewSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    contact = serializers.IntegerField()
 
 
 class PartnerProductParameterSerializer(serializers.ModelSerializer):
@@ -172,12 +215,15 @@ class PartnerExportSerializer(serializers.ModelSerializer):
     """Сериализатор для экспорта данных магазина"""
     shop = serializers.CharField(source='name')
     categories = CategorySerializer(many=True, read_only=True)
-    goods = PartnerProductInfoSerializer(
-        source='product_infos',
-        many=True,
-        read_only=True
-    )
+    goods = serializers.SerializerMethodField()
 
     class Meta:
         model = Shop
         fields = ('shop', 'categories', 'goods')
+
+    def get_goods(self, obj):
+        """Товары магазина с категориями и параметрами за три запроса"""
+        product_infos = obj.product_infos.select_related(
+            'product__category'
+        ).prefetch_related('product_parameters__parameter')
+        return PartnerProductInfoSerializer(product_infos, many=True).data
@@ -5,8 +5,23 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver, Signal
 from django_rest_passwordreset.signals import reset_password_token_created
 
-from backend.models import ConfirmEmailToken, User
-from backend.celery_tasks import send_email
+from backend.cache import bump_catalog
+from backend.catalog import refresh_catalog, refresh_offers
+from backend.models import (
+    CatalogItem,
+    Category,
+    ConfirmEmailToken,
+    Order,
+    OrderItem,
+    Product,
+    ProductInfo,
+    ProductOffer,
+    ProductParameter,
+    Shop,
+    User
+)
+from backend.mail import queue_email
+from backend.notifications import notify_order_state
 
 new_user_registered = Signal()
 
@@ -21,7 +36,7 @@ def password_reset_token_created(
     **kwargs
 ):
     """Отправка письма с токеном сброса пароля"""
-    send_email.delay_on_commit(
+    queue_email(
         title=f"Сброс пароля для {reset_password_token.user}",
         message=reset_password_token.key,
         sender=settings.EMAIL_HOST_USER,
@@ -39,7 +54,7 @@ def new_user_registered_signal(
     """Отправка письма с подтверждением email при регистрации"""
     if created and not instance.is_active:
         token, _ = ConfirmEmailToken.objects.get_or_create(user_id=instance.pk)
-        send_email.delay_on_commit(
+        queue_email(
             title=f"Подтверждение email для {instance.email}",
             message=token.key,
             sender=settings.EMAIL_HOST_USER,
@@ -48,12 +63,84 @@ def new_user_registered_signal(
 
 
 @receiver(new_order)
-def new_order_signal(user_id, **kwargs):
-    """Отправка уведомления о новом заказе"""
-    user = User.objects.get(id=user_id)
-    send_email.delay_on_commit(
-        title="Обновление статуса заказа",
-        message="Ваш заказ успешно сформирован",
-        sender=settings.EMAIL_HOST_USER,
-        recipients=[user.email],
+def new_order_signal(user_id, order_id, **kwargs):
+    """Запись уведомления о новом заказе в outbox"""
+    notify_order_state(order_id, user_id, 'new')
+
+
+@receiver(post_save, sender=ProductInfo)
+def product_info_saved(sender, instance, **kwargs):
+    """Обновление строки каталога при изменении ProductInfo"""
+    refresh_catalog([instance.id])
+    bump_catalog(
+        shop_ids=[instance.shop_id],
+        category_ids=[instance.product.category_id]
+    )
+    Order.refresh_totals(Order.baskets_with([instance.id]))
+
+
+@receiver(post_save, sender=ProductParameter)
+def product_parameter_saved(sender, instance, **kwargs):
+    """Обновление параметров в каталоге"""
+    refresh_catalog([instance.product_info_id])
+    bump_catalog(
+        shop_ids=[instance.product_info.shop_id],
+        category_ids=[instance.product_info.product.category_id]
+    )
+
+
+@receiver(post_save, sender=Shop)
+def shop_saved(sender, instance, **kwargs):
+    """Обновление данных магазина в каталоге и сводках предложений"""
+    CatalogItem.objects.filter(shop_id=instance.id).update(
+        shop_name=instance.name,
+        shop_state=instance.state
+    )
+    refresh_offers(
+        CatalogItem.objects.filter(shop_id=instance.id).values_list(
+            'product_id', flat=True
+        ).distinct().iterator()
     )
+    bump_catalog(
+        shop_ids=[instance.id],
+        category_ids=instance.categories.values_list('id', flat=True),
+        shops=True
+    )
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Обновление данных продукта в каталоге"""
+    # Прежние категория и магазины нужны до обновления: при переносе
+    # продукта устаревает и выдача старой категории
+    product_info_ids, shop_ids, category_ids = [], set(), {
+        instance.category_id
+    }
+    for product_info_id, shop_id, category_id in CatalogItem.objects.filter(
+        product_id=instance.id
+    ).values_list('product_info_id', 'shop_id', 'category_id'):
+        product_info_ids.append(product_info_id)
+        shop_ids.add(shop_id)
+        category_ids.add(category_id)
+    # Название входит в поисковый текст, поэтому строки пересобираются
+    # целиком вместе со сводками предложений
+    if refresh_catalog(product_info_ids):
+        bump_catalog(shop_ids=shop_ids, category_ids=category_ids)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    """Обновление названия категории в каталоге"""
+    CatalogItem.objects.filter(category_id=instance.id).update(
+        category_name=instance.name
+    )
+    ProductOffer.objects.filter(category_id=instance.id).update(
+        category_name=instance.name
+    )
+    bump_catalog(category_ids=[instance.id], categories=True)
+
+
+@receiver(post_save, sender=OrderItem)
+def order_item_saved(sender, instance, **kwargs):
+    """Пересчет суммы заказа при изменении позиции"""
+    Order.refresh_totals([instance.order_id])
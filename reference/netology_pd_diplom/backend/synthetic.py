@@ -0,0 +1,77 @@
+"""Генерация синтетических прайс-листов для нагрузочных тестов.
+
+Структура повторяет data/shop1.yaml: магазин, список категорий и товары
+с параметрами.
+"""
+import random
+
+SYNTHETIC_CATEGORIES = (
+    'Смартфоны',
+    'Аксессуары',
+    'Flash-накопители',
+    'Телевизоры',
+    'Ноутбуки',
+    'Планшеты',
+    'Наушники',
+    'Умные часы',
+)
+
+SYNTHETIC_PARAMETERS = {
+    'Диагональ (дюйм)': (5.5, 6.1, 6.5, 13.3, 15.6, 43, 55, 65),
+    'Разрешение (пикс)': ('1792x828', '2688x1242', '1920x1080', '3840x2160'),
+    'Встроенная память (Гб)': (32, 64, 128, 256, 512),
+    'Цвет': ('черный', 'белый', 'красный', 'золотистый', 'серебристый'),
+}
+
+
+def generate_goods(count, categories, seed=0, start_id=1):
+    """Лениво генерирует товары синтетического прайс-листа.
+
+    Args:
+        count: Количество товаров
+        categories: Список категорий в формате прайс-листа
+        seed: Зерно генератора случайных чисел
+        start_id: Внешний ID первого товара
+
+    Yields:
+        Словарь товара в формате прайс-листа
+    """
+    rnd = random.Random(seed)
+    for number in range(count):
+        category = categories[number % len(categories)]
+        price = rnd.randrange(500, 200000, 10)
+        yield {
+            'id': start_id + number,
+            'category': category['id'],
+            'model': f'synthetic/{category["id"]}/{number % 997}',
+            'name': f'{category["name"]} модель {number}',
+            'price': price,
+            'price_rrc': price + rnd.randrange(0, 10000, 10),
+            'quantity': rnd.randrange(0, 50),
+            'parameters': {
+                name: rnd.choice(values)
+                for name, values in SYNTHETIC_PARAMETERS.items()
+            },
+        }
+
+
+def generate_price_list(goods=1000, shop='Синтетический магазин', seed=0):
+    """Возвращает синтетический прайс-лист с ленивым списком товаров.
+
+    Args:
+        goods: Количество товаров
+        shop: Название магазина
+        seed: Зерно генератора случайных чисел
+
+    Returns:
+        Словарь с ключами shop, categories и goods (генератор)
+    """
+    categories = [
+        {'id': 1000 + index, 'name': name}
+        for index, name in enumerate(SYNTHETIC_CATEGORIES)
+    ]
+    return {
+        'shop': shop,
+        'categories': categories,
+        'goods': generate_goods(goods, categories, seed=seed),
+    }
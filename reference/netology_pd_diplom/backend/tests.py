@@ -1,3 +1,2294 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import re
+import shutil
+import smtplib
+import tempfile
+import threading
+from unittest import mock, skipUnless
+from urllib.parse import unquote
 
-# Create your tests here.
+import httpx
+import yaml
+from prometheus_client import REGISTRY
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, QuerySet
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django_rest_passwordreset.models import ResetPasswordToken
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from backend.benchmarks import seed_orders
+from backend.budget import count_queries, get_query_budget
+from backend.cache import (
+    SHOPS,
+    bump_versions,
+    cache_stats,
+    get_versions,
+    shop_key
+)
+from backend.catalog import refresh_catalog
+from backend.celery_tasks import (
+    partner_export,
+    partner_update,
+    partner_update_chunk
+)
+from backend.export import export_price_list, export_ready_key
+from backend.importer import import_price_list
+from backend.mail import drain_email_queue, queue_email
+from backend.notifications import notify_order_state, relay_notifications
+from backend.price_list import (
+    FORMAT_JSON_LINES,
+    PriceListFormatError,
+    read_goods_chunk,
+    read_price_list
+)
+from backend.models import (
+    CatalogItem,
+    Category,
+    ConfirmEmailToken,
+    Contact,
+    NotificationEvent,
+    Order,
+    OrderItem,
+    Parameter,
+    Product,
+    ProductInfo,
+    ProductOffer,
+    ProductParameter,
+    QueuedEmail,
+    Shop,
+    User
+)
+from backend.serializers import PartnerExportSerializer
+from backend.synthetic import generate_price_list
+from backend.urls import urlpatterns
+from backend.views import ContactView
+
+
+def create_shop(goods=20, email='shop@example.com'):
+    """Создает пользователя-магазин и импортирует синтетический прайс."""
+    user = User.objects.create_user(
+        email=email,
+        password='password',
+        type='shop',
+        is_active=True
+    )
+    import_price_list(
+        generate_price_list(goods=goods, shop=f'Магазин {email}'),
+        user.id
+    )
+    return user
+
+
+SHOP1_PATH = settings.BASE_DIR.parent.parent / 'data' / 'shop1.yaml'
+
+
+def load_shop1():
+    """Прайс-лист из data/shop1.yaml."""
+    with open(SHOP1_PATH, encoding='utf-8') as stream:
+        return yaml.safe_load(stream)
+
+
+class PriceListImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='shop@example.com',
+            password='password',
+            type='shop',
+            is_active=True
+        )
+        self.data = load_shop1()
+
+    def row_counts(self):
+        return {
+            model.__name__: model.objects.count()
+            for model in (Shop, Category, Product, ProductInfo, Parameter,
+                          ProductParameter, CatalogItem)
+        }
+
+    def test_import_creates_rows(self):
+        goods = self.data['goods']
+
+        stats = import_price_list(load_shop1(), self.user.id)
+
+        self.assertEqual(self.row_counts(), {
+            'Shop': 1,
+            'Category': len(self.data['categories']),
+            'Product': len({(item['name'], item['category'])
+                            for item in goods}),
+            'ProductInfo': len(goods),
+            'Parameter': len({name for item in goods
+                              for name in item['parameters']}),
+            'ProductParameter': sum(len(item['parameters'])
+                                    for item in goods),
+            'CatalogItem': len(goods),
+        })
+        self.assertEqual(stats['created'], len(goods))
+        self.assertEqual(
+            stats['parameters_created'],
+            ProductParameter.objects.count()
+        )
+
+    def test_reimport_is_idempotent(self):
+        import_price_list(load_shop1(), self.user.id)
+        counts = self.row_counts()
+
+        stats = import_price_list(load_shop1(), self.user.id)
+
+        self.assertEqual(self.row_counts(), counts)
+        self.assertEqual(stats['created'], 0)
+        self.assertEqual(stats['updated'], 0)
+        self.assertEqual(stats['deleted'], 0)
+        self.assertEqual(stats['unchanged'], len(self.data['goods']))
+        self.assertEqual(stats['parameters_created'], 0)
+
+
+class PriceListSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email='shop@example.com',
+            password='password',
+            type='shop',
+            is_active=True
+        )
+        import_price_list(load_shop1(), self.user.id)
+
+    def test_reimport_writes_only_changes(self):
+        ids = dict(ProductInfo.objects.values_list('external_id', 'id'))
+        data = load_shop1()
+        changed, removed, with_parameter = data['goods'][:3]
+        changed['price'] += 1
+        del data['goods'][1]
+        name = next(iter(with_parameter['parameters']))
+        with_parameter['parameters'][name] = 'новое значение'
+
+        stats = import_price_list(data, self.user.id)
+
+        self.assertEqual(
+            {key: stats[key] for key in (
+                'created', 'updated', 'unchanged', 'deleted',
+                'parameters_created', 'parameters_updated',
+                'parameters_deleted',
+            )},
+            {
+                'created': 0,
+                'updated': 1,
+                'unchanged': len(data['goods']) - 1,
+                'deleted': 1,
+                'parameters_created': 0,
+                'parameters_updated': 1,
+                'parameters_deleted': 0,
+            }
+        )
+        del ids[removed['id']]
+        self.assertEqual(
+            dict(ProductInfo.objects.values_list('external_id', 'id')),
+            ids
+        )
+        self.assertEqual(
+            ProductInfo.objects.get(id=ids[changed['id']]).price,
+            changed['price']
+        )
+        self.assertEqual(
+            ProductParameter.objects.get(
+                product_info_id=ids[with_parameter['id']],
+                parameter__name=name
+            ).value,
+            'новое значение'
+        )
+
+
+class PriceListReaderTests(TestCase):
+    def read(self, text, fmt='yaml'):
+        data = read_price_list(io.BytesIO(text.encode()), fmt)
+        return {**data, 'goods': list(data['goods'])}
+
+    def test_yaml_matches_safe_load(self):
+        with open(SHOP1_PATH, 'rb') as stream:
+            data = read_price_list(stream)
+            data['goods'] = list(data['goods'])
+
+        self.assertEqual(data, load_shop1())
+
+    def test_goods_before_header(self):
+        with self.assertRaisesRegex(PriceListFormatError, 'shop, categories'):
+            self.read('goods: []\nshop: Магазин\ncategories: []\n')
+
+    def test_aliases_are_rejected(self):
+        with self.assertRaisesRegex(PriceListFormatError, 'Ссылки'):
+            self.read(
+                'shop: Магазин\ncategories: []\n'
+                'goods:\n  - &item {id: 1}\n  - *item\n'
+            )
+
+    def test_empty_json_lines(self):
+        with self.assertRaisesRegex(PriceListFormatError, 'Пустой'):
+            self.read('', FORMAT_JSON_LINES)
+
+    def test_json_lines(self):
+        data = load_shop1()
+        text = '\n'.join(
+            json.dumps(line, ensure_ascii=False) for line in [
+                {'shop': data['shop'], 'categories': data['categories']},
+                *data['goods'],
+            ]
+        )
+
+        self.assertEqual(self.read(text, FORMAT_JSON_LINES), data)
+
+
+class PartnerUpdateTaskTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(
+            MEDIA_ROOT=media_root,
+            PRICE_LIST_IMPORT_CHUNK_SIZE=4
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(
+            email='shop@example.com',
+            password='password',
+            type='shop',
+            is_active=True
+        )
+
+    def save_price_list(self, goods):
+        return default_storage.save(
+            'price_lists/shop.yaml',
+            ContentFile(yaml.safe_dump({
+                'shop': 'Магазин',
+                'categories': [{'id': 1, 'name': 'Телефоны'}],
+                'goods': goods,
+            }, allow_unicode=True, sort_keys=False).encode())
+        )
+
+    def good(self, number, price=100):
+        return {
+            'id': number,
+            'category': 1,
+            'model': f'model-{number}',
+            'name': f'Телефон {number}',
+            'price': price,
+            'price_rrc': price,
+            'quantity': 1,
+            'parameters': {},
+        }
+
+    def assertStorageEmpty(self):
+        directories, files = default_storage.listdir('price_lists')
+        self.assertEqual(files, [])
+        for directory in directories:
+            self.assertEqual(
+                default_storage.listdir(f'price_lists/{directory}')[1],
+                []
+            )
+
+    def start(self, source):
+        with mock.patch(
+            'celery.app.task.Task.replace',
+            lambda task, signature: signature
+        ):
+            return partner_update.apply(args=(source, self.user.id)).get()
+
+    def test_duplicates_are_kept_in_last_chunk_only(self):
+        goods = [self.good(number) for number in range(10)]
+        goods[9] = self.good(1, price=200)
+        import_chord = self.start(self.save_price_list(goods))
+
+        chunks = [
+            read_goods_chunk(task.args[1])
+            for task in import_chord.tasks
+        ]
+        ids = [item['id'] for chunk in chunks for item in chunk]
+        self.assertEqual(sorted(ids), list(range(9)))
+        self.assertEqual(chunks[-1][-1]['price'], 200)
+
+        for task in import_chord.tasks:
+            task.apply().get()
+        self.assertEqual(
+            ProductInfo.objects.get(external_id=1).price,
+            200
+        )
+        self.assertStorageEmpty()
+
+    def test_failed_chunk_is_deleted(self):
+        import_chord = self.start(
+            self.save_price_list([self.good(number) for number in range(6)])
+        )
+        task = import_chord.tasks[0]
+
+        result = partner_update_chunk.apply(args=(0, task.args[1]))
+
+        self.assertTrue(result.failed())
+        self.assertFalse(default_storage.exists(task.args[1]))
+
+    def test_invalid_price_list_leaves_no_files(self):
+        goods = [self.good(number) for number in range(6)]
+        del goods[5]['id']
+
+        result = partner_update.apply(
+            args=(self.save_price_list(goods), self.user.id)
+        )
+
+        self.assertTrue(result.failed())
+        self.assertStorageEmpty()
+
+    def test_chunks_are_imported_and_deleted(self):
+        with open(SHOP1_PATH, 'rb') as stream:
+            source = default_storage.save(
+                'price_lists/shop1.yaml',
+                ContentFile(stream.read())
+            )
+        goods = len(load_shop1()['goods'])
+
+        # Хордом распоряжается брокер, поэтому пакеты и итоговая задача
+        # выполняются здесь синхронно
+        with mock.patch(
+            'celery.app.task.Task.replace',
+            lambda task, signature: signature
+        ):
+            import_chord = partner_update.apply(
+                args=(source, self.user.id)
+            ).get()
+        header = [task.apply().get() for task in import_chord.tasks]
+        stats = import_chord.body.apply(args=(header,)).get()
+
+        self.assertEqual(len(header), 4)
+        self.assertEqual(stats['created'], goods)
+        self.assertEqual(stats['deleted'], 0)
+        self.assertEqual(
+            stats['parameters_created'],
+            ProductParameter.objects.count()
+        )
+        self.assertEqual(ProductInfo.objects.count(), goods)
+        self.assertStorageEmpty()
+
+
+class CatalogReadModelTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            email='shop@example.com',
+            password='password',
+            type='shop',
+            is_active=True
+        )
+        import_price_list(load_shop1(), user.id)
+        self.product_info = ProductInfo.objects.select_related(
+            'shop', 'product__category'
+        ).order_by('id').first()
+
+    def catalog_item(self):
+        return CatalogItem.objects.get(product_info=self.product_info)
+
+    def test_refresh_rebuilds_rows(self):
+        ProductInfo.objects.filter(id=self.product_info.id).update(
+            price=1,
+            quantity=2
+        )
+
+        self.assertEqual(refresh_catalog([self.product_info.id]), 1)
+
+        item = self.catalog_item()
+        self.assertEqual((item.price, item.quantity), (1, 2))
+
+    def test_follows_product_info(self):
+        self.product_info.price = 1
+        self.product_info.save()
+
+        self.assertEqual(self.catalog_item().price, 1)
+
+    def test_follows_product_parameter(self):
+        parameter = self.product_info.product_parameters.select_related(
+            'parameter'
+        ).first()
+        parameter.value = 'новое значение'
+        parameter.save()
+
+        self.assertIn(
+            {'parameter': parameter.parameter.name, 'value': 'новое значение'},
+            self.catalog_item().parameters
+        )
+
+    def test_follows_shop(self):
+        shop = self.product_info.shop
+        shop.name = 'Новый магазин'
+        shop.state = False
+        shop.save()
+
+        item = self.catalog_item()
+        self.assertEqual(
+            (item.shop_name, item.shop_state),
+            ('Новый магазин', False)
+        )
+
+    def test_follows_product(self):
+        category = Category.objects.exclude(
+            id=self.product_info.product.category_id
+        ).first()
+        product = self.product_info.product
+        product.name = 'Новый продукт'
+        product.category = category
+        product.save()
+
+        item = self.catalog_item()
+        self.assertEqual(
+            (item.product_name, item.category_id, item.category_name),
+            ('Новый продукт', category.id, category.name)
+        )
+
+    def test_follows_category(self):
+        category = self.product_info.product.category
+        category.name = 'Новая категория'
+        category.save()
+
+        self.assertEqual(self.catalog_item().category_name, 'Новая категория')
+
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_shop(goods=30)
+        # Треть товаров с одинаковой ценой проверяет порядок по id
+        # внутри цены
+        ids = list(CatalogItem.objects.order_by(
+            'product_info_id'
+        ).values_list('product_info_id', flat=True))
+        CatalogItem.objects.filter(product_info_id__in=ids[::3]).update(
+            price=1000
+        )
+        self.client = APIClient()
+
+    def expected(self, *ordering):
+        return list(CatalogItem.objects.order_by(*ordering).values_list(
+            'product_info_id',
+            flat=True
+        ))
+
+    def pages(self, params):
+        ids, cursors = [], []
+        url = '/api/v1/products?' + params
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+            if url:
+                cursors.append(re.search('cursor=([^&]+)', url).group(1))
+        return ids, cursors
+
+    def test_pages_by_id(self):
+        ids, _ = self.pages('page_size=7')
+
+        self.assertEqual(ids, self.expected('product_info_id'))
+
+    def test_pages_by_price_without_offset(self):
+        for ordering, fields in (
+            ('price', ('price', 'product_info_id')),
+            ('-price', ('-price', '-product_info_id')),
+        ):
+            with self.subTest(ordering=ordering):
+                ids, cursors = self.pages(f'page_size=4&ordering={ordering}')
+
+                self.assertEqual(ids, self.expected(*fields))
+                for cursor in cursors:
+                    self.assertNotIn(
+                        'o=',
+                        base64.b64decode(unquote(cursor)).decode()
+                    )
+
+    def test_previous_page(self):
+        first = self.client.get(
+            '/api/v1/products?page_size=4&ordering=price'
+        ).json()
+        second = self.client.get(first['next']).json()
+
+        previous = self.client.get(second['previous']).json()
+
+        self.assertEqual(previous['results'], first['results'])
+
+    def test_invalid_cursor(self):
+        # cD14 - base64 от p=x
+        response = self.client.get('/api/v1/products', {'cursor': 'cD14'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_stream(self):
+        response = self.client.get(
+            '/api/v1/products',
+            {'stream': 1, 'ordering': 'price'}
+        )
+
+        self.assertEqual(
+            [item['id'] for item in json.loads(
+                b''.join(response.streaming_content)
+            )],
+            self.expected('price', 'product_info_id')
+        )
+
+
+class CatalogCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_shop()
+        self.client = APIClient()
+
+    def test_repeated_request_is_served_from_cache(self):
+        first = self.client.get('/api/v1/products').json()
+        second = self.client.get('/api/v1/products').json()
+
+        self.assertEqual(first, second)
+        self.assertEqual(
+            cache_stats(['products'])['products'],
+            {'hit': 1, 'miss': 1}
+        )
+
+    def test_shop_state_change_invalidates_cache(self):
+        shop_id = self.user.shop.id
+        response = self.client.get('/api/v1/products', {'shop_id': shop_id})
+        self.assertEqual(len(response.json()['results']), 20)
+
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/v1/partner/state', {'state': 'off'})
+        self.client.force_authenticate(None)
+
+        response = self.client.get('/api/v1/products', {'shop_id': shop_id})
+        self.assertEqual(response.json()['results'], [])
+        self.assertEqual(self.client.get('/api/v1/shops').json()['count'], 0)
+
+    def test_import_invalidates_cache(self):
+        self.client.get('/api/v1/products', {'ordering': 'price'})
+        data = generate_price_list(goods=20, shop=self.user.shop.name)
+        goods = list(data['goods'])
+        goods[0]['price'] = 1
+        data['goods'] = goods
+        with self.captureOnCommitCallbacks(execute=True):
+            import_price_list(data, self.user.id)
+
+        response = self.client.get('/api/v1/products', {'ordering': 'price'})
+        self.assertEqual(response.json()['results'][0]['price'], 1)
+
+    def test_versions_are_bumped_after_commit(self):
+        names = [shop_key(self.user.shop.id), SHOPS]
+        before = get_versions(names)
+
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post('/api/v1/partner/state', {'state': 'off'})
+            self.assertEqual(get_versions(names), before)
+
+        self.assertTrue(callbacks)
+        after = get_versions(names)
+        for name in names:
+            self.assertGreater(after[name], before[name])
+
+    def category_ids(self, category_id):
+        response = self.client.get(
+            '/api/v1/products',
+            {'category_id': category_id, 'page_size': 500}
+        )
+        return [item['id'] for item in response.json()['results']]
+
+    def test_product_move_invalidates_old_category(self):
+        product_info = ProductInfo.objects.select_related(
+            'product'
+        ).order_by('id').first()
+        product = product_info.product
+        old_category_id = product.category_id
+        self.assertIn(product_info.id, self.category_ids(old_category_id))
+
+        product.category = Category.objects.exclude(
+            id=old_category_id
+        ).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertNotIn(product_info.id, self.category_ids(old_category_id))
+
+    def test_import_move_invalidates_old_category(self):
+        data = generate_price_list(goods=20, shop=self.user.shop.name)
+        goods = list(data['goods'])
+        old_category_id = goods[0]['category']
+        new_category_id = next(
+            category['id'] for category in data['categories']
+            if category['id'] != old_category_id
+        )
+        # Из прайс-листа уходит вся категория, поэтому она не попадает
+        # в категории импортированных товаров
+        for item in goods:
+            if item['category'] == old_category_id:
+                item['category'] = new_category_id
+        data['goods'] = goods
+        product_info_id = ProductInfo.objects.get(
+            shop=self.user.shop,
+            external_id=goods[0]['id']
+        ).id
+        self.assertIn(product_info_id, self.category_ids(old_category_id))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_price_list(data, self.user.id)
+
+        self.assertNotIn(product_info_id, self.category_ids(old_category_id))
+
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_shop(goods=40)
+        self.client = APIClient()
+
+    def get_ids(self, **params):
+        response = self.client.get(
+            '/api/v1/products',
+            {'page_size': 100, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.json()['results']}
+
+    def expected_ids(self, name, check):
+        return set(ProductParameter.objects.filter(
+            parameter__name=name
+        ).filter(check).values_list('product_info_id', flat=True))
+
+    def test_numeric_value_is_parsed(self):
+        values = dict(ProductParameter.objects.filter(
+            parameter__name__in=['Диагональ (дюйм)', 'Цвет']
+        ).values_list('value', 'value_numeric').distinct())
+        self.assertEqual(values['6.5'], 6.5)
+        self.assertIsNone(values['черный'])
+
+    def test_filter_by_value(self):
+        ids = self.get_ids(param=['Цвет:черный', 'Цвет:белый'])
+
+        self.assertEqual(ids, self.expected_ids(
+            'Цвет',
+            Q(value__in=['черный', 'белый'])
+        ))
+
+    def test_filter_by_range_and_price(self):
+        ids = self.get_ids(
+            param=['Встроенная память (Гб):128..', 'Цвет:черный'],
+            price_max=100000
+        )
+
+        expected = self.expected_ids(
+            'Встроенная память (Гб)',
+            Q(value_numeric__gte=128)
+        ) & self.expected_ids('Цвет', Q(value='черный'))
+        expected &= set(ProductInfo.objects.filter(
+            price__lte=100000
+        ).values_list('id', flat=True))
+        self.assertTrue(expected)
+        self.assertEqual(ids, expected)
+
+    def test_unknown_parameter_returns_nothing(self):
+        self.assertEqual(self.get_ids(param='Вес:1'), set())
+
+    def test_invalid_filter(self):
+        for params in ({'param': 'Цвет'}, {'price_min': 'x'}):
+            response = self.client.get('/api/v1/products', params)
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['Status'])
+
+    def test_facets_are_counted_in_one_query(self):
+        params = {'param': 'Цвет:черный'}
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/v1/products/facets', params)
+        grouped = [
+            query for query in context.captured_queries
+            if query['sql'].startswith('SELECT') and 'GROUP BY' in query['sql']
+        ]
+        self.assertEqual(len(grouped), 1)
+
+        facets = {
+            facet['parameter']: {
+                item['value']: item['count'] for item in facet['values']
+            }
+            for facet in response.json()
+        }
+        black = self.expected_ids('Цвет', Q(value='черный'))
+        self.assertEqual(facets['Цвет'], {'черный': len(black)})
+        self.assertEqual(
+            sum(facets['Встроенная память (Гб)'].values()),
+            len(black)
+        )
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_shop(goods=40)
+        self.client = APIClient()
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/products/search', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_search_document_is_built_by_import(self):
+        item = CatalogItem.objects.order_by('product_info').first()
+
+        self.assertIn(item.product_name.lower(), item.search_document)
+        self.assertIn(item.model, item.search_document)
+        for parameter in item.parameters:
+            self.assertIn(parameter['value'].lower(), item.search_document)
+
+    def test_all_words_must_match(self):
+        item = CatalogItem.objects.order_by('product_info').first()
+        color = next(
+            parameter['value'] for parameter in item.parameters
+            if parameter['parameter'] == 'Цвет'
+        )
+
+        data = self.search(q=f'{item.product_name.upper()} {color}')
+
+        self.assertEqual(
+            [result['id'] for result in data['results']],
+            [item.product_info_id]
+        )
+
+    def test_results_are_paginated(self):
+        first = self.search(q='модель', limit=15)
+        self.assertEqual(len(first['results']), 15)
+        self.assertIsNone(first['previous'])
+
+        second = self.client.get(first['next']).json()
+        third = self.client.get(second['next']).json()
+        self.assertEqual(len(third['results']), 10)
+        self.assertIsNone(third['next'])
+        ids = [
+            result['id']
+            for page in (first, second, third)
+            for result in page['results']
+        ]
+        self.assertEqual(len(set(ids)), 40)
+
+    def test_renamed_product_is_found_by_new_name(self):
+        item = CatalogItem.objects.order_by('product_info').first()
+        product = Product.objects.get(id=item.product_id)
+        product.name = 'Переименованный продукт'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+
+        self.assertEqual(
+            [result['id'] for result in self.search(q='переименованный')[
+                'results'
+            ]],
+            [item.product_info_id]
+        )
+        self.assertNotIn(
+            item.product_info_id,
+            [result['id'] for result in self.search(q=item.product_name)[
+                'results'
+            ]]
+        )
+
+    @override_settings(SEARCH_MAX_CANDIDATES=25)
+    def test_results_are_limited(self):
+        first = self.search(q='модель', limit=20)
+        second = self.client.get(first['next']).json()
+
+        self.assertEqual(first['max_results'], 25)
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+
+    def test_query_is_required(self):
+        response = self.client.get('/api/v1/products/search', {'q': ' '})
+        self.assertEqual(response.status_code, 400)
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Полнотекстовый поиск требует PostgreSQL'
+)
+class PostgresSearchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_shop(goods=40)
+        self.client = APIClient()
+
+    def test_prefix_search_is_ranked(self):
+        response = self.client.get(
+            '/api/v1/products/search',
+            {'q': 'смартфон 12'}
+        )
+        results = response.json()['results']
+
+        self.assertTrue(results)
+        for result in results:
+            self.assertEqual(result['product']['category'], 'Смартфоны')
+
+    def test_limit_keeps_best_matches(self):
+        params = {'q': 'смартфон 12', 'limit': 1}
+        best = self.client.get('/api/v1/products/search', params).json()
+
+        cache.clear()
+        with override_settings(SEARCH_MAX_CANDIDATES=1):
+            limited = self.client.get(
+                '/api/v1/products/search',
+                params
+            ).json()
+
+        self.assertEqual(limited['results'], best['results'])
+
+    def test_typo_falls_back_to_trigrams(self):
+        response = self.client.get(
+            '/api/v1/products/search',
+            {'q': 'смартфаны'}
+        )
+
+        self.assertTrue(response.json()['results'])
+
+
+class ProductOfferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = create_shop(goods=16, email='first@example.com')
+        self.second = User.objects.create_user(
+            email='second@example.com',
+            password='password',
+            type='shop',
+            is_active=True
+        )
+        data = generate_price_list(goods=16, shop='Второй магазин')
+        goods = list(data['goods'])
+        for item in goods:
+            item['price'] -= 100
+            item['quantity'] = 5
+        goods[0]['quantity'] = 0
+        data['goods'] = goods
+        import_price_list(data, self.second.id)
+        self.client = APIClient()
+
+    def get_offers(self, **params):
+        response = self.client.get('/api/v1/products/offers', params)
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item for item in response.json()['results']}
+
+    def expected(self, product):
+        offers = list(ProductInfo.objects.filter(
+            product=product,
+            shop__state=True
+        ).values('id', 'shop_id', 'price', 'quantity'))
+        in_stock = sorted(
+            (offer for offer in offers if offer['quantity']),
+            key=lambda offer: (offer['price'], offer['id'])
+        )
+        return {
+            'min_price': min(offer['price'] for offer in offers),
+            'max_price': max(offer['price'] for offer in offers),
+            'offers': len(offers),
+            'best_offer': in_stock[0]['id'] if in_stock else None,
+        }
+
+    def test_offers_are_compared_across_shops(self):
+        offers = self.get_offers(page_size=100)
+
+        self.assertEqual(len(offers), Product.objects.count())
+        for product in Product.objects.all():
+            offer = offers[product.id]
+            best_offer = offer['best_offer'] and offer['best_offer']['id']
+            self.assertEqual(offer['offers'], 2)
+            self.assertEqual(
+                {
+                    'min_price': offer['min_price'],
+                    'max_price': offer['max_price'],
+                    'offers': offer['offers'],
+                    'best_offer': best_offer,
+                },
+                self.expected(product)
+            )
+
+    def test_shop_id_does_not_narrow_cache_dependencies(self):
+        shop_id = Shop.objects.get(user=self.first).id
+        product_info = ProductInfo.objects.filter(
+            shop__user=self.second
+        ).first()
+        self.get_offers(shop_id=shop_id, page_size=100)
+
+        product_info.price = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            product_info.save()
+
+        offers = self.get_offers(shop_id=shop_id, page_size=100)
+        self.assertEqual(offers[product_info.product_id]['min_price'], 1)
+
+    def test_out_of_stock_offer_is_not_best(self):
+        product_info = ProductInfo.objects.get(
+            shop__user=self.second,
+            quantity=0
+        )
+
+        offer = self.get_offers(page_size=100)[product_info.product_id]
+
+        self.assertEqual(offer['min_price'], product_info.price)
+        self.assertNotEqual(
+            offer['best_offer'] and offer['best_offer']['id'],
+            product_info.id
+        )
+
+    def test_closed_shop_is_excluded(self):
+        self.client.force_authenticate(self.second)
+        self.client.post('/api/v1/partner/state', {'state': 'off'})
+        self.client.force_authenticate(None)
+
+        for offer in self.get_offers(page_size=100).values():
+            self.assertEqual(offer['offers'], 1)
+            if offer['best_offer']:
+                self.assertEqual(
+                    offer['best_offer']['shop'],
+                    self.first.shop.id
+                )
+
+    def test_category_page_is_one_query(self):
+        category_id = Product.objects.values_list(
+            'category_id', flat=True
+        ).first()
+        with CaptureQueriesContext(connection) as queries:
+            offers = self.get_offers(category_id=category_id)
+
+        self.assertTrue(offers)
+        self.assertEqual(len([
+            query for query in queries.captured_queries
+            if 'silk_' not in query['sql']
+            and not query['sql'].startswith(
+                ('EXPLAIN', 'SAVEPOINT', 'RELEASE SAVEPOINT')
+            )
+        ]), 1)
+
+
+class OrderTotalsTests(TestCase):
+    def setUp(self):
+        self.shop_user = create_shop()
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            password='password',
+            is_active=True
+        )
+        self.product_info = ProductInfo.objects.order_by('id').first()
+
+    def create_order(self, state='basket', price=None):
+        order = Order.objects.create(user=self.buyer, state=state)
+        OrderItem.objects.create(
+            order=order,
+            product_info=self.product_info,
+            quantity=2,
+            price=price
+        )
+        order.refresh_from_db()
+        return order
+
+    def reimport_with_price(self, price):
+        data = generate_price_list(goods=20, shop=self.shop_user.shop.name)
+        goods = list(data['goods'])
+        goods[0]['price'] = price
+        data['goods'] = goods
+        import_price_list(data, self.shop_user.id)
+
+    def test_totals_follow_items(self):
+        order = self.create_order()
+        self.assertEqual(order.items_count, 1)
+        self.assertEqual(order.total_sum, 2 * self.product_info.price)
+
+    def test_basket_follows_price_and_order_keeps_snapshot(self):
+        basket = self.create_order()
+        order = self.create_order(state='new', price=self.product_info.price)
+        self.reimport_with_price(1)
+
+        basket.refresh_from_db()
+        order.refresh_from_db()
+        self.assertEqual(basket.total_sum, 2)
+        self.assertEqual(order.total_sum, 2 * self.product_info.price)
+
+
+class BasketTests(TestCase):
+    def setUp(self):
+        create_shop(goods=40)
+        self.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            password='password',
+            is_active=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+        self.product_infos = list(ProductInfo.objects.order_by('id'))
+
+    def add_items(self, product_infos, quantity=1):
+        return self.client.post(
+            '/api/v1/basket',
+            {
+                'items': [
+                    {'product_info': info.id, 'quantity': quantity}
+                    for info in product_infos
+                ]
+            },
+            format='json'
+        )
+
+    def count_queries(self, product_infos):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.add_items(product_infos)
+        self.assertEqual(response.status_code, 200, response.json())
+        return len([
+            query for query in queries.captured_queries
+            if not query['sql'].startswith(('EXPLAIN', 'SAVEPOINT'))
+        ])
+
+    def test_add_is_constant_in_number_of_items(self):
+        Order.objects.create(user=self.buyer, state='basket')
+        single = self.count_queries(self.product_infos[:1])
+        many = self.count_queries(self.product_infos[1:21])
+
+        self.assertEqual(single, many)
+        basket = Order.objects.get(user=self.buyer, state='basket')
+        self.assertEqual(basket.items_count, 21)
+
+    def test_add_replaces_quantity(self):
+        self.add_items(self.product_infos[:2])
+        self.add_items(self.product_infos[:1], quantity=3)
+
+        basket = Order.objects.get(user=self.buyer, state='basket')
+        self.assertEqual(basket.items_count, 2)
+        self.assertEqual(
+            basket.total_sum,
+            3 * self.product_infos[0].price + self.product_infos[1].price
+        )
+
+    def test_add_checks_stock(self):
+        info = self.product_infos[0]
+        response = self.add_items([info], quantity=info.quantity + 1)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OrderItem.objects.exists())
+
+    def test_user_has_one_basket(self):
+        Order.objects.create(user=self.buyer, state='basket')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Order.objects.create(user=self.buyer, state='basket')
+
+    def test_concurrent_first_add_reuses_basket(self):
+        basket = Order.objects.create(user=self.buyer, state='basket')
+        # Корзину создал параллельный запрос после поиска в get_or_create
+        get = QuerySet.get
+        raced = []
+
+        def racing_get(queryset, *args, **kwargs):
+            if queryset.model is Order and not raced:
+                raced.append(True)
+                raise Order.DoesNotExist
+            return get(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, 'get', racing_get):
+            response = self.add_items(self.product_infos[:1])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(raced)
+        self.assertEqual(
+            Order.objects.get(user=self.buyer, state='basket').id,
+            basket.id
+        )
+
+    def test_update_and_delete(self):
+        self.add_items(self.product_infos[:3])
+        item_ids = list(
+            OrderItem.objects.order_by('id').values_list('id', flat=True)
+        )
+
+        response = self.client.put(
+            '/api/v1/basket',
+            {'items': [{'id': item_ids[0], 'quantity': 2}]},
+            format='json'
+        )
+        self.assertEqual(response.json(), {'Status': True, 'Updated': 1})
+
+        response = self.client.delete(
+            '/api/v1/basket',
+            {'items': item_ids[1:]},
+            format='json'
+        )
+        self.assertEqual(response.json(), {'Status': True, 'Deleted': 2})
+
+        basket = Order.objects.get(user=self.buyer, state='basket')
+        self.assertEqual(basket.items_count, 1)
+        self.assertEqual(basket.total_sum, 2 * self.product_infos[0].price)
+
+
+def create_buyer(email='buyer@example.com'):
+    """Создает покупателя с контактом."""
+    user = User.objects.create_user(
+        email=email,
+        password='password',
+        is_active=True
+    )
+    contact = Contact.objects.create(
+        user=user,
+        city='Москва',
+        street='Тверская',
+        phone='+70000000000'
+    )
+    return user, contact
+
+
+def fill_basket(user, product_info, quantity):
+    """Кладет товар в корзину пользователя."""
+    basket = Order.objects.create(user=user, state='basket')
+    OrderItem.objects.create(
+        order=basket,
+        product_info=product_info,
+        quantity=quantity
+    )
+    return basket
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        create_shop()
+        self.buyer, self.contact = create_buyer()
+        self.product_info = ProductInfo.objects.order_by('id').first()
+        self.basket = fill_basket(self.buyer, self.product_info, 2)
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def checkout(self):
+        return self.client.post(
+            '/api/v1/order',
+            {'id': self.basket.id, 'contact': self.contact.id},
+            format='json'
+        )
+
+    def test_checkout_reserves_stock_and_fixes_price(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.checkout()
+
+        self.assertEqual(response.json(), {'Status': True})
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(NotificationEvent.objects.filter(
+            order=self.basket,
+            state='new',
+            processed_at__isnull=True
+        ).exists())
+        self.basket.refresh_from_db()
+        self.assertEqual(self.basket.state, 'new')
+        self.assertEqual(self.basket.total_sum, 2 * self.product_info.price)
+        self.assertEqual(
+            self.basket.ordered_items.get().price,
+            self.product_info.price
+        )
+        quantity = self.product_info.quantity - 2
+        self.assertEqual(
+            ProductInfo.objects.get(id=self.product_info.id).quantity,
+            quantity
+        )
+        self.assertEqual(
+            CatalogItem.objects.get(product_info=self.product_info).quantity,
+            quantity
+        )
+
+    def test_checkout_fails_without_stock(self):
+        ProductInfo.objects.filter(id=self.product_info.id).update(quantity=1)
+
+        response = self.checkout()
+
+        self.assertEqual(response.status_code, 400)
+        self.basket.refresh_from_db()
+        self.assertEqual(self.basket.state, 'basket')
+        self.assertEqual(
+            ProductInfo.objects.get(id=self.product_info.id).quantity,
+            1
+        )
+
+
+class FastSerializerTests(TestCase):
+    def setUp(self):
+        create_shop()
+        self.buyer, self.contact = create_buyer()
+        Contact.objects.create(
+            user=self.buyer,
+            city='Казань',
+            street='Баумана \u2028 "кавычки"',
+            phone='+70000000001'
+        )
+        product_infos = ProductInfo.objects.order_by('id')
+        fill_basket(self.buyer, product_infos[0], 2)
+        order = Order.objects.create(
+            user=self.buyer,
+            state='new',
+            contact=self.contact
+        )
+        OrderItem.objects.create(
+            order=order,
+            product_info=product_infos[1],
+            quantity=1
+        )
+        OrderItem.objects.create(
+            order=order,
+            product_info=product_infos[2],
+            quantity=3,
+            price=product_infos[2].price
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.buyer)
+
+    def assertSameContent(self, url):
+        with override_settings(FAST_SERIALIZERS=False):
+            expected = self.client.get(url)
+        with override_settings(FAST_SERIALIZERS=True):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, expected.content)
+
+    def test_basket_output_matches_drf(self):
+        self.assertSameContent('/api/v1/basket')
+
+    def test_orders_output_matches_drf(self):
+        self.assertSameContent('/api/v1/order')
+
+    def test_item_without_catalog_row_matches_drf(self):
+        CatalogItem.objects.filter(
+            product_info__ordered_items__order__user=self.buyer
+        ).delete()
+        self.assertSameContent('/api/v1/basket')
+        self.assertSameContent('/api/v1/order')
+
+    def test_contacts_output_matches_drf(self):
+        self.assertSameContent('/api/v1/user/contact')
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Проверка блокировок требует PostgreSQL'
+)
+class CheckoutConcurrencyTests(TransactionTestCase):
+    buyers = 20
+    stock = 7
+
+    def test_no_oversell_under_concurrent_checkout(self):
+        create_shop()
+        product_info = ProductInfo.objects.order_by('id').first()
+        ProductInfo.objects.filter(id=product_info.id).update(
+            quantity=self.stock
+        )
+        requests = []
+        for number in range(self.buyers):
+            user, contact = create_buyer(f'buyer{number}@example.com')
+            basket = fill_basket(user, product_info, 1)
+            requests.append((user, {'id': basket.id, 'contact': contact.id}))
+
+        barrier = threading.Barrier(self.buyers)
+        statuses = []
+
+        def checkout(user, data):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                statuses.append(
+                    client.post('/api/v1/order', data, format='json')
+                    .status_code
+                )
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=checkout, args=request)
+            for request in requests
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(statuses.count(200), self.stock)
+        self.assertEqual(statuses.count(400), self.buyers - self.stock)
+        self.assertEqual(
+            ProductInfo.objects.get(id=product_info.id).quantity,
+            0
+        )
+        self.assertEqual(Order.objects.filter(state='new').count(), self.stock)
+
+
+class MailQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for number in range(3):
+            queue_email(
+                'Тема',
+                'Текст',
+                'shop@example.com',
+                [f'user{number}@example.com']
+            )
+
+    def test_queue_is_sent_in_batches(self):
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            autospec=True,
+            side_effect=lambda backend, messages: len(messages)
+        ) as send_messages:
+            stats = drain_email_queue(batch_size=2)
+
+        self.assertEqual(stats, {'sent': 3, 'retried': 0, 'failed': 0})
+        self.assertEqual(
+            len({id(call.args[0]) for call in send_messages.call_args_list}),
+            1
+        )
+        self.assertFalse(QueuedEmail.objects.exclude(state='sent').exists())
+
+    def test_failed_message_is_retried_later(self):
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=smtplib.SMTPServerDisconnected('Соединение потеряно')
+        ):
+            stats = drain_email_queue()
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 3, 'failed': 0})
+        email = QueuedEmail.objects.first()
+        self.assertEqual(email.attempts, 1)
+        self.assertEqual(email.state, 'pending')
+        self.assertGreater(email.send_after, email.created_at)
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(drain_email_queue()['sent'], 0)
+
+    def test_empty_queue_does_not_connect(self):
+        QueuedEmail.objects.all().delete()
+        with mock.patch('backend.mail.get_connection') as get_connection:
+            stats = drain_email_queue()
+
+        self.assertEqual(stats, {'sent': 0, 'retried': 0, 'failed': 0})
+        get_connection.assert_not_called()
+
+    @override_settings(
+        EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+        EMAIL_USE_SSL=False,
+        EMAIL_HOST_PASSWORD=''
+    )
+    def test_connection_is_reopened_after_disconnect(self):
+        with mock.patch('smtplib.SMTP') as smtp:
+            smtp.return_value.sendmail.side_effect = [
+                smtplib.SMTPServerDisconnected('Соединение потеряно'),
+                {},
+                {}
+            ]
+            stats = drain_email_queue()
+
+        self.assertEqual(stats, {'sent': 2, 'retried': 1, 'failed': 0})
+        # Первое соединение и одно переоткрытое вместо нового на письмо
+        self.assertEqual(smtp.call_count, 2)
+
+    def test_sent_state_is_saved_on_unexpected_error(self):
+        with mock.patch(
+            'django.core.mail.backends.locmem.EmailBackend.send_messages',
+            side_effect=[1, RuntimeError('Ошибка')]
+        ):
+            with self.assertRaises(RuntimeError):
+                drain_email_queue()
+
+        self.assertEqual(
+            list(QueuedEmail.objects.order_by('id').values_list(
+                'state',
+                flat=True
+            )),
+            ['sent', 'pending', 'pending']
+        )
+
+
+class NotificationRelayTests(TestCase):
+    def test_events_become_queued_emails(self):
+        users = [
+            create_buyer(f'buyer{number}@example.com')[0]
+            for number in range(3)
+        ]
+        for user in users:
+            order = Order.objects.create(user=user, state='new')
+            notify_order_state(order.id, user.id, 'new')
+        notify_order_state(order.id, users[-1].id, 'sent')
+
+        self.assertEqual(relay_notifications(batch_size=2), 4)
+
+        self.assertEqual(
+            sorted(QueuedEmail.objects.values_list('recipients', flat=True)),
+            [[user.email] for user in users] + [[users[-1].email]]
+        )
+        self.assertFalse(
+            NotificationEvent.objects.filter(processed_at=None).exists()
+        )
+        self.assertEqual(relay_notifications(), 0)
+
+
+class PartnerOrdersTests(TestCase):
+    def setUp(self):
+        self.shop_user = create_shop()
+        other_shop = create_shop(email='other@example.com')
+        self.buyer = create_buyer()[0]
+        own = ProductInfo.objects.filter(shop__user=self.shop_user)[:2]
+        other = ProductInfo.objects.filter(shop__user=other_shop).first()
+        self.order = Order.objects.create(user=self.buyer, state='new')
+        for product_info in (*own, other):
+            OrderItem.objects.create(
+                order=self.order,
+                product_info=product_info,
+                quantity=2,
+                price=10
+            )
+        foreign = Order.objects.create(user=self.buyer, state='new')
+        OrderItem.objects.create(
+            order=foreign,
+            product_info=other,
+            quantity=1,
+            price=10
+        )
+        self.client = APIClient()
+
+    def test_only_shop_items_and_subtotal(self):
+        self.client.force_authenticate(self.shop_user)
+        response = self.client.get('/api/v1/partner/orders')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([order['id'] for order in results], [self.order.id])
+        self.assertEqual(len(results[0]['ordered_items']), 2)
+        self.assertEqual(results[0]['shop_total_sum'], 40)
+        self.assertEqual(results[0]['shop_items_count'], 2)
+        self.assertEqual(results[0]['total_sum'], 60)
+
+    def test_buyer_is_forbidden(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.get('/api/v1/partner/orders')
+        self.assertEqual(response.status_code, 403)
+
+
+class PartnerExportTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_shop()
+        self.shop = Shop.objects.get(user=self.user)
+
+    def read_export(self, path, loader):
+        with default_storage.open(path) as stream:
+            return loader(stream)
+
+    def test_export_matches_serializer(self):
+        expected = json.loads(json.dumps(
+            PartnerExportSerializer(self.shop).data
+        ))
+        expected['categories'].sort(key=lambda category: category['id'])
+
+        for fmt, loader in (('yaml', yaml.safe_load), ('json', json.load)):
+            data = self.read_export(
+                export_price_list(self.shop, fmt),
+                loader
+            )
+            data['categories'].sort(key=lambda category: category['id'])
+            self.assertEqual(data, expected)
+
+    def test_serializer_queries_do_not_depend_on_goods(self):
+        # Категории, товары, их параметры и названия параметров
+        with self.assertNumQueries(4):
+            PartnerExportSerializer(self.shop).data
+
+    def test_export_is_reused_until_catalog_changes(self):
+        path = export_price_list(self.shop)
+        self.assertEqual(export_price_list(self.shop), path)
+
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/partner/export').json()
+        self.assertIsNone(response['Task_id'])
+        self.assertTrue(response['Url'].endswith(path))
+
+        data = generate_price_list(goods=20, shop=self.shop.name)
+        goods = list(data['goods'])
+        goods[0]['price'] = 1
+        data['goods'] = goods
+        with self.captureOnCommitCallbacks(execute=True):
+            import_price_list(data, self.user.id)
+
+        new_path = export_price_list(self.shop)
+        self.assertNotEqual(new_path, path)
+        self.assertFalse(default_storage.exists(path))
+
+    def test_readiness_is_set_by_task(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Веб-процесс не проверяет хранилище, в которое пишет воркер
+        cache.delete(export_ready_key(export_price_list(self.shop)))
+        with mock.patch('backend.views.partners.partner_export') as task:
+            task.delay.return_value.id = 'task'
+            response = self.client.get('/api/v1/partner/export').json()
+        self.assertEqual(response['Task_id'], 'task')
+
+        partner_export.apply(args=task.delay.call_args.args)
+        response = self.client.get('/api/v1/partner/export').json()
+        self.assertIsNone(response['Task_id'])
+
+    def test_task_writes_returned_path(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with mock.patch('backend.views.partners.partner_export') as task:
+            task.delay.return_value.id = 'task'
+            response = self.client.get('/api/v1/partner/export').json()
+
+        # Каталог изменился до запуска задачи
+        bump_versions(shop_key(self.shop.id))
+        partner_export.apply(args=task.delay.call_args.args)
+
+        path = unquote(response['Url']).split(settings.MEDIA_URL, 1)[1]
+        self.assertTrue(default_storage.exists(path))
+
+    def test_schema_matches_response(self):
+        export_price_list(self.shop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        response = self.client.get('/api/v1/partner/export').json()
+        schema = self.client.get('/api/schema/', {'format': 'json'}).json()
+
+        self.assertEqual(
+            set(schema['components']['schemas']['PartnerExportResponse'][
+                'properties'
+            ]),
+            set(response)
+        )
+
+
+class QueryPlanTests(TestCase):
+    """Проверяет, что основные выборки используют индексы.
+
+    Локально планы строит SQLite, в CI на PostgreSQL последовательное
+    сканирование отключается, чтобы на малом объеме данных планировщик
+    не предпочел его индексу.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_user = create_shop(goods=200)
+        cls.buyer = User.objects.create_user(
+            email='buyer@example.com',
+            password='password',
+            is_active=True
+        )
+        product_infos = list(ProductInfo.objects.all()[:50])
+        for number, product_info in enumerate(product_infos):
+            order = Order.objects.create(
+                user=cls.buyer,
+                state='basket' if number == 0 else 'new'
+            )
+            OrderItem.objects.create(
+                order=order,
+                product_info=product_info,
+                quantity=1
+            )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def get_plan(self, queryset):
+        """Возвращает план запроса в текстовом виде."""
+        if connection.vendor == 'postgresql':
+            # Действует до конца транзакции теста
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = self.get_plan(queryset)
+        self.assertTrue(
+            any(name in plan for name in index_names),
+            f'Индексы {index_names} не используются:\n{plan}'
+        )
+
+    def assertNoFullScan(self, queryset, *tables):
+        plan = self.get_plan(queryset)
+        for table in tables:
+            pattern = (
+                rf'Seq Scan on {table}\b'
+                if connection.vendor == 'postgresql'
+                else rf'SCAN {table}\b'
+            )
+            self.assertIsNone(
+                re.search(pattern, plan),
+                f'Полное сканирование {table}:\n{plan}'
+            )
+
+    def test_basket_lookup(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user_id=self.buyer.id, state='basket'),
+            'unique_basket',
+            'order_user_state_dt_idx'
+        )
+
+    def test_user_orders(self):
+        self.assertUsesIndex(
+            Order.objects.filter(user_id=self.buyer.id).exclude(
+                state='basket'
+            ).order_by('-dt'),
+            'order_user_state_dt_idx'
+        )
+
+    def test_products_by_shop_and_category(self):
+        product_info = ProductInfo.objects.select_related('product').first()
+        self.assertUsesIndex(
+            ProductInfo.objects.filter(
+                shop_id=product_info.shop_id,
+                product__category_id=product_info.product.category_id
+            ),
+            'product_info_shop_product_idx',
+            'product_info_shop_ext_idx',
+            'product_category_name_idx'
+        )
+
+    def test_products_of_category(self):
+        category_id = Product.objects.values_list(
+            'category_id', flat=True
+        ).first()
+        self.assertUsesIndex(
+            Product.objects.filter(category_id=category_id).order_by('name'),
+            'product_category_name_idx'
+        )
+
+    def test_partner_orders(self):
+        shop_items = OrderItem.objects.filter(
+            product_info__shop__user_id=self.shop_user.id
+        )
+        queryset = Order.objects.filter(
+            id__in=shop_items.values('order_id')
+        ).exclude(state='basket')
+        self.assertNoFullScan(
+            queryset,
+            'backend_productinfo',
+            'backend_orderitem'
+        )
+        self.assertUsesIndex(queryset, 'order_item_product_order_idx')
+
+    def test_product_offers_of_category(self):
+        category_id = Product.objects.values_list(
+            'category_id', flat=True
+        ).first()
+        self.assertUsesIndex(
+            ProductOffer.objects.filter(
+                category_id=category_id
+            ).order_by('product')[:40],
+            'product_offer_category_idx'
+        )
+
+    def test_product_parameter_filters(self):
+        parameter_id = ProductParameter.objects.values_list(
+            'parameter_id', flat=True
+        ).first()
+        for lookup in ({'value': '128'}, {'value_numeric__gte': 100}):
+            self.assertUsesIndex(
+                ProductParameter.objects.filter(
+                    parameter_id=parameter_id, **lookup
+                ).values('product_info_id'),
+                'product_parameter_value_idx',
+                'product_parameter_numeric_idx'
+            )
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        create_shop()
+        self.client = APIClient()
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    @override_settings(METRICS_SAMPLE_RATE=1.0)
+    def test_request_is_measured(self):
+        view = {'view': 'backend:products'}
+        requests = self.sample(
+            'http_request_duration_seconds_count',
+            method='GET',
+            status='200',
+            **view
+        )
+        queries = self.sample('http_request_db_queries_sum', **view)
+        misses = self.sample(
+            'response_cache_requests_total',
+            endpoint='products',
+            result='miss'
+        )
+
+        self.client.get('/api/v1/products')
+
+        self.assertEqual(self.sample(
+            'http_request_duration_seconds_count',
+            method='GET',
+            status='200',
+            **view
+        ), requests + 1)
+        self.assertGreater(
+            self.sample('http_request_db_queries_sum', **view),
+            queries
+        )
+        self.assertEqual(self.sample(
+            'response_cache_requests_total',
+            endpoint='products',
+            result='miss'
+        ), misses + 1)
+        self.assertGreater(
+            self.sample('http_response_render_seconds_count', **view),
+            0
+        )
+
+    @override_settings(METRICS_SAMPLE_RATE=0.0)
+    def test_sql_is_not_measured_outside_sample(self):
+        view = {'view': 'backend:shops'}
+        queries = self.sample('http_request_db_queries_count', **view)
+
+        self.client.get('/api/v1/shops')
+
+        self.assertEqual(
+            self.sample('http_request_db_queries_count', **view),
+            queries
+        )
+
+    def test_metrics_endpoint(self):
+        self.client.get('/api/v1/shops')
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            b'http_request_duration_seconds_bucket',
+            response.content
+        )
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        response = self.client.get(
+            '/metrics',
+            HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class QueryBudgetTests(TestCase):
+    """Представления укладываются в свои бюджеты SQL-запросов.
+
+    Данные близки к рабочим: 1000 товаров и 100 заказов, поэтому
+    запрос на каждый объект выдачи выходит за бюджет. Покупатель и
+    магазин авторизуются токеном, как в рабочих запросах.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop_user = create_shop(goods=1000)
+        shop_id = cls.shop_user.shop.id
+        cls.buyer = seed_orders([shop_id], orders=100, items=5)
+        cls.buyer.set_password('password')
+        cls.buyer.save()
+        Contact.objects.bulk_create(
+            Contact(
+                user=cls.buyer,
+                city='Москва',
+                street=f'Улица {number}',
+                phone='+70000000000'
+            )
+            for number in range(20)
+        )
+        cls.contact = Contact.objects.filter(user=cls.buyer).first()
+        cls.product_info_ids = list(ProductInfo.objects.filter(
+            shop_id=shop_id,
+            quantity__gte=2
+        ).order_by('id').values_list('id', flat=True)[:20])
+        cls.basket = Order.objects.create(user=cls.buyer, state='basket')
+        OrderItem.objects.bulk_create(
+            OrderItem(order=cls.basket, product_info_id=info_id, quantity=1)
+            for info_id in cls.product_info_ids
+        )
+        Order.refresh_totals([cls.basket.id])
+        cls.item_ids = list(cls.basket.ordered_items.values_list(
+            'id', flat=True
+        ))
+        cls.tokens = {
+            user: Token.objects.create(user=user).key
+            for user in (cls.buyer, cls.shop_user)
+        }
+        cls.confirm_token, _ = ConfirmEmailToken.objects.get_or_create(
+            user=User.objects.create_user(email='new@example.com')
+        )
+        cls.reset_token = ResetPasswordToken.objects.create(user=cls.buyer)
+
+    def cases(self):
+        """Запросы ко всем методам всех маршрутов backend.urls."""
+        items = [
+            {'product_info': info_id, 'quantity': 2}
+            for info_id in self.product_info_ids
+        ]
+        return [
+            ('partner-update', 'post', self.shop_user,
+             {'url': 'https://example.com/shop.yaml'}),
+            ('partner-state', 'get', self.shop_user, None),
+            ('partner-state', 'post', self.shop_user, {'state': 'off'}),
+            ('partner-orders', 'get', self.shop_user, None),
+            ('partner-export', 'get', self.shop_user, None),
+            ('user-register', 'post', None, {
+                'first_name': 'Иван',
+                'last_name': 'Иванов',
+                'email': 'ivan@example.com',
+                'password': 'Sup3r-secret-password',
+                'company': 'ООО',
+                'position': 'Менеджер',
+            }),
+            ('user-register-confirm', 'post', None, {
+                'email': 'new@example.com',
+                'token': self.confirm_token.key,
+            }),
+            ('user-details', 'get', self.buyer, None),
+            ('user-details', 'post', self.buyer, {'first_name': 'Петр'}),
+            ('user-contact', 'get', self.buyer, None),
+            ('user-contact', 'post', self.buyer, {
+                'city': 'Казань',
+                'street': 'Баумана',
+                'phone': '+70000000001',
+            }),
+            ('user-login', 'post', None, {
+                'email': self.buyer.email,
+                'password': 'password',
+            }),
+            ('password-reset', 'post', None, {'email': self.buyer.email}),
+            ('password-reset-confirm', 'post', None, {
+                'token': self.reset_token.key,
+                'password': 'An0ther-secret-password',
+            }),
+            ('categories', 'get', None, None),
+            ('shops', 'get', None, None),
+            ('products', 'get', None, {'page_size': 100}),
+            ('products', 'get', None, {
+                'param': ['Цвет:черный', 'Встроенная память (Гб):64..'],
+                'price_max': 100000,
+            }),
+            ('product-facets', 'get', None, None),
+            ('product-search', 'get', None, {'q': 'смартфон'}),
+            ('product-offers', 'get', None, None),
+            ('basket', 'get', self.buyer, None),
+            ('basket', 'post', self.buyer, {'items': items}),
+            ('basket', 'put', self.buyer, {'items': [
+                {'id': item_id, 'quantity': 2} for item_id in self.item_ids
+            ]}),
+            ('basket', 'delete', self.buyer, {'items': self.item_ids}),
+            ('order', 'get', self.buyer, None),
+            ('order', 'post', self.buyer, {
+                'id': self.basket.id,
+                'contact': self.contact.id,
+            }),
+            ('results', 'get', self.buyer, {'task_id': 'task'}),
+            ('async-partner-update', 'post', self.shop_user,
+             {'url': 'https://example.com/shop.yaml'}),
+            ('async-results', 'get', self.buyer, {'task_id': 'task'}),
+            ('async-products', 'get', None, {'page_size': 100}),
+            ('async-products', 'get', None, {
+                'param': ['Цвет:черный', 'Встроенная память (Гб):64..'],
+                'price_max': 100000,
+            }),
+        ]
+
+    def request(self, name, method, user, data):
+        """Выполняет запрос и возвращает ответ и число SQL-запросов."""
+        client = APIClient()
+        if user is not None:
+            client.credentials(
+                HTTP_AUTHORIZATION=f'Token {self.tokens[user]}'
+            )
+        # Позиции корзины передаются вложенными списками, остальные
+        # представления ожидают данные формы
+        kwargs = {}
+        if method != 'get':
+            kwargs['format'] = (
+                'json' if name in ('basket', 'order') else 'multipart'
+            )
+        cache.clear()
+        task = mock.Mock(id='task', state='PENDING', result=None)
+        with (
+            mock.patch('celery.app.task.Task.delay', return_value=task),
+            mock.patch('backend.views.common.get_task', return_value=task),
+            mock.patch(
+                'backend.views.async_views.get_task',
+                return_value=task
+            ),
+            mock.patch(
+                'backend.views.async_views.download_price_list',
+                return_value='price_lists/shop.yaml'
+            ),
+            count_queries() as counter,
+        ):
+            response = getattr(client, method)(
+                reverse(f'backend:{name}'),
+                data,
+                **kwargs
+            )
+        return response, counter.count
+
+    def test_views_declare_budgets(self):
+        for pattern in urlpatterns:
+            view_class = getattr(pattern.callback, 'view_class', None)
+            methods = [
+                method for method in ('get', 'post', 'put', 'delete')
+                if hasattr(view_class, method)
+            ] if view_class else ['post']
+            for method in methods:
+                with self.subTest(view=pattern.name, method=method):
+                    self.assertIsNotNone(get_query_budget(
+                        pattern.callback,
+                        method.upper()
+                    ))
+
+    def test_views_fit_budgets(self):
+        for name, method, user, data in self.cases():
+            with self.subTest(view=name, method=method, data=data):
+                with transaction.atomic():
+                    response, count = self.request(name, method, user, data)
+                    transaction.set_rollback(True)
+                self.assertLess(response.status_code, 300, response.content)
+                budget = get_query_budget(
+                    resolve(reverse(f'backend:{name}')).func,
+                    method.upper()
+                )
+                self.assertLessEqual(count, budget)
+
+    def test_debug_mode_logs_overrun(self):
+        budget = {'GET': 1}
+        with (
+            override_settings(QUERY_BUDGET_DEBUG=True),
+            mock.patch.object(ContactView, 'query_budget', budget),
+            self.assertLogs('backend.budget', 'WARNING') as logs,
+        ):
+            response, _ = self.request('user-contact', 'get', self.buyer, None)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('GET backend:user-contact', logs.output[0])
+        self.assertIn('backend/views/users.py', logs.output[0])
+
+    def test_admin_changelists_are_constant(self):
+        admin = User.objects.create_superuser(
+            email='admin@example.com',
+            password='password'
+        )
+        client = APIClient()
+        client.force_login(admin)
+        for model in ('contact', 'order', 'orderitem', 'productinfo',
+                      'productparameter'):
+            with self.subTest(model=model):
+                with count_queries() as counter:
+                    response = client.get(
+                        reverse(f'admin:backend_{model}_changelist')
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(counter.count, 10)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_shop(goods=30)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def serve(self, handler):
+        """Подменяет сеть httpx обработчиком handler."""
+        client_class = httpx.AsyncClient
+        transport = httpx.MockTransport(handler)
+        return mock.patch(
+            'httpx.AsyncClient',
+            lambda **kwargs: client_class(transport=transport, **kwargs)
+        )
+
+    def test_partner_update_downloads_price_list(self):
+        content = 'shop: Магазин\ngoods: []\n'.encode()
+        task = mock.Mock(id='task')
+        with (
+            self.serve(lambda request: httpx.Response(200, content=content)),
+            mock.patch.object(
+                partner_update,
+                'delay',
+                return_value=task
+            ) as delay,
+        ):
+            response = self.client.post(
+                '/api/v1/async/partner/update',
+                {'url': 'https://example.com/shop.yaml'}
+            )
+
+        self.assertEqual(
+            response.json(),
+            {'Status': True, 'Task_id': 'task'}
+        )
+        path, user_id, fmt = delay.call_args.args
+        self.assertEqual((user_id, fmt), (self.user.id, 'yaml'))
+        with default_storage.open(path) as stream:
+            self.assertEqual(stream.read(), content)
+
+    def test_partner_update_reports_download_errors(self):
+        with (
+            self.serve(lambda request: httpx.Response(404)),
+            mock.patch.object(partner_update, 'delay') as delay,
+        ):
+            response = self.client.post(
+                '/api/v1/async/partner/update',
+                {'url': 'https://example.com/shop.yaml'},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(response.json()['Status'])
+        delay.assert_not_called()
+
+    @override_settings(PRICE_LIST_MAX_DOWNLOAD_SIZE=10)
+    def test_partner_update_limits_download_size(self):
+        with (
+            self.serve(lambda request: httpx.Response(200, content=b'x' * 64)),
+            mock.patch.object(partner_update, 'delay') as delay,
+        ):
+            response = self.client.post(
+                '/api/v1/async/partner/update',
+                {'url': 'https://example.com/shop.yaml'}
+            )
+
+        self.assertEqual(response.status_code, 400)
+        delay.assert_not_called()
+
+    def test_partner_update_rejects_invalid_json(self):
+        for body in ('{', '[]', '"url"'):
+            response = self.client.post(
+                '/api/v1/async/partner/update',
+                body,
+                content_type='application/json'
+            )
+
+            self.assertEqual(response.status_code, 400, body)
+            self.assertFalse(response.json()['Status'])
+
+    def test_partner_update_is_only_for_shops(self):
+        buyer, _ = create_buyer()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=buyer)}'
+        )
+
+        response = self.client.post(
+            '/api/v1/async/partner/update',
+            {'url': 'https://example.com/shop.yaml'}
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(ASYNC_RESULT_POLL_INTERVAL=0)
+    def test_results_wait_for_task(self):
+        pending = mock.Mock(state='PENDING', result=None)
+        done = mock.Mock(state='SUCCESS', result={'goods': 5})
+        with mock.patch(
+            'backend.views.async_views.get_task',
+            side_effect=[pending, pending, done]
+        ):
+            response = self.client.get(
+                '/api/v1/async/results',
+                {'task_id': 'task', 'wait': 5}
+            )
+
+        self.assertEqual(response.json(), {
+            'Status': True,
+            'Task_id': 'task',
+            'State': 'SUCCESS',
+            'Results': {'goods': 5},
+        })
+
+    def test_results_reject_infinite_wait(self):
+        for wait in ('nan', 'inf', '-inf', 'abc'):
+            # Ошибка вместо бесконечного опроса при регрессии
+            with mock.patch(
+                'backend.views.async_views.get_task',
+                side_effect=AssertionError('Задача не должна опрашиваться')
+            ):
+                response = self.client.get(
+                    '/api/v1/async/results',
+                    {'task_id': 'task', 'wait': wait}
+                )
+
+            self.assertEqual(response.status_code, 400, wait)
+
+    @override_settings(ASYNC_RESULT_POLL_INTERVAL=0)
+    def test_results_negative_wait_does_not_poll(self):
+        pending = mock.Mock(state='PENDING', result=None)
+        with mock.patch(
+            'backend.views.async_views.get_task',
+            return_value=pending
+        ) as get_task:
+            response = self.client.get(
+                '/api/v1/async/results',
+                {'task_id': 'task', 'wait': -5}
+            )
+
+        self.assertEqual(response.json()['State'], 'PENDING')
+        self.assertEqual(get_task.call_count, 1)
+
+    def test_results_report_unavailable_backend(self):
+        with mock.patch(
+            'backend.views.async_views.get_task',
+            side_effect=RedisConnectionError('Connection refused')
+        ):
+            response = self.client.get(
+                '/api/v1/async/results',
+                {'task_id': 'task'}
+            )
+
+        self.assertEqual(response.status_code, 503)
+        self.assertFalse(response.json()['Status'])
+
+    def test_results_do_not_hide_errors(self):
+        with mock.patch(
+            'backend.views.async_views.get_task',
+            side_effect=RuntimeError('Ошибка')
+        ):
+            with self.assertRaises(RuntimeError):
+                self.client.get('/api/v1/async/results', {'task_id': 'task'})
+
+    def test_products_are_paged_by_key(self):
+        expected = list(CatalogItem.objects.filter(
+            shop_state=True
+        ).order_by('product_info_id').values_list(
+            'product_info_id',
+            flat=True
+        ))
+        ids = []
+        url = '/api/v1/async/products?page_size=7'
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(item['id'] for item in data['results'])
+            url = data['next']
+
+        self.assertEqual(ids, expected)
+
+    def test_products_reject_invalid_parameters(self):
+        for query in ('after=abc', 'page_size=0', 'page_size=-1'):
+            response = self.client.get(f'/api/v1/async/products?{query}')
+
+            self.assertEqual(response.status_code, 400, query)
+
+    async def test_products_under_asgi(self):
+        response = await self.async_client.get(
+            '/api/v1/async/products',
+            {'price_max': 100000}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'])
+
+
+class BenchmarkSuiteTests(TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.output = os.path.join(directory, 'bench.json')
+
+    def run_suite(self, **options):
+        call_command(
+            'bench_suite',
+            goods=30,
+            orders=5,
+            items=2,
+            requests=2,
+            stdout=io.StringIO(),
+            **options
+        )
+
+    def test_results_are_saved_and_rolled_back(self):
+        self.run_suite(output=self.output)
+
+        with open(self.output) as stream:
+            results = json.load(stream)
+        self.assertEqual(
+            set(results['benchmarks']),
+            {
+                'import', 'serialize_products', 'serialize_orders',
+                'order_totals', 'partner_orders', 'catalog_page',
+                'catalog_facets', 'catalog_search',
+            }
+        )
+        self.assertGreater(results['benchmarks']['catalog_page']['ops'], 0)
+        self.assertFalse(Shop.objects.exists())
+
+    def test_regression_fails_comparison(self):
+        self.run_suite(output=self.output)
+        with open(self.output) as stream:
+            baseline = json.load(stream)
+        for result in baseline['benchmarks'].values():
+            result['ops'] *= 1000
+        with open(self.output, 'w') as stream:
+            json.dump(baseline, stream)
+
+        with self.assertRaisesMessage(CommandError, 'Регрессия'):
+            self.run_suite(compare=self.output)
+
+    def test_load_data_generator(self):
+        call_command(
+            'seed_load_data',
+            shops=2,
+            goods=20,
+            buyers=3,
+            orders=2,
+            items=1,
+            stdout=io.StringIO()
+        )
+
+        self.assertEqual(CatalogItem.objects.count(), 40)
+        self.assertEqual(Order.objects.count(), 6)
+        client = APIClient()
+        for email in ('load-buyer-2@example.com', 'bench-shop-1@example.com'):
+            response = client.post(
+                '/api/v1/user/login',
+                {'email': email, 'password': 'password'}
+            )
+            self.assertTrue(response.json()['Status'])
+
+
+@skipUnless(os.getenv('REDIS_URL'), 'REDIS_URL не задан')
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+        'KEY_PREFIX': 'test',
+    }
+})
+class RedisCatalogCacheTests(CatalogCacheTests):
+    """Тесты версионного кеша каталога на Redis из REDIS_URL."""
+
+
+@skipUnless(os.getenv('REDIS_URL'), 'REDIS_URL не задан')
+class RedisCacheTests(TestCase):
+    def test_cache_is_shared_redis(self):
+        from django.core.cache.backends.redis import RedisCache
+
+        self.assertIsInstance(cache, RedisCache)
+        cache.set('redis-check', 1)
+        self.assertEqual(cache.incr('redis-check'), 2)
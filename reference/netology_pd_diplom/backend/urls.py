@@ -4,11 +4,15 @@ from django_rest_passwordreset.views import (
     reset_password_confirm
 )
 
+from backend.budget import with_query_budget
 from backend.views import (
     RegisterAccount, ConfirmAccount, LoginAccount, AccountDetails,
-    CategoryView, ShopView, ProductInfoView, BasketView, OrderView,
+    CategoryView, ShopView, ProductInfoView, ProductFacetView,
+    ProductSearchView, ProductOfferView,
+    BasketView, OrderView,
     PartnerUpdate, PartnerState, PartnerOrders, PartnerExport,
-    ContactView, ResultsView
+    ContactView, ResultsView,
+    AsyncPartnerUpdate, AsyncProductListView, AsyncResultsView
 )
 
 app_name = 'backend'
@@ -31,12 +35,12 @@ urlpatterns = [
     path('user/login', LoginAccount.as_view(), name='user-login'),
     path(
         'user/password_reset',
-        reset_password_request_token,
+        with_query_budget(reset_password_request_token, {'POST': 5}),
         name='password-reset'
     ),
     path(
         'user/password_reset/confirm',
-        reset_password_confirm,
+        with_query_budget(reset_password_confirm, {'POST': 5}),
         name='password-reset-confirm'
     ),
 
@@ -44,6 +48,21 @@ urlpatterns = [
     path('categories', CategoryView.as_view(), name='categories'),
     path('shops', ShopView.as_view(), name='shops'),
     path('products', ProductInfoView.as_view(), name='products'),
+    path(
+        'products/facets',
+        ProductFacetView.as_view(),
+        name='product-facets'
+    ),
+    path(
+        'products/search',
+        ProductSearchView.as_view(),
+        name='product-search'
+    ),
+    path(
+        'products/offers',
+        ProductOfferView.as_view(),
+        name='product-offers'
+    ),
 
     # Order endpoints
     path('basket', BasketView.as_view(), name='basket'),
@@ -51,4 +70,17 @@ urlpatterns = [
 
     # Other endpoints
     path('results', ResultsView.as_view(), name='results'),
+
+    # Async endpoints (ASGI)
+    path(
+        'async/partner/update',
+        AsyncPartnerUpdate.as_view(),
+        name='async-partner-update'
+    ),
+    path('async/results', AsyncResultsView.as_view(), name='async-results'),
+    path(
+        'async/products',
+        AsyncProductListView.as_view(),
+        name='async-products'
+    ),
 ]
@@ -1,3 +1,7 @@
+import math
+from itertools import islice
+
+
 def str_to_bool(value: str) -> int:
     """Преобразует строковое значение в булево (1/0).
     Поддерживаемые значения для True:
@@ -20,3 +24,26 @@ def str_to_bool(value: str) -> int:
     if normalized in false_values:
         return 0
     raise ValueError(f"Недопустимое значение для преобразования: '{value}'")
+
+
+def chunked(iterable, size):
+    """Разбивает итерируемый объект на списки длиной не более size."""
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def parse_number(value):
+    """Преобразует строковое значение параметра в число.
+
+    Args:
+        value: Строка вида "6.5", "512" или "6,5"
+
+    Returns:
+        Число с плавающей точкой или None, если значение не числовое
+    """
+    try:
+        number = float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+    return number if math.isfinite(number) else None
@@ -5,10 +5,22 @@ from .users import (
     AccountDetails,
     ContactView
 )
-from .products import CategoryView, ShopView, ProductInfoView
+from .products import (
+    CategoryView,
+    ShopView,
+    ProductInfoView,
+    ProductFacetView,
+    ProductSearchView,
+    ProductOfferView
+)
 from .orders import BasketView, OrderView
 from .partners import PartnerUpdate, PartnerState, PartnerOrders, PartnerExport
 from .common import ResultsView
+from .async_views import (
+    AsyncPartnerUpdate,
+    AsyncProductListView,
+    AsyncResultsView
+)
 
 __all__ = [
     'RegisterAccount',
@@ -19,11 +31,17 @@ __all__ = [
     'CategoryView',
     'ShopView',
     'ProductInfoView',
+    'ProductFacetView',
+    'ProductSearchView',
+    'ProductOfferView',
     'BasketView',
     'OrderView',
     'PartnerUpdate',
     'PartnerState',
     'PartnerOrders',
     'PartnerExport',
-    'ResultsView'
+    'ResultsView',
+    'AsyncPartnerUpdate',
+    'AsyncProductListView',
+    'AsyncResultsView'
 ]
@@ -0,0 +1,275 @@
+"""Асинхронные варианты представлений с долгим ожиданием ввода-вывода.
+
+Под ASGI ожидание скачивания прайс-листа, хранилища результатов Celery
+и базы данных не занимает поток воркера, поэтому один процесс
+обслуживает сотни медленных загрузок и клиентов, опрашивающих задачи.
+Представления DRF синхронные, поэтому здесь используются представления
+Django с авторизацией по тому же токену DRF.
+"""
+import asyncio
+import json
+import math
+
+import httpx
+from asgiref.sync import sync_to_async
+from celery import states
+from celery.exceptions import BackendError
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from kombu.exceptions import OperationalError
+from redis.exceptions import ConnectionError as RedisConnectionError
+from rest_framework.authtoken.models import Token
+
+from backend.catalog import CATALOG_VALUES, catalog_item_data
+from backend.celery_tasks import partner_update
+from backend.filters import afilter_catalog, parse_catalog_filters
+from backend.models import CatalogItem
+from backend.price_list import (
+    PriceListFormatError,
+    detect_format,
+    download_price_list
+)
+from backend.renderers import dumps
+from netology_pd_diplom.celery_app import get_task
+
+# Недоступность хранилища результатов Celery
+RESULT_BACKEND_ERRORS = (
+    BackendError,
+    OperationalError,
+    RedisConnectionError,
+    OSError,
+)
+
+
+def json_response(data, status=200):
+    """Ответ JSON, сериализованный так же, как в FastJSONRenderer."""
+    return HttpResponse(
+        dumps(data),
+        content_type='application/json',
+        status=status
+    )
+
+
+def _int_param(query, name, default):
+    value = query.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} должен быть целым числом') from None
+
+
+class AsyncAPIView(View):
+    """Базовое асинхронное представление API с авторизацией по токену."""
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Как и в DRF, авторизация по токену не использует CSRF
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    @staticmethod
+    async def get_user(request):
+        """Пользователь по заголовку Authorization: Token <ключ>."""
+        keyword, _, key = request.headers.get(
+            'Authorization', ''
+        ).partition(' ')
+        if keyword != 'Token' or not key.strip():
+            return None
+        token = await Token.objects.select_related('user').filter(
+            key=key.strip()
+        ).afirst()
+        if token is None or not token.user.is_active:
+            return None
+        return token.user
+
+    @staticmethod
+    def get_data(request):
+        """Данные запроса в формате JSON или формы.
+
+        Raises:
+            ValueError: Тело JSON некорректно или не является объектом
+        """
+        if request.content_type != 'application/json':
+            return request.POST
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ValueError('Некорректный JSON') from None
+        if not isinstance(data, dict):
+            raise ValueError('Тело запроса должно быть объектом JSON')
+        return data
+
+
+class AsyncPartnerUpdate(AsyncAPIView):
+    """Обновление прайс-листа магазина по URL.
+
+    Прайс-лист скачивается httpx без блокировки воркера и сохраняется в
+    хранилище, а импорт выполняет та же задача Celery, что и для
+    загруженных файлов.
+    """
+    query_budget = {'POST': 1}
+
+    async def post(self, request, *args, **kwargs):
+        user = await self.get_user(request)
+        if user is None or user.type != 'shop':
+            return json_response(
+                {'Status': False, 'Error': 'Только для магазинов'},
+                status=403
+            )
+
+        try:
+            data = self.get_data(request)
+        except ValueError as error:
+            return json_response(
+                {'Status': False, 'Errors': str(error)},
+                status=400
+            )
+        url = data.get('url')
+        if not url:
+            return json_response(
+                {
+                    'Status': False,
+                    'Errors': 'Не указаны все необходимые аргументы'
+                },
+                status=400
+            )
+        try:
+            fmt = detect_format(url, data.get('format'))
+            URLValidator()(url)
+            source = await download_price_list(url, fmt)
+        except (ValidationError, PriceListFormatError, httpx.HTTPError) as e:
+            return json_response(
+                {'Status': False, 'Errors': str(e)},
+                status=400
+            )
+        task = await sync_to_async(partner_update.delay)(source, user.id, fmt)
+        return json_response({'Status': True, 'Task_id': task.id})
+
+
+def _task_status(task_id):
+    task = get_task(task_id)
+    return task.state, task.result
+
+
+class AsyncResultsView(AsyncAPIView):
+    """Статус фоновой задачи.
+
+    С параметром wait=<секунды> ответ задерживается до завершения
+    задачи, но не дольше ASYNC_RESULT_MAX_WAIT, что заменяет клиенту
+    частый опрос.
+    """
+    query_budget = {'GET': 1}
+
+    async def get(self, request, *args, **kwargs):
+        if await self.get_user(request) is None:
+            return json_response(
+                {'Status': False, 'Error': 'Требуется авторизация'},
+                status=403
+            )
+
+        task_id = request.GET.get('task_id')
+        if not task_id:
+            return json_response(
+                {'Status': False, 'Errors': 'Не указан ID задачи'},
+                status=400
+            )
+        try:
+            wait = float(request.GET.get('wait') or 0)
+        except ValueError:
+            wait = math.nan
+        # nan и inf сделали бы срок ожидания бесконечным
+        if not math.isfinite(wait):
+            return json_response(
+                {'Status': False, 'Errors': 'wait должен быть числом'},
+                status=400
+            )
+        wait = min(max(wait, 0), settings.ASYNC_RESULT_MAX_WAIT)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        try:
+            while True:
+                # Клиент хранилища результатов синхронный
+                state, result = await sync_to_async(
+                    _task_status,
+                    thread_sensitive=False
+                )(task_id)
+                if state in states.READY_STATES or loop.time() >= deadline:
+                    break
+                await asyncio.sleep(settings.ASYNC_RESULT_POLL_INTERVAL)
+        except RESULT_BACKEND_ERRORS:
+            return json_response(
+                {
+                    'Status': False,
+                    'Errors': 'Хранилище результатов недоступно'
+                },
+                status=503
+            )
+        return json_response({
+            'Status': True,
+            'Task_id': task_id,
+            'State': state,
+            'Results': result if state == states.SUCCESS else str(result)
+        })
+
+
+class AsyncProductListView(AsyncAPIView):
+    """Каталог товаров через асинхронный ORM.
+
+    Принимает фильтры ProductInfoView. Выдача постраничная по ключу:
+    after - ID последнего товара предыдущей страницы, ссылка на
+    следующую страницу возвращается в next.
+    """
+    query_budget = {'GET': 2}
+    page_size = 40
+    max_page_size = 500
+
+    async def get(self, request, *args, **kwargs):
+        query = request.GET
+        try:
+            filters = parse_catalog_filters(query)
+            after = _int_param(query, 'after', 0)
+            page_size = min(
+                _int_param(query, 'page_size', self.page_size),
+                self.max_page_size
+            )
+            if page_size < 1:
+                raise ValueError('page_size должен быть больше нуля')
+            shop_id = _int_param(query, 'shop_id', None)
+            category_id = _int_param(query, 'category_id', None)
+        except ValueError as error:
+            return json_response(
+                {'Status': False, 'Errors': str(error)},
+                status=400
+            )
+
+        queryset = CatalogItem.objects.filter(
+            shop_state=True,
+            product_info_id__gt=after
+        )
+        if shop_id is not None:
+            queryset = queryset.filter(shop_id=shop_id)
+        if category_id is not None:
+            queryset = queryset.filter(category_id=category_id)
+        queryset = await afilter_catalog(queryset, filters)
+
+        rows = [
+            catalog_item_data(row)
+            async for row in queryset.order_by(
+                'product_info_id'
+            ).values(*CATALOG_VALUES)[:page_size + 1]
+        ]
+        next_url = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            next_query = query.copy()
+            next_query['after'] = rows[-1]['id']
+            next_url = request.build_absolute_uri(
+                f'?{next_query.urlencode()}'
+            )
+        return json_response({'next': next_url, 'results': rows})
@@ -4,6 +4,8 @@ from netology_pd_diplom.celery_app import get_task
 
 
 class ResultsView(APIView):
+    query_budget = {'GET': 1}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -11,7 +13,10 @@ class ResultsView(APIView):
                 status=403
             )
 
-        task_id = request.data.get('task_id')
+        task_id = (
+            request.query_params.get('task_id') or
+            request.data.get('task_id')
+        )
         if not task_id:
             return Response(
                 {'Status': False, 'Errors': 'Не указан ID задачи'},
@@ -1,11 +1,78 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import F, Sum
-from backend.models import Order
-from backend.serializers import OrderSerializer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (
+    Case,
+    F,
+    OuterRef,
+    PositiveIntegerField,
+    Prefetch,
+    Subquery,
+    Value,
+    When
+)
+from backend.cache import bump_catalog
+from backend.catalog import refresh_catalog
+from backend.fast_serializers import orders_data
+from backend.models import (
+    Contact,
+    Order,
+    OrderItem,
+    ProductInfo,
+    ProductParameter
+)
+from backend.serializers import (
+    ItemsDeleteSerializer,
+    ItemsSerializer,
+    ItemsUpdateSerializer,
+    OrderSerializer,
+    OrderViewSerializer
+)
+from backend.renderers import FAST_RENDERER_CLASSES
+from backend.signals import new_order
+
+
+def ordered_items_prefetch():
+    """Позиции заказов с товарами и параметрами для OrderSerializer.
+
+    Товар, продукт и категория присоединяются к позициям, а параметры к
+    своим названиям, поэтому выборка занимает два запроса.
+    """
+    return Prefetch(
+        'ordered_items',
+        queryset=OrderItem.objects.select_related(
+            'product_info__product__category'
+        ).prefetch_related(Prefetch(
+            'product_info__product_parameters',
+            queryset=ProductParameter.objects.select_related('parameter')
+        ))
+    )
+
+
+def check_stock(items, stock):
+    """Сравнивает запрошенное количество товаров с остатками.
+
+    Args:
+        items: Словарь {ID: запрошенное количество}
+        stock: Словарь {ID: доступное количество}
+
+    Returns:
+        Словарь ошибок по ID, пустой если все товары доступны
+    """
+    errors = {}
+    for item_id, quantity in items.items():
+        if item_id not in stock:
+            errors[item_id] = 'Не найдено'
+        elif quantity > stock[item_id]:
+            errors[item_id] = f'Доступно только {stock[item_id]}'
+    return errors
 
 
 class BasketView(APIView):
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 4, 'POST': 5, 'PUT': 4, 'DELETE': 4}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -15,23 +82,150 @@ class BasketView(APIView):
 
         basket = Order.objects.filter(
             user_id=request.user.id, state='basket'
-        ).prefetch_related(
-            'ordered_items__product_info__product__category',
-            'ordered_items__product_info__product_parameters__parameter'
-        ).annotate(
-            total_sum=Sum(F('ordered_items__quantity') *
-                          F('ordered_items__product_info__price'))
-        ).distinct()
+        )
+        if settings.FAST_SERIALIZERS:
+            return Response(orders_data(basket))
+
+        basket = basket.prefetch_related(ordered_items_prefetch())
 
         serializer = OrderSerializer(basket, many=True)
         return Response(serializer.data)
 
     def post(self, request, *args, **kwargs):
-        # Реализация добавления в корзину
-        pass
+        """Добавляет товары в корзину.
+
+        Количество уже лежащих в корзине товаров заменяется переданным,
+        поэтому клиент может синхронизировать всю корзину одним вызовом.
+        Число запросов к базе не зависит от количества позиций. Корзина
+        уникальна (unique_basket): при одновременном первом добавлении
+        get_or_create получает IntegrityError и читает созданную
+        параллельным запросом корзину.
+        """
+        if not request.user.is_authenticated:
+            return Response(
+                {'Status': False, 'Error': 'Log in required'},
+                status=403
+            )
+
+        serializer = ItemsSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'Status': False, 'Errors': serializer.errors},
+                status=400
+            )
+        items = {
+            item['product_info']: item['quantity']
+            for item in serializer.validated_data['items']
+        }
+
+        with transaction.atomic():
+            stock = dict(ProductInfo.objects.filter(
+                id__in=items,
+                shop__state=True
+            ).values_list('id', 'quantity'))
+            errors = check_stock(items, stock)
+            if errors:
+                return Response(
+                    {'Status': False, 'Errors': errors},
+                    status=400
+                )
+
+            basket, _ = Order.objects.get_or_create(
+                user_id=request.user.id,
+                state='basket'
+            )
+            OrderItem.objects.bulk_create(
+                [
+                    OrderItem(
+                        order_id=basket.id,
+                        product_info_id=product_info_id,
+                        quantity=quantity
+                    )
+                    for product_info_id, quantity in items.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['order', 'product_info'],
+                update_fields=['quantity']
+            )
+            Order.refresh_totals([basket.id])
+        return Response({'Status': True, 'Created': len(items)})
+
+    def put(self, request, *args, **kwargs):
+        """Изменяет количество товаров в позициях корзины."""
+        if not request.user.is_authenticated:
+            return Response(
+                {'Status': False, 'Error': 'Log in required'},
+                status=403
+            )
+
+        serializer = ItemsUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'Status': False, 'Errors': serializer.errors},
+                status=400
+            )
+        items = {
+            item['id']: item['quantity']
+            for item in serializer.validated_data['items']
+        }
+
+        with transaction.atomic():
+            rows = OrderItem.objects.filter(
+                id__in=items,
+                order__user_id=request.user.id,
+                order__state='basket'
+            ).values_list('id', 'order_id', 'product_info__quantity')
+            stock = {item_id: quantity for item_id, _, quantity in rows}
+            errors = check_stock(items, stock)
+            if errors:
+                return Response(
+                    {'Status': False, 'Errors': errors},
+                    status=400
+                )
+
+            OrderItem.objects.bulk_update(
+                [
+                    OrderItem(id=item_id, quantity=quantity)
+                    for item_id, quantity in items.items()
+                ],
+                ['quantity']
+            )
+            Order.refresh_totals({order_id for _, order_id, _ in rows})
+        return Response({'Status': True, 'Updated': len(items)})
+
+    def delete(self, request, *args, **kwargs):
+        """Удаляет позиции из корзины."""
+        if not request.user.is_authenticated:
+            return Response(
+                {'Status': False, 'Error': 'Log in required'},
+                status=403
+            )
+
+        serializer = ItemsDeleteSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'Status': False, 'Errors': serializer.errors},
+                status=400
+            )
+
+        with transaction.atomic():
+            basket_id = Order.objects.filter(
+                user_id=request.user.id,
+                state='basket'
+            ).values_list('id', flat=True).first()
+            deleted, _ = OrderItem.objects.filter(
+                order_id=basket_id,
+                id__in=serializer.validated_data['items']
+            ).delete()
+            if deleted:
+                Order.refresh_totals([basket_id])
+        return Response({'Status': True, 'Deleted': deleted})
 
 
 class OrderView(APIView):
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 4, 'POST': 18}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -41,13 +235,120 @@ class OrderView(APIView):
 
         orders = Order.objects.filter(
             user_id=request.user.id
-        ).exclude(state='basket').prefetch_related(
-            'ordered_items__product_info__product__category',
-            'ordered_items__product_info__product_parameters__parameter'
-        ).select_related('contact').annotate(
-            total_sum=Sum(F('ordered_items__quantity') *
-                          F('ordered_items__product_info__price'))
-        ).distinct()
+        ).exclude(state='basket')
+        if settings.FAST_SERIALIZERS:
+            return Response(orders_data(orders))
+
+        orders = orders.prefetch_related(
+            ordered_items_prefetch()
+        ).select_related('contact')
 
         serializer = OrderSerializer(orders, many=True)
         return Response(serializer.data)
+
+    def post(self, request, *args, **kwargs):
+        """Оформляет заказ из корзины и резервирует товары.
+
+        Строки товаров блокируются SELECT ... FOR UPDATE в порядке
+        возрастания ID, поэтому параллельные оформления не приводят к
+        взаимной блокировке, а остатки проверяются уже после получения
+        блокировки и не уходят в минус. Все остатки списываются одним
+        UPDATE, число запросов не зависит от количества позиций.
+        Уведомление записывается в outbox в той же транзакции.
+        """
+        if not request.user.is_authenticated:
+            return Response(
+                {'Status': False, 'Error': 'Log in required'},
+                status=403
+            )
+
+        serializer = OrderViewSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(
+                {'Status': False, 'Errors': serializer.errors},
+                status=400
+            )
+        data = serializer.validated_data
+
+        if not Contact.objects.filter(
+            id=data['contact'],
+            user_id=request.user.id
+        ).exists():
+            return Response(
+                {'Status': False, 'Errors': 'Контакт не найден'},
+                status=400
+            )
+
+        with transaction.atomic():
+            basket = Order.objects.select_for_update().filter(
+                id=data['id'],
+                user_id=request.user.id,
+                state='basket'
+            ).first()
+            if basket is None:
+                return Response(
+                    {'Status': False, 'Errors': 'Корзина не найдена'},
+                    status=400
+                )
+
+            items = list(basket.ordered_items.order_by(
+                'product_info_id'
+            ).values_list('product_info_id', 'quantity'))
+            if not items:
+                return Response(
+                    {'Status': False, 'Errors': 'Корзина пуста'},
+                    status=400
+                )
+
+            stock = dict(ProductInfo.objects.select_for_update(
+                of=('self',)
+            ).filter(
+                id__in=[product_info_id for product_info_id, _ in items],
+                shop__state=True
+            ).order_by('id').values_list('id', 'quantity'))
+            errors = {
+                product_info_id: 'Недостаточно товара'
+                for product_info_id, quantity in items
+                if stock.get(product_info_id, 0) < quantity
+            }
+            if errors:
+                return Response(
+                    {'Status': False, 'Errors': errors},
+                    status=400
+                )
+            ProductInfo.objects.filter(id__in=stock).update(
+                quantity=F('quantity') - Case(
+                    *[
+                        When(id=product_info_id, then=Value(quantity))
+                        for product_info_id, quantity in items
+                    ],
+                    output_field=PositiveIntegerField()
+                )
+            )
+
+            basket.ordered_items.update(price=Subquery(
+                ProductInfo.objects.filter(
+                    id=OuterRef('product_info_id')
+                ).values('price')
+            ))
+            basket.state = 'new'
+            basket.contact_id = data['contact']
+            basket.save(update_fields=['state', 'contact'])
+            Order.refresh_totals([basket.id])
+
+            product_info_ids = [item[0] for item in items]
+            refresh_catalog(product_info_ids)
+            shop_ids, category_ids = set(), set()
+            for shop_id, category_id in ProductInfo.objects.filter(
+                id__in=product_info_ids
+            ).values_list('shop_id', 'product__category_id'):
+                shop_ids.add(shop_id)
+                category_ids.add(category_id)
+
+            bump_catalog(shop_ids=shop_ids, category_ids=category_ids)
+            new_order.send(
+                sender=self.__class__,
+                user_id=request.user.id,
+                order_id=basket.id
+            )
+        return Response({'Status': True})
@@ -2,20 +2,34 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.core.validators import URLValidator
 from rest_framework.generics import ListAPIView
-from yaml import load as load_yaml
-from yaml import Loader
-from requests import get
-from django.db.models import F, Sum
-
-from backend.models import Shop, Order
+from django.db.models import Count, F, OuterRef, Prefetch, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from backend.cache import bump_catalog
+from backend.catalog import refresh_offers
+from backend.celery_tasks import partner_export, partner_update
+from backend.export import (
+    EXPORT_FORMATS,
+    EXPORT_YAML,
+    export_path,
+    is_export_ready
+)
+from backend.models import CatalogItem, Category, Shop, Order, OrderItem
+from backend.pagination import OrderCursorPagination
+from backend.price_list import detect_format, save_upload
 from backend.serializers import (
     ShopSerializer,
-    PartnerExportSerializer,
-    OrderSerializer
+    PartnerOrderSerializer
 )
+from backend.util import str_to_bool
 
 
 class PartnerUpdate(APIView):
+    query_budget = {'POST': 1}
+
     def post(self, request, *args, **kwargs):
         if not request.user.is_authenticated or request.user.type != 'shop':
             return Response(
@@ -24,20 +38,26 @@ class PartnerUpdate(APIView):
             )
 
         url = request.data.get('url')
-        if url:
+        upload = request.FILES.get('file')
+        if url or upload:
             try:
-                validate_url = URLValidator()
-                validate_url(url)
-                stream = get(url).content
-                data = load_yaml(stream, Loader=Loader)
-
-                # Обработка данных магазина
-                return Response({'Status': True})
+                fmt = detect_format(
+                    upload.name if upload else url,
+                    request.data.get('format')
+                )
+                if upload:
+                    source = save_upload(upload)
+                else:
+                    validate_url = URLValidator()
+                    validate_url(url)
+                    source = url
             except Exception as e:
                 return Response(
                     {'Status': False, 'Errors': str(e)},
                     status=400
                 )
+            task = partner_update.delay(source, request.user.id, fmt)
+            return Response({'Status': True, 'Task_id': task.id})
         return Response(
             {
                 'Status': False,
@@ -48,6 +68,8 @@ class PartnerUpdate(APIView):
 
 
 class PartnerState(APIView):
+    query_budget = {'GET': 2, 'POST': 8}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated or request.user.type != 'shop':
             return Response(
@@ -69,10 +91,25 @@ class PartnerState(APIView):
         state = request.data.get('state')
         if state:
             try:
-                Shop.objects.filter(
-                    user_id=request.user.id).update(
-                        state=str_to_bool(state)
-                    )
+                state = str_to_bool(state)
+                Shop.objects.filter(user_id=request.user.id).update(
+                    state=state
+                )
+                CatalogItem.objects.filter(
+                    shop__user_id=request.user.id
+                ).update(shop_state=state)
+                refresh_offers(CatalogItem.objects.filter(
+                    shop__user_id=request.user.id
+                ).values_list('product_id', flat=True).distinct().iterator())
+                bump_catalog(
+                    shop_ids=Shop.objects.filter(
+                        user_id=request.user.id
+                    ).values_list('id', flat=True),
+                    category_ids=Category.objects.filter(
+                        shops__user_id=request.user.id
+                    ).values_list('id', flat=True),
+                    shops=True
+                )
                 return Response({'Status': True})
             except ValueError as error:
                 return Response({'Status': False, 'Errors': str(error)})
@@ -87,27 +124,71 @@ class PartnerState(APIView):
 
 
 class PartnerOrders(ListAPIView):
-    serializer_class = OrderSerializer
+    """Заказы с товарами магазина текущего пользователя.
+
+    Сначала подзапросом по индексу выбираются ID заказов с товарами
+    магазина, затем для страницы заказов загружаются только позиции
+    этого магазина. Сумма и количество позиций магазина считаются
+    коррелированными подзапросами, без JOIN и DISTINCT по всей выборке.
+    """
+    serializer_class = PartnerOrderSerializer
+    pagination_class = OrderCursorPagination
+    query_budget = {'GET': 5}
+
+    def get(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return Response(
+                {'Status': False, 'Error': 'Log in required'},
+                status=403
+            )
+
+        if request.user.type != 'shop':
+            return Response(
+                {'Status': False, 'Error': 'Только для магазинов'},
+                status=403
+            )
+        return super().get(request, *args, **kwargs)
 
     def get_queryset(self):
-        if not (
-            self.request.user.is_authenticated or
-            self.request.user.type != 'shop'
-        ):
-            return Order.objects.none()
+        shop_items = OrderItem.objects.filter(
+            product_info__shop__user_id=self.request.user.id
+        )
+        order_items = shop_items.filter(
+            order_id=OuterRef('pk')
+        ).order_by().values('order_id')
         return Order.objects.filter(
-            ordered_items__product_info__shop__user_id=self.request.user.id
-        ).exclude(state='basket').prefetch_related(
-            'ordered_items__product_info__product__category',
-            'ordered_items__product_info__product_parameters__parameter'
-        ).select_related('contact').annotate(
-            total_sum=Sum(F('ordered_items__quantity') *
-                          F('ordered_items__product_info__price'))
-        ).distinct()
+            id__in=shop_items.values('order_id')
+        ).exclude(state='basket').select_related('contact').annotate(
+            shop_total_sum=Subquery(order_items.annotate(total=Sum(
+                F('quantity') * Coalesce('price', 'product_info__price')
+            )).values('total')),
+            shop_items_count=Subquery(
+                order_items.annotate(count=Count('id')).values('count')
+            )
+        ).prefetch_related(
+            Prefetch(
+                'ordered_items',
+                queryset=shop_items.select_related(
+                    'product_info__product__category'
+                ).prefetch_related(
+                    'product_info__product_parameters__parameter'
+                )
+            )
+        )
 
 
 class PartnerExport(APIView):
+    query_budget = {'GET': 2}
+
     def get(self, request, *args, **kwargs):
+        """Выгрузка прайс-листа магазина в файл.
+
+        Если файл для текущей версии каталога уже готов, возвращается его
+        URL, иначе запускается фоновая задача, которая сохранит файл по
+        этому URL. Готовность файла задача отмечает в общем кеше, а сам
+        файл пишет воркер Celery, поэтому хранилище MEDIA_ROOT должно
+        быть общим у приложения и воркеров.
+        """
         if not request.user.is_authenticated:
             return Response(
                 {'Status': False, 'Error': 'Log in required'},
@@ -120,6 +201,37 @@ class PartnerExport(APIView):
                 status=403
             )
 
-        shop = request.user.shop
-        serializer = PartnerExportSerializer(shop)
-        return Response(serializer.data)
+        shop_id = Shop.objects.filter(
+            user_id=request.user.id
+        ).values_list('id', flat=True).first()
+        if shop_id is None:
+            return Response(
+                {'Status': False, 'Errors': 'Магазин не найден'},
+                status=400
+            )
+
+        fmt = request.query_params.get('file_format', EXPORT_YAML)
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {'Status': False, 'Errors': f'Неизвестный формат: {fmt}'},
+                status=400
+            )
+
+        path = export_path(shop_id, fmt)
+        task_id = None
+        if not is_export_ready(path):
+            # Повторные запросы во время выгрузки получают ту же задачу
+            lock = f'export:task:{path}'
+            task_id = cache.get(lock)
+            if task_id is None:
+                task_id = partner_export.delay(
+                    request.user.id,
+                    fmt,
+                    path
+                ).id
+                cache.set(lock, task_id, settings.EXPORT_TASK_TIMEOUT)
+        return Response({
+            'Status': True,
+            'Task_id': task_id,
+            'Url': request.build_absolute_uri(default_storage.url(path)),
+        })
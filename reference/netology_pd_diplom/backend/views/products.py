@@ -1,15 +1,78 @@
-from django.views.decorators.cache import cache_page
-from django.utils.decorators import method_decorator
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from rest_framework.generics import GenericAPIView, ListAPIView
 from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework.generics import ListAPIView
-from django.db.models import Q
-from backend.models import Category, ProductInfo, Shop
-from backend.serializers import (
-    CategorySerializer,
-    ProductInfoSerializer,
-    ShopSerializer
+from backend.cache import (
+    CATEGORIES,
+    PRODUCTS,
+    SHOPS,
+    category_key,
+    shop_key,
+    versioned_cache
 )
+from backend.catalog import (
+    CATALOG_VALUES,
+    OFFER_VALUES,
+    catalog_item_data,
+    offer_data
+)
+from backend.filters import (
+    catalog_facets,
+    filter_catalog,
+    parse_catalog_filters
+)
+from backend.models import CatalogItem, Category, ProductOffer, Shop
+from backend.pagination import (
+    OfferCursorPagination,
+    ProductCursorPagination,
+    SearchPagination
+)
+from backend.renderers import FAST_RENDERER_CLASSES, dumps
+from backend.search import search_catalog
+from backend.serializers import CategorySerializer, ShopSerializer
+
+
+CATALOG_FILTER_PARAMS = (
+    'shop_id',
+    'category_id',
+    'param',
+    'price_min',
+    'price_max',
+)
+
+PRODUCT_CACHE_PARAMS = CATALOG_FILTER_PARAMS + (
+    'ordering',
+    'cursor',
+    'page_size',
+)
+
+SEARCH_CACHE_PARAMS = CATALOG_FILTER_PARAMS + ('q', 'limit', 'offset')
+
+
+def product_dependencies(query):
+    """Счетчики поколений, от которых зависит выдача /products."""
+    shop_id = query.get('shop_id')
+    category_id = query.get('category_id')
+    if not (shop_id or category_id):
+        return [PRODUCTS]
+    names = []
+    if shop_id:
+        names.append(shop_key(shop_id))
+    if category_id:
+        names.append(category_key(category_id))
+    return names
+
+
+def offer_dependencies(query):
+    """Счетчики поколений, от которых зависит выдача /products/offers.
+
+    Сравнение цен охватывает все магазины, поэтому shop_id не
+    учитывается.
+    """
+    category_id = query.get('category_id')
+    if category_id:
+        return [category_key(category_id)]
+    return [PRODUCTS]
 
 
 class ShopView(ListAPIView):
@@ -18,8 +81,9 @@ class ShopView(ListAPIView):
     """
     queryset = Shop.objects.filter(state=True)
     serializer_class = ShopSerializer
+    query_budget = {'GET': 2}
 
-    @method_decorator(cache_page(60*60*2))  # Кешируем на 2 часа
+    @versioned_cache('shops', lambda query: [SHOPS], params=('page',))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
@@ -27,31 +91,190 @@ class ShopView(ListAPIView):
 class CategoryView(ListAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    query_budget = {'GET': 2}
 
-    @method_decorator(cache_page(60*60*2))  # Кешируем на 2 часа
+    @versioned_cache(
+        'categories',
+        lambda query: [CATEGORIES],
+        params=('page',)
+    )
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
 
-class ProductInfoView(APIView):
-    @method_decorator(cache_page(60*60))  # Кешируем на 1 час
-    def get(self, request, *args, **kwargs):
-        query = Q(shop__state=True)
-        shop_id = request.query_params.get('shop_id')
-        category_id = request.query_params.get('category_id')
+class CatalogFilterMixin:
+    """Выборка каталога с фильтрами по магазину, категории, цене и
+    значениям параметров"""
+
+    def get_queryset(self):
+        queryset = CatalogItem.objects.filter(shop_state=True)
+        shop_id = self.request.query_params.get('shop_id')
+        category_id = self.request.query_params.get('category_id')
 
         if shop_id:
-            query &= Q(shop_id=shop_id)
+            queryset = queryset.filter(shop_id=shop_id)
+        if category_id:
+            queryset = queryset.filter(category_id=category_id)
+        return filter_catalog(queryset, self.filters)
+
+    def parse_filters(self, request):
+        """Разбирает фильтры запроса, при ошибке возвращает ответ 400."""
+        try:
+            self.filters = parse_catalog_filters(request.query_params)
+        except ValueError as error:
+            return Response(
+                {'Status': False, 'Errors': str(error)},
+                status=400
+            )
+        return None
+
+
+class ProductInfoView(CatalogFilterMixin, GenericAPIView):
+    """
+    Класс для поиска товаров по денормализованному каталогу
+
+    Выдача постраничная по курсору. С параметром stream=1 весь результат
+    отдается потоковым JSON-массивом без загрузки в память. Товары
+    фильтруются по значениям параметров (param=Название:значение или
+    param=Название:мин..макс) и по цене (price_min, price_max).
+    """
+    pagination_class = ProductCursorPagination
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 2}
+
+    def get_queryset(self):
+        return super().get_queryset().values(*CATALOG_VALUES)
+
+    def get(self, request, *args, **kwargs):
+        error = self.parse_filters(request)
+        if error:
+            return error
+        if request.query_params.get('stream') in ('1', 'true'):
+            return StreamingHttpResponse(
+                self.stream(self.get_queryset()),
+                content_type='application/json'
+            )
+        return self.list(request, *args, **kwargs)
+
+    @versioned_cache(
+        'products',
+        product_dependencies,
+        params=PRODUCT_CACHE_PARAMS
+    )
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [catalog_item_data(row) for row in page]
+        )
+
+    def stream(self, queryset):
+        """Построчно формирует JSON-массив товаров."""
+        ordering = self.paginator.get_ordering(self.request, queryset, self)
+        rows = queryset.order_by(*ordering).iterator(
+            chunk_size=settings.CATALOG_STREAM_CHUNK_SIZE
+        )
+        separator = b'['
+        for row in rows:
+            yield separator + dumps(catalog_item_data(row))
+            separator = b','
+        yield b'[]' if separator == b'[' else b']'
+
+
+class ProductFacetView(CatalogFilterMixin, GenericAPIView):
+    """
+    Класс для подсчета товаров по значениям параметров
+
+    Принимает те же фильтры, что и ProductInfoView, и возвращает
+    количество подходящих товаров для каждого значения каждого параметра.
+    """
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 2}
+
+    def get(self, request, *args, **kwargs):
+        error = self.parse_filters(request)
+        if error:
+            return error
+        return self.list(request, *args, **kwargs)
+
+    @versioned_cache(
+        'product_facets',
+        product_dependencies,
+        params=CATALOG_FILTER_PARAMS
+    )
+    def list(self, request, *args, **kwargs):
+        return Response(catalog_facets(self.get_queryset()))
+
+
+class ProductSearchView(CatalogFilterMixin, GenericAPIView):
+    """
+    Класс для полнотекстового поиска товаров
+
+    Ищет слова запроса q в названии продукта, модели и значениях
+    параметров. Результаты упорядочены по релевантности и выдаются
+    постранично по смещению, всего не больше max_results лучших
+    совпадений. Поддерживаются фильтры ProductInfoView.
+    """
+    pagination_class = SearchPagination
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 3}
+
+    def get(self, request, *args, **kwargs):
+        if not request.query_params.get('q', '').strip():
+            return Response(
+                {'Status': False, 'Errors': 'Не указан поисковый запрос'},
+                status=400
+            )
+        error = self.parse_filters(request)
+        if error:
+            return error
+        return self.list(request, *args, **kwargs)
+
+    @versioned_cache(
+        'product_search',
+        product_dependencies,
+        params=SEARCH_CACHE_PARAMS
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = search_catalog(
+            self.get_queryset(),
+            request.query_params['q']
+        )
+        page = self.paginate_queryset(queryset.values(*CATALOG_VALUES))
+        return self.get_paginated_response(
+            [catalog_item_data(row) for row in page]
+        )
+
+
+class ProductOfferView(GenericAPIView):
+    """
+    Класс для сравнения цен магазинов на продукты
+
+    Для каждого продукта возвращает минимальную и максимальную цену,
+    количество предложений и самое дешевое предложение в наличии.
+    Страница категории читается одним запросом из сводной таблицы
+    ProductOffer.
+    """
+    pagination_class = OfferCursorPagination
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 1}
+
+    def get_queryset(self):
+        queryset = ProductOffer.objects.all()
+        category_id = self.request.query_params.get('category_id')
         if category_id:
-            query &= Q(product__category_id=category_id)
-
-        queryset = ProductInfo.objects.filter(
-            query
-        ).select_related(
-            'shop', 'product__category'
-        ).prefetch_related(
-            'product_parameters__parameter'
-        ).distinct()
-
-        serializer = ProductInfoSerializer(queryset, many=True)
-        return Response(serializer.data)
+            queryset = queryset.filter(category_id=category_id)
+        return queryset.values(*OFFER_VALUES)
+
+    def get(self, request, *args, **kwargs):
+        return self.list(request, *args, **kwargs)
+
+    @versioned_cache(
+        'product_offers',
+        offer_dependencies,
+        params=('category_id', 'cursor', 'page_size')
+    )
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            [offer_data(row) for row in page]
+        )
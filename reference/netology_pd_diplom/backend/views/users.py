@@ -1,13 +1,18 @@
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from rest_framework.authtoken.models import Token
+from backend.fast_serializers import contacts_data
 from backend.models import ConfirmEmailToken, Contact
+from backend.renderers import FAST_RENDERER_CLASSES
 from backend.serializers import UserSerializer, ContactSerializer
 
 
 class RegisterAccount(APIView):
+    query_budget = {'POST': 6}
+
     def post(self, request, *args, **kwargs):
         if {
             'first_name',
@@ -45,6 +50,8 @@ class RegisterAccount(APIView):
 
 
 class ConfirmAccount(APIView):
+    query_budget = {'POST': 4}
+
     def post(self, request, *args, **kwargs):
         if {'email', 'token'}.issubset(request.data):
             token = ConfirmEmailToken.objects.filter(
@@ -70,6 +77,8 @@ class ConfirmAccount(APIView):
 
 
 class LoginAccount(APIView):
+    query_budget = {'POST': 2}
+
     def post(self, request, *args, **kwargs):
         if {'email', 'password'}.issubset(request.data):
             user = authenticate(
@@ -95,6 +104,8 @@ class LoginAccount(APIView):
 
 
 class AccountDetails(APIView):
+    query_budget = {'GET': 2, 'POST': 2}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -136,6 +147,9 @@ class AccountDetails(APIView):
 
 
 class ContactView(APIView):
+    renderer_classes = FAST_RENDERER_CLASSES
+    query_budget = {'GET': 2, 'POST': 3}
+
     def get(self, request, *args, **kwargs):
         if not request.user.is_authenticated:
             return Response(
@@ -143,6 +157,8 @@ class ContactView(APIView):
                 status=403
             )
         contact = Contact.objects.filter(user_id=request.user.id)
+        if settings.FAST_SERIALIZERS:
+            return Response(contacts_data(contact))
         serializer = ContactSerializer(contact, many=True)
         return Response(serializer.data)
 
@@ -0,0 +1,44 @@
+"""Настройки gunicorn для production-профиля.
+
+По умолчанию WSGI-воркеры gthread: каждый поток держит свое постоянное
+соединение с PostgreSQL (DB_CONN_MAX_AGE), поэтому число соединений
+равно workers * threads. Для ASGI задайте
+GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker и приложение
+netology_pd_diplom.asgi:application.
+
+Запуск: gunicorn -c gunicorn.conf.py netology_pd_diplom.wsgi
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv(
+    'WEB_CONCURRENCY',
+    multiprocessing.cpu_count() * 2 + 1
+))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск воркеров ограничивает рост памяти, разброс не дает
+# перезапуститься всем воркерам одновременно
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('GUNICORN_ACCESS_LOG')
+errorlog = '-'
+
+
+def on_starting(server):
+    """Очищает файлы метрик Prometheus предыдущего запуска."""
+    directory = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Удаляет метрики-gauge завершившегося воркера."""
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,172 @@
+"""Нагрузочный сценарий API для Locust.
+
+Данные готовит команда seed_load_data, пароли пользователей задаются
+LOAD_PASSWORD. Пример запуска против локального сервера с сохранением
+итоговой статистики в JSON:
+
+    python manage.py seed_load_data --shops 10 --goods 1000 --buyers 50
+    locust -f locustfile.py --headless -u 200 -r 20 -t 2m \
+        --host http://localhost:8000 --json > locust.json
+"""
+import os
+import random
+
+from locust import HttpUser, between, task
+
+API = '/api/v1'
+PASSWORD = os.getenv('LOAD_PASSWORD', 'password')
+BUYERS = int(os.getenv('LOAD_BUYERS', 50))
+SHOPS = int(os.getenv('LOAD_SHOPS', 10))
+SEARCH_WORDS = ('смартфоны', 'ноутбуки', 'наушники', 'черный', '128')
+FILTERS = (
+    {'param': 'Цвет:черный'},
+    {'param': 'Встроенная память (Гб):128..'},
+    {'price_min': 10000, 'price_max': 50000},
+)
+
+
+class ApiUser(HttpUser):
+    abstract = True
+    email = None
+
+    def on_start(self):
+        if self.email is None:
+            return
+        response = self.client.post(
+            f'{API}/user/login',
+            {'email': self.email, 'password': PASSWORD},
+            name='user/login'
+        )
+        token = response.json()['Token']
+        self.client.headers['Authorization'] = f'Token {token}'
+
+    def product_ids(self):
+        """ID товаров случайной страницы каталога."""
+        response = self.client.get(
+            f'{API}/products',
+            params={'page_size': 40},
+            name='products'
+        )
+        return [item['id'] for item in response.json()['results']]
+
+
+class CatalogUser(ApiUser):
+    """Анонимный просмотр каталога: страницы, фильтры, поиск."""
+    weight = 6
+    wait_time = between(0.5, 2)
+
+    @task(5)
+    def browse(self):
+        response = self.client.get(
+            f'{API}/products',
+            params={'page_size': 40},
+            name='products'
+        )
+        cursor = response.json().get('next')
+        if cursor:
+            self.client.get(cursor, name='products?cursor')
+
+    @task(2)
+    def filter_products(self):
+        self.client.get(
+            f'{API}/products',
+            params=random.choice(FILTERS),
+            name='products?filters'
+        )
+        self.client.get(
+            f'{API}/products/facets',
+            params=random.choice(FILTERS),
+            name='products/facets'
+        )
+
+    @task(2)
+    def search(self):
+        self.client.get(
+            f'{API}/products/search',
+            params={'q': random.choice(SEARCH_WORDS)},
+            name='products/search'
+        )
+
+    @task(1)
+    def offers(self):
+        self.client.get(f'{API}/products/offers', name='products/offers')
+
+    @task(1)
+    def shops_and_categories(self):
+        self.client.get(f'{API}/shops', name='shops')
+        self.client.get(f'{API}/categories', name='categories')
+
+
+class BuyerUser(ApiUser):
+    """Покупатель: правка корзины, оформление и история заказов."""
+    weight = 3
+    wait_time = between(1, 3)
+
+    def on_start(self):
+        self.email = f'load-buyer-{random.randrange(BUYERS)}@example.com'
+        super().on_start()
+        contacts = self.client.get(
+            f'{API}/user/contact',
+            name='user/contact'
+        ).json()
+        self.contact_id = contacts[0]['id'] if contacts else None
+
+    @task(5)
+    def edit_basket(self):
+        product_ids = self.product_ids()
+        if not product_ids:
+            return
+        product_ids = random.sample(product_ids, min(3, len(product_ids)))
+        self.client.post(
+            f'{API}/basket',
+            json={'items': [
+                {'product_info': product_id, 'quantity': 1}
+                for product_id in product_ids
+            ]},
+            name='basket POST'
+        )
+        basket = self.client.get(f'{API}/basket', name='basket').json()
+        if basket and basket[0]['ordered_items']:
+            item = random.choice(basket[0]['ordered_items'])
+            self.client.put(
+                f'{API}/basket',
+                json={'items': [{'id': item['id'], 'quantity': 2}]},
+                name='basket PUT'
+            )
+
+    @task(1)
+    def checkout(self):
+        basket = self.client.get(f'{API}/basket', name='basket').json()
+        if not basket or self.contact_id is None:
+            return
+        with self.client.post(
+            f'{API}/order',
+            json={'id': basket[0]['id'], 'contact': self.contact_id},
+            name='order POST',
+            catch_response=True
+        ) as response:
+            # Нехватка остатков - штатный ответ под нагрузкой
+            if response.status_code == 400:
+                response.success()
+
+    @task(2)
+    def orders(self):
+        self.client.get(f'{API}/order', name='order')
+
+
+class PartnerUser(ApiUser):
+    """Магазин опрашивает новые заказы и состояние."""
+    weight = 1
+    wait_time = between(2, 5)
+
+    def on_start(self):
+        self.email = f'bench-shop-{random.randrange(SHOPS)}@example.com'
+        super().on_start()
+
+    @task(4)
+    def poll_orders(self):
+        self.client.get(f'{API}/partner/orders', name='partner/orders')
+
+    @task(1)
+    def state(self):
+        self.client.get(f'{API}/partner/state', name='partner/state')
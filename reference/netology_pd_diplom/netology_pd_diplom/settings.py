@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import random
 from pathlib import Path
 from dotenv import load_dotenv
 load_dotenv()
@@ -40,13 +41,13 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Сторонние приложения
     'rest_framework',
     'rest_framework.authtoken',
     'django_rest_passwordreset',
     'drf_spectacular',
-    'silk',
 
     # Локальные приложения
     'backend',
@@ -54,6 +55,8 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    'backend.metrics.MetricsMiddleware',
+    'backend.budget.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,9 +64,45 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'silk.middleware.SilkyMiddleware',
 ]
 
+# Метрики Prometheus: время запросов для всех запросов, число и время
+# SQL - для доли METRICS_SAMPLE_RATE. Эндпоинт /metrics закрывается
+# токеном METRICS_TOKEN, если он задан
+METRICS_ENABLED = os.getenv(
+    'METRICS_ENABLED', 'true'
+).lower() in ('1', 'true', 'yes')
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Отладка бюджетов SQL-запросов: превышение query_budget представления
+# пишется в лог со стеком вызовов лишнего запроса
+QUERY_BUDGET_DEBUG = os.getenv(
+    'QUERY_BUDGET_DEBUG', ''
+).lower() in ('1', 'true', 'yes')
+
+# Профилировщик Silk пишет каждый запрос и его SQL в базу, поэтому
+# включается явно и перехватывает только долю SILK_SAMPLE_PERCENT
+# запросов и запросы с заголовком X-Silk-Profile: <SILK_PROFILE_TOKEN>
+SILK_ENABLED = os.getenv('SILK_ENABLED', '').lower() in ('1', 'true', 'yes')
+SILK_SAMPLE_PERCENT = float(os.getenv('SILK_SAMPLE_PERCENT', 1))
+SILK_PROFILE_TOKEN = os.getenv('SILK_PROFILE_TOKEN', '')
+
+
+def silk_intercept(request):
+    """Решает, профилировать ли запрос в Silk."""
+    if SILK_PROFILE_TOKEN and request.headers.get(
+        'X-Silk-Profile'
+    ) == SILK_PROFILE_TOKEN:
+        return True
+    return random.random() * 100 < SILK_SAMPLE_PERCENT
+
+
+if SILK_ENABLED:
+    INSTALLED_APPS.append('silk')
+    MIDDLEWARE.append('silk.middleware.SilkyMiddleware')
+    SILKY_INTERCEPT_FUNC = silk_intercept
+
 # URL и шаблоны
 ROOT_URLCONF = 'netology_pd_diplom.urls'
 
@@ -84,25 +123,77 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'netology_pd_diplom.wsgi.application'
+ASGI_APPLICATION = 'netology_pd_diplom.asgi.application'
+
+# База данных: PostgreSQL, если задан PG_DB, иначе SQLite (разработка).
+# Соединение живет DB_CONN_MAX_AGE секунд и проверяется перед
+# повторным использованием. За PgBouncer в режиме transaction
+# (DB_PGBOUNCER) серверные курсоры отключаются: они не переживают
+# смену серверного соединения между транзакциями
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', '').lower() in ('1', 'true', 'yes')
+
+if os.getenv('PG_DB'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'HOST': os.getenv('PG_HOST', 'localhost'),
+            'PORT': os.getenv('PG_PORT', '5432'),
+            'NAME': os.getenv('PG_DB'),
+            'USER': os.getenv('PG_USER', 'diplom_user'),
+            'PASSWORD': os.getenv('PG_PASSWORD', 'diplom_password'),
+            'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+# Кеш: общий Redis для всех воркеров, если задан REDIS_URL,
+# иначе локальный кеш процесса (разработка)
+REDIS_URL = os.getenv('REDIS_URL')
 
-# База данных
-# DATABASES = {
-#     'default': {
-#         'ENGINE': 'django.db.backends.postgresql',
-#         'HOST': os.getenv('PG_HOST', 'localhost'),
-#         'PORT': os.getenv('PG_PORT', '5432'),
-#         'NAME': os.getenv('PG_DB', 'diplom_db'),
-#         'USER': os.getenv('PG_USER', 'diplom_user'),
-#         'PASSWORD': os.getenv('PG_PASSWORD', 'diplom_password'),
-#     }
-# }
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'diplom'),
+        }
     }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Celery: брокер и хранилище результатов
+CELERY_BROKER_URL = os.getenv(
+    'CELERY_BROKER_URL',
+    REDIS_URL or 'redis://localhost:6379/0'
+)
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = int(os.getenv('CELERY_RESULT_EXPIRES', 60*60*24))
+CELERY_TASK_TRACK_STARTED = True
+CELERY_TASK_ALWAYS_EAGER = os.getenv(
+    'CELERY_TASK_ALWAYS_EAGER', ''
+).lower() in ('1', 'true', 'yes')
+CELERY_BEAT_SCHEDULE = {
+    'send-queued-emails': {
+        'task': 'backend.celery_tasks.send_queued_emails',
+        'schedule': float(os.getenv('EMAIL_QUEUE_INTERVAL', 10)),
+    },
+    'relay-order-notifications': {
+        'task': 'backend.celery_tasks.relay_order_notifications',
+        'schedule': float(os.getenv('NOTIFICATION_RELAY_INTERVAL', 5)),
+    },
 }
+
 # Пароли и аутентификация
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -124,6 +215,14 @@ USE_TZ = True
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# Загружаемые файлы (прайс-листы партнеров)
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Время, в течение которого повторный запрос выгрузки прайс-листа
+# получает ID уже запущенной задачи
+EXPORT_TASK_TIMEOUT = int(os.getenv('EXPORT_TASK_TIMEOUT', 10*60))
+
 # Email
 EMAIL_CONFIG = {
     'BACKEND': 'django.core.mail.backends.smtp.EmailBackend',
@@ -142,6 +241,15 @@ EMAIL_HOST_PASSWORD = EMAIL_CONFIG['PASSWORD']
 EMAIL_USE_SSL = EMAIL_CONFIG['USE_SSL']
 SERVER_EMAIL = EMAIL_HOST_USER
 
+# Очередь писем: размер пакета, писем в секунду на SMTP-сервер
+# (0 - без ограничения), попыток и базовая задержка повтора в секундах
+EMAIL_BATCH_SIZE = int(os.getenv('EMAIL_BATCH_SIZE', 100))
+EMAIL_RATE_LIMIT = float(os.getenv('EMAIL_RATE_LIMIT', 10))
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 5))
+EMAIL_RETRY_BACKOFF = int(os.getenv('EMAIL_RETRY_BACKOFF', 60))
+EMAIL_DRAIN_TIME_LIMIT = int(os.getenv('EMAIL_DRAIN_TIME_LIMIT', 50))
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 500))
+
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -169,6 +277,39 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Импорт прайс-листов: количество товаров в одном пакете записи
+PRICE_LIST_IMPORT_CHUNK_SIZE = int(
+    os.getenv('PRICE_LIST_IMPORT_CHUNK_SIZE', 1000)
+)
+# Таймаут загрузки прайс-листа по URL, секунды
+PRICE_LIST_DOWNLOAD_TIMEOUT = int(
+    os.getenv('PRICE_LIST_DOWNLOAD_TIMEOUT', 30)
+)
+# Наибольший размер прайс-листа, скачиваемого асинхронным
+# /async/partner/update, байты
+PRICE_LIST_MAX_DOWNLOAD_SIZE = int(
+    os.getenv('PRICE_LIST_MAX_DOWNLOAD_SIZE', 200 * 1024 * 1024)
+)
+# Ожидание готовности задачи в /async/results?wait=<секунды>: предел
+# ожидания и интервал опроса хранилища результатов Celery
+ASYNC_RESULT_MAX_WAIT = float(os.getenv('ASYNC_RESULT_MAX_WAIT', 30))
+ASYNC_RESULT_POLL_INTERVAL = float(
+    os.getenv('ASYNC_RESULT_POLL_INTERVAL', 0.5)
+)
+
+# Каталог: размер пакета строк при потоковой выдаче /products?stream=1
+CATALOG_STREAM_CHUNK_SIZE = int(os.getenv('CATALOG_STREAM_CHUNK_SIZE', 2000))
+# Время жизни версионного кеша каталога, секунды
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', 60*60*24*7))
+# Поиск: число слов запроса и строк, участвующих в ранжировании
+SEARCH_MAX_TOKENS = int(os.getenv('SEARCH_MAX_TOKENS', 8))
+SEARCH_MAX_CANDIDATES = int(os.getenv('SEARCH_MAX_CANDIDATES', 1000))
+# Быстрая сериализация корзины, заказов и контактов без полей DRF,
+# включается явно
+FAST_SERIALIZERS = os.getenv(
+    'FAST_SERIALIZERS', ''
+).lower() in ('1', 'true', 'yes')
+
 
 # DRF Spectacular (OpenAPI)
 SPECTACULAR_SETTINGS = {
@@ -233,6 +374,8 @@ if os.getenv('SENTRY_DSN'):
     sentry_sdk.init(
         dsn=os.getenv('SENTRY_DSN'),
         integrations=[DjangoIntegration()],
-        traces_sample_rate=1.0,
+        traces_sample_rate=float(
+            os.getenv('SENTRY_TRACES_SAMPLE_RATE', 0.1)
+        ),
         send_default_pii=True,
     )
@@ -0,0 +1,28 @@
+"""
+Профиль настроек для production.
+
+Кеш, брокер и хранилище результатов Celery находятся в общем Redis,
+поэтому кеш каталога и статусы задач видны всем воркерам. База -
+PostgreSQL с постоянными соединениями (DB_CONN_MAX_AGE), при DEBUG =
+False Django не накапливает выполненные запросы в connection.queries.
+MEDIA_ROOT должен быть общим у приложения и воркеров Celery, а файлы
+выгрузок раздает веб-сервер: Django при DEBUG = False их не отдает.
+Запуск: DJANGO_SETTINGS_MODULE=netology_pd_diplom.settings_production
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, REDIS_URL
+
+DEBUG = False
+
+if not REDIS_URL:
+    raise ImproperlyConfigured(
+        'Для production-профиля необходимо задать REDIS_URL'
+    )
+
+if DATABASES['default']['ENGINE'] != 'django.db.backends.postgresql':
+    raise ImproperlyConfigured(
+        'Для production-профиля необходимо задать PG_DB'
+    )
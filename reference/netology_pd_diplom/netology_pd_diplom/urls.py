@@ -13,9 +13,12 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from backend.metrics import metrics_view
 from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
@@ -65,10 +68,18 @@ urlpatterns = [
         name='redoc'
     ),
 
-    # Профилирование
-    path('silk/', include('silk.urls', namespace='silk')),
+    # Метрики Prometheus
+    path('metrics', metrics_view, name='metrics'),
 
     # Тестовые endpoints для мониторинга
     path('sentry-debug/', trigger_error),
     path('performance-test/', simulate_long_request),
 ]
+
+# Профилирование
+if settings.SILK_ENABLED:
+    urlpatterns.append(path('silk/', include('silk.urls', namespace='silk')))
+
+# Выгрузки и загруженные файлы при разработке. При DEBUG = False static()
+# ничего не добавляет, выгрузки раздает nginx (nginx.conf)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)